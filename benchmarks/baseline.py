@@ -0,0 +1,41 @@
+"""JSON baselines and the regression check against them."""
+import json
+from pathlib import Path
+
+
+def save(path, result):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2, sort_keys=True) + '\n')
+
+
+def load(path):
+    return json.loads(Path(path).read_text())
+
+
+def compare(baseline, result, threshold=0.2, min_delta_ms=1.0):
+    """
+    Return a list of regression messages (empty when none). An endpoint
+    regresses when its p95 grows or its throughput drops by more than
+    `threshold` (a fraction), when it issues more queries per request, or
+    when it fails more often. Latency changes under `min_delta_ms` are noise.
+    """
+    regressions = []
+    for name, old in baseline['endpoints'].items():
+        new = result['endpoints'].get(name)
+        if new is None:
+            regressions.append(f'{name}: missing from this run')
+            continue
+        if new['p95_ms'] > old['p95_ms'] * (1 + threshold) and new['p95_ms'] - old['p95_ms'] >= min_delta_ms:
+            regressions.append(f"{name}: p95 {old['p95_ms']:.1f}ms -> {new['p95_ms']:.1f}ms")
+        if new['rps'] < old['rps'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {old['rps']:.1f}/s -> {new['rps']:.1f}/s")
+        # query counts are deterministic; any growth is a real change
+        if new['queries_per_request'] > old['queries_per_request'] + 0.01:
+            regressions.append(
+                f"{name}: queries/request {old['queries_per_request']:.2f} -> {new['queries_per_request']:.2f}"
+            )
+        old_rate, new_rate = old['errors'] / (old['count'] or 1), new['errors'] / (new['count'] or 1)
+        if new_rate > old_rate:
+            regressions.append(f"{name}: error rate {old_rate:.1%} -> {new_rate:.1%}")
+    return regressions
@@ -0,0 +1,129 @@
+"""The signup-to-profile flow driven through the Django test client.
+
+Each virtual user runs register -> verify-email -> submit-parent ->
+approve-parent -> login -> profile. Every request is timed and its queries
+counted on the calling thread's connection; codes and approval tokens are
+read straight from the database between steps (not measured), the way a
+user would read them from the queued email.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+User = get_user_model()
+
+ENDPOINTS = ('register', 'verify_email', 'submit_parent', 'approve_parent', 'login', 'profile')
+PASSWORD = 'bench-Passw0rd!'
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+
+class Recorder:
+    """Per-endpoint latencies (seconds), query counts and error count, safe to share between threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {name: {'latencies': [], 'queries': [], 'errors': 0} for name in ENDPOINTS}
+
+    def call(self, endpoint, fn, ok=(200, 201)):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = fn()
+            elapsed = time.perf_counter() - started
+        with self._lock:
+            sample = self.samples[endpoint]
+            sample['latencies'].append(elapsed)
+            sample['queries'].append(len(queries))
+            if response.status_code not in ok:
+                sample['errors'] += 1
+        return response if response.status_code in ok else None
+
+    def summary(self, concurrency):
+        result = {}
+        for name, sample in self.samples.items():
+            latencies = sample['latencies']
+            busy = sum(latencies)
+            result[name] = {
+                'count': len(latencies),
+                'errors': sample['errors'],
+                # what this endpoint alone sustains with `concurrency` requests in flight
+                'rps': len(latencies) / busy * concurrency if busy else 0.0,
+                'mean_ms': busy / len(latencies) * 1000 if latencies else 0.0,
+                'p50_ms': percentile(latencies, 0.50) * 1000,
+                'p95_ms': percentile(latencies, 0.95) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+                'queries_per_request': sum(sample['queries']) / len(latencies) if latencies else 0.0,
+            }
+        return result
+
+
+def run_user(client, recorder, email):
+    """One pass through the flow; stops at the first failed step."""
+    response = recorder.call('register', lambda: client.post(
+        '/users/register/',
+        {'email': email, 'password': PASSWORD, 'password_confirm': PASSWORD, 'age_group': '10-15'},
+        content_type='application/json',
+    ), ok=(201,))
+    if response is None:
+        return False
+
+    code = User.objects.filter(email=email).values_list('email_verification_code', flat=True).first()
+    response = recorder.call('verify_email', lambda: client.post(
+        '/users/verify-email/', {'email': email, 'code': code}, content_type='application/json',
+    ))
+    if response is None:
+        return False
+
+    parent = f'parent.{email}'
+    auth = {'HTTP_AUTHORIZATION': f"Bearer {response.json()['access']}"}
+    response = recorder.call('submit_parent', lambda: client.post(
+        '/users/submit-parent/', {'parent_email': parent}, content_type='application/json', **auth,
+    ))
+    if response is None:
+        return False
+
+    token = User.objects.filter(email=email).values_list('verification_token', flat=True).first()
+    if recorder.call('approve_parent', lambda: client.get(f'/users/approve-parent/{token}/', {'email': parent})) is None:
+        return False
+
+    response = recorder.call('login', lambda: client.post(
+        '/users/login/', {'email': email, 'password': PASSWORD}, content_type='application/json',
+    ))
+    if response is None:
+        return False
+
+    auth = {'HTTP_AUTHORIZATION': f"Bearer {response.json()['access']}"}
+    return recorder.call('profile', lambda: client.get('/users/profile/', **auth)) is not None
+
+
+def run_flow(users, concurrency, prefix='bench'):
+    """Run `users` flows over `concurrency` threads; returns (recorder, completed flows, wall seconds)."""
+    recorder = Recorder()
+    pending = iter(range(users))
+    lock = threading.Lock()
+
+    def worker():
+        client, completed = Client(), 0
+        try:
+            while True:
+                with lock:
+                    i = next(pending, None)
+                if i is None:
+                    return completed
+                completed += run_user(client, recorder, f'{prefix}{i}@example.com')
+        finally:
+            # one connection per thread for the whole run, closed when the thread is done
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        completed = sum(pool.map(lambda _: worker(), range(concurrency)))
+    return recorder, completed, time.perf_counter() - started
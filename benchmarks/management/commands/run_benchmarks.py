@@ -0,0 +1,139 @@
+import contextlib
+import io
+import os
+import platform
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from benchmarks import baseline
+from benchmarks.flow import ENDPOINTS, run_flow
+from outbox.queue import send_batch
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baselines', 'flow.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the register -> verify -> submit-parent -> approve -> login -> profile flow against a '
+        'throwaway test database and report throughput, latency percentiles and queries per request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='flows to run')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--warmup', type=int, default=10, help='flows run first and discarded')
+        parser.add_argument(
+            '--hasher', choices=('default', 'fast'), default='default',
+            help='"fast" uses MD5 password hashing to measure everything but PBKDF2',
+        )
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON path')
+        parser.add_argument('--save-baseline', action='store_true', help='write this run as the baseline')
+        parser.add_argument('--compare', action='store_true', help='fail if this run regresses against the baseline')
+        parser.add_argument('--threshold', type=float, default=0.2, help='allowed fractional regression')
+        parser.add_argument('--output', help='also write this run as JSON here')
+
+    def handle(self, *args, **options):
+        overrides = {
+            'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+            # throttles would turn a load test into a stream of 429s
+            'CACHES': {**settings.CACHES, 'benchmark_throttle': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            'THROTTLE_CACHE': 'benchmark_throttle',
+        }
+        if options['hasher'] == 'fast':
+            overrides['PASSWORD_HASHERS'] = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+        with tempfile.TemporaryDirectory() as tmp:
+            if connection.vendor == 'sqlite':
+                # a file database, so worker threads share it and the WAL pragmas apply
+                connection.settings_dict['TEST']['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+            setup_test_environment()
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                with override_settings(**overrides):
+                    result = self._run(options)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+
+        self._report(result)
+        if options['output']:
+            baseline.save(options['output'], result)
+        if options['save_baseline']:
+            baseline.save(options['baseline'], result)
+            self.stdout.write(f"baseline saved to {options['baseline']}")
+        if options['compare']:
+            if not os.path.exists(options['baseline']):
+                raise CommandError(f"no baseline at {options['baseline']}; run with --save-baseline first")
+            regressions = baseline.compare(baseline.load(options['baseline']), result, options['threshold'])
+            if regressions:
+                raise CommandError('performance regressions:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"no regressions beyond {options['threshold']:.0%}"))
+
+    def _run(self, options):
+        # the views print every code they send; keep that out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            if options['warmup']:
+                run_flow(options['warmup'], options['concurrency'], prefix='warmup')
+                send_batch(batch_size=options['warmup'] * 3)
+            recorder, completed, seconds = run_flow(options['users'], options['concurrency'])
+        endpoints = recorder.summary(options['concurrency'])
+        requests = sum(e['count'] for e in endpoints.values())
+
+        # deliver what the flow queued, through the locmem backend
+        started, emails = time.perf_counter(), 0
+        while True:
+            batch = send_batch()
+            if not batch['claimed']:
+                break
+            emails += batch['sent']
+        email_seconds = time.perf_counter() - started
+
+        return {
+            'meta': {
+                'users': options['users'],
+                'concurrency': options['concurrency'],
+                'hasher': options['hasher'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'total': {
+                'seconds': seconds,
+                'completed_flows': completed,
+                'flows_per_sec': completed / seconds if seconds else 0.0,
+                'requests_per_sec': requests / seconds if seconds else 0.0,
+            },
+            'endpoints': endpoints,
+            'outbox': {
+                'emails': emails,
+                'seconds': email_seconds,
+                'emails_per_sec': emails / email_seconds if email_seconds else 0.0,
+            },
+        }
+
+    def _report(self, result):
+        meta, total = result['meta'], result['total']
+        self.stdout.write(
+            f"{total['completed_flows']}/{meta['users']} flows in {total['seconds']:.2f}s at concurrency "
+            f"{meta['concurrency']} ({total['flows_per_sec']:.1f} flows/s, {total['requests_per_sec']:.1f} req/s, "
+            f"{meta['database']}, {meta['hasher']} hasher)"
+        )
+        self.stdout.write(
+            f"{'endpoint':<16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}"
+        )
+        for name in ENDPOINTS:
+            e = result['endpoints'][name]
+            self.stdout.write(
+                f"{name:<16} {e['rps']:>8.1f} {e['p50_ms']:>8.1f} {e['p95_ms']:>8.1f} {e['p99_ms']:>8.1f} "
+                f"{e['queries_per_request']:>8.1f} {e['errors']:>7}"
+            )
+        outbox = result['outbox']
+        self.stdout.write(f"outbox: {outbox['emails']} emails in {outbox['seconds']:.2f}s ({outbox['emails_per_sec']:.0f}/s)")
@@ -0,0 +1,84 @@
+import time
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.seed import PASSWORD, Seeder, generated_timestamps
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with synthetic users, a power-law follower graph, posts, comments and likes '
+        '(bulk inserts, reproducible from --seed), then rebuild the data signals would have maintained.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--follows-per-user', type=float, default=20, help='mean accounts each user follows')
+        parser.add_argument('--posts-per-user', type=float, default=5, help='mean posts per user')
+        parser.add_argument('--comments-per-post', type=float, default=2)
+        parser.add_argument('--likes-per-post', type=float, default=10)
+        parser.add_argument('--seed', type=int, default=0, help='same seed and arguments -> same data')
+        parser.add_argument('--end', default=None,
+                            help='ISO date the generated history ends at (default today, 00:00 UTC)')
+        parser.add_argument('--days', type=int, default=365, help='length of the generated history')
+        parser.add_argument('--skew', type=float, default=1.0, help='Zipf exponent of user popularity')
+        parser.add_argument('--batch-size', type=int, default=10000, help='rows per bulk insert and transaction')
+        parser.add_argument('--prefix', default='seed', help='username prefix (followed by the seed)')
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help='do not run rebuild_follow_graph / rebuild_search_index / refresh_trending')
+
+    def handle(self, *args, **options):
+        if options['end']:
+            try:
+                end = datetime.fromisoformat(options['end'])
+            except ValueError:
+                raise CommandError(f"--end: not an ISO date: {options['end']!r}")
+            end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+        else:
+            end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        seeder = Seeder(
+            seed=options['seed'], prefix=options['prefix'], end=end, days=options['days'],
+            batch_size=options['batch_size'], skew=options['skew'],
+        )
+        if User.objects.filter(username__startswith=seeder.prefix).exists():
+            raise CommandError(f'users named {seeder.prefix}* already exist; pick another --seed or --prefix')
+
+        started = time.monotonic()
+        self._run('users', seeder.users(options['users']))
+        with generated_timestamps():
+            self._run('followers', seeder.follows(options['follows_per_user']))
+            self._run(('posts', 'comments', 'likes'), seeder.posts(
+                options['posts_per_user'], options['comments_per_post'], options['likes_per_post'],
+            ))
+        self.stdout.write(f"seeded in {time.monotonic() - started:.1f}s; every user's password is {PASSWORD!r}")
+
+        # bulk_create sends no signals: rebuild what the signal handlers would have kept up to date
+        if options['skip_rebuild']:
+            self.stdout.write(
+                'skipped rebuilds; run rebuild_follow_graph, rebuild_search_index and refresh_trending before use'
+            )
+            return
+        call_command('rebuild_follow_graph', skip_suggestions=True, stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+        call_command('refresh_trending', stdout=self.stdout)
+        self.stdout.write(
+            'follow suggestions were not computed (rebuild_follow_graph without --skip-suggestions does it); '
+            'timelines are not materialized, so feeds show celebrity authors and new posts as they fan out'
+        )
+
+    def _run(self, names, batches):
+        names = (names,) if isinstance(names, str) else names
+        totals = [0] * len(names)
+        started = time.monotonic()
+        for counts in batches:
+            counts = (counts,) if isinstance(counts, int) else counts
+            totals = [total + n for total, n in zip(totals, counts)]
+        elapsed = time.monotonic() - started
+        rate = sum(totals) / elapsed if elapsed else 0
+        summary = ', '.join(f'{total} {name}' for name, total in zip(names, totals))
+        self.stdout.write(f'{summary} in {elapsed:.1f}s ({rate:.0f} rows/s)')
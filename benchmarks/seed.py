@@ -0,0 +1,220 @@
+"""Synthetic data at scale for trying the apps against realistic table sizes.
+
+`Seeder` writes users and posts with `bulk_create`, one transaction per
+batch. Follows, likes and comments are ten times as many rows and nothing
+needs their ids back, so they skip model instances. Each batch is one
+`executemany` of plain tuples, because building Model objects would cost
+more than the INSERTs themselves. Every random choice comes from
+one `random.Random(seed)`, and timestamps are laid out backwards from a
+fixed `end`, so the same arguments give the same data. Passwords are hashed
+once and the hash is shared by every user, so hashing costs nothing per row.
+
+The shapes are skewed the way social data is. Each user gets a Zipf
+popularity (rank r has weight 1/r**skew). Follow targets are drawn by
+popularity, so follower counts follow a power law and a few users have
+most of the followers. Posts per user, likes and comments per post are
+Pareto-distributed. Post like_count, comment_count and trend_score are
+written with the post, because bulk_create sends no signals and nothing
+else would fill them in. Follow stats, suggestions and the search index
+are left to their rebuild commands.
+
+Only the user ids, join times and popularity weights stay in memory. Posts
+and their likes and comments are generated and written one batch at a time.
+"""
+import contextlib
+import itertools
+import random
+import uuid
+from array import array
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+
+from followers.models import Follower
+from posts import trending
+from posts.models import Comment, Like, Post
+
+User = get_user_model()
+
+PASSWORD = 'seed-Passw0rd!'
+# share of users in each age group; of all users, verified; of those, with a parent
+# email submitted; of those, approved by the parent
+AGE_WEIGHTS = {'5-10': 0.3, '10-15': 0.45, '15-17': 0.25}
+VERIFIED_RATIO = 0.85
+PARENT_SUBMITTED_RATIO = 0.9
+PARENT_APPROVED_RATIO = 0.7
+# bounds the Pareto tails, so one batch never holds an unbounded number of rows
+MAX_POSTS_PER_USER = 1000
+MAX_LIKES_PER_POST = 50000
+MAX_COMMENTS_PER_POST = 500
+
+WORDS = (
+    'pancakes', 'tomato', 'soup', 'bake', 'crispy', 'chocolate', 'salad', 'pasta', 'cookies', 'mix',
+    'oven', 'stir', 'fresh', 'basil', 'cheese', 'muffins', 'banana', 'bread', 'spicy', 'sweet',
+    'lemon', 'rice', 'noodles', 'pizza', 'dough', 'grill', 'yummy', 'recipe', 'mom', 'dad',
+    'tried', 'today', 'first', 'time', 'again', 'best', 'ever', 'with', 'my', 'the',
+)
+
+
+def _pareto_count(rng, mean, cap):
+    # Pareto(alpha=1.5) has mean 3: heavy tail, most values small
+    return min(cap, int(rng.paretovariate(1.5) * mean / 3))
+
+
+def _text(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def _at(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
+
+@contextlib.contextmanager
+def generated_timestamps():
+    """Let bulk_create keep the generated Post.created_at instead of stamping "now" (auto_now_add)."""
+    field = Post._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Seeder:
+    def __init__(self, seed=0, prefix='seed', end=None, days=365, batch_size=10000, skew=1.0):
+        self.rng = random.Random(seed)
+        self.prefix = f'{prefix}{seed}_'
+        self.end = (end or datetime.now(timezone.utc)).timestamp()
+        self.start = self.end - days * 86400
+        self.batch_size = batch_size
+        self.skew = skew
+        self.user_ids = array('q')
+        self.joined = array('d')
+        self._cum_weights = None
+        # looked up once: going through the `connection` proxy per row costs more than the INSERT
+        self._adapt = connection.ops.adapt_datetimefield_value
+
+    def _batches(self, count):
+        for start in range(0, count, self.batch_size):
+            yield range(start, min(start + self.batch_size, count))
+
+    # ---- users ---------------------------------------------------------------
+
+    def users(self, count):
+        rng = self.rng
+        password = make_password(PASSWORD)
+        groups, weights = list(AGE_WEIGHTS), list(AGE_WEIGHTS.values())
+        step = (self.end - self.start) / max(count, 1)
+        for batch in self._batches(count):
+            rows = []
+            for i in batch:
+                verified = rng.random() < VERIFIED_RATIO
+                has_parent = verified and rng.random() < PARENT_SUBMITTED_RATIO
+                name = f'{self.prefix}{i}'
+                rows.append(User(
+                    username=name,
+                    email=f'{name}@example.com',
+                    password=password,
+                    # signups spread evenly over the period, in id order
+                    date_joined=_at(self.start + (i + rng.random()) * step),
+                    is_email_verified=verified,
+                    age_group=rng.choices(groups, weights)[0],
+                    chef_star_name=f'Chef {name}' if rng.random() < 0.5 else None,
+                    parent_email=f'parent{i // 2}@{self.prefix.rstrip("_")}.example.com' if has_parent else None,
+                    is_parent_approved=has_parent and rng.random() < PARENT_APPROVED_RATIO,
+                    verification_token=uuid.UUID(int=rng.getrandbits(128), version=4),
+                ))
+            with transaction.atomic():
+                User.objects.bulk_create(rows)
+            for user in rows:
+                self.user_ids.append(user.pk)
+                self.joined.append(user.date_joined.timestamp())
+            yield len(rows)
+
+        # Zipf popularity over a random order of users
+        ranks = list(range(len(self.user_ids)))
+        rng.shuffle(ranks)
+        self._cum_weights = list(itertools.accumulate(1.0 / (rank + 1) ** self.skew for rank in ranks))
+
+    def _popular(self, k):
+        """`k` user indexes drawn by popularity (with repeats)."""
+        return self.rng.choices(range(len(self.user_ids)), cum_weights=self._cum_weights, k=k)
+
+    # ---- follower graph ------------------------------------------------------
+
+    def follows(self, per_user):
+        """Each user follows ~`per_user` others (exponentially spread), picked by popularity."""
+        rng, n = self.rng, len(self.user_ids)
+        rows = []
+        for follower in range(n):
+            k = min(n - 1, int(rng.expovariate(1 / per_user))) if per_user > 0 else 0
+            targets = set(self._popular(k)) - {follower}
+            for target in targets:
+                since = max(self.joined[follower], self.joined[target])
+                rows.append((self.user_ids[target], self.user_ids[follower], self._stamp(since)))
+            if len(rows) >= self.batch_size:
+                yield self._insert(Follower, ('user_id', 'follower_id', 'created_at'), rows)
+                rows = []
+        if rows:
+            yield self._insert(Follower, ('user_id', 'follower_id', 'created_at'), rows)
+
+    # ---- posts, comments, likes ----------------------------------------------
+
+    def posts(self, per_user, comments_per_post, likes_per_post):
+        """
+        ~`per_user` posts per user on average, each with its comments and likes.
+        Yields (posts, comments, likes) written per batch of posts.
+        """
+        rng, n = self.rng, len(self.user_ids)
+        pending = []
+        for author in range(n):
+            for _ in range(_pareto_count(rng, per_user, MAX_POSTS_PER_USER)):
+                pending.append(author)
+            if len(pending) >= self.batch_size:
+                yield self._write_posts(pending, comments_per_post, likes_per_post)
+                pending = []
+        if pending:
+            yield self._write_posts(pending, comments_per_post, likes_per_post)
+
+    def _write_posts(self, authors, comments_per_post, likes_per_post):
+        rng, n = self.rng, len(self.user_ids)
+        plans, posts = [], []
+        for author in authors:
+            created = self.joined[author] + rng.random() * (self.end - self.joined[author])
+            likes = _pareto_count(rng, likes_per_post, min(n, MAX_LIKES_PER_POST))
+            comments = _pareto_count(rng, comments_per_post, MAX_COMMENTS_PER_POST)
+            plans.append((created, likes, comments))
+            posts.append(Post(
+                author_id=self.user_ids[author], content=_text(rng, 5, 30),
+                created_at=_at(created), like_count=likes, comment_count=comments,
+                # as if all engagement happened when it was posted
+                trend_score=trending.weight(likes, comments), trend_at=created,
+            ))
+        with transaction.atomic():
+            Post.objects.bulk_create(posts, batch_size=self.batch_size)
+            likes, comments = [], []
+            for post, (created, like_count, comment_count) in zip(posts, plans):
+                for liker in rng.sample(range(n), like_count):
+                    likes.append((post.pk, self.user_ids[liker], self._stamp(created)))
+                for commenter in rng.choices(range(n), k=comment_count):
+                    comments.append((post.pk, self.user_ids[commenter], _text(rng, 2, 15), self._stamp(created)))
+            self._insert(Like, ('post_id', 'user_id', 'created_at'), likes)
+            self._insert(Comment, ('post_id', 'author_id', 'text', 'created_at'), comments)
+        return len(posts), len(comments), len(likes)
+
+    def _stamp(self, after):
+        """A database-ready timestamp between `after` and the end of the history."""
+        return self._adapt(_at(after + self.rng.random() * (self.end - after)))
+
+    def _insert(self, model, columns, rows):
+        """INSERT `rows` (tuples of database-ready values for `columns`) into `model`'s table."""
+        quote = connection.ops.quote_name
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(model._meta.db_table), ', '.join(quote(c) for c in columns), ', '.join(['%s'] * len(columns)),
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, len(rows), self.batch_size):
+                cursor.executemany(sql, rows[start:start + self.batch_size])
+        return len(rows)
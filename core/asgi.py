@@ -0,0 +1,14 @@
+"""
+ASGI entry point, e.g. `uvicorn core.asgi:application`.
+
+Serves the whole API; under ASGI the notification stream
+(/notifications/stream/) holds each client on one connection without
+tying up a worker thread.
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+application = get_asgi_application()
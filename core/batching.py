@@ -0,0 +1,26 @@
+"""Parsing of batched toggle actions sent by clients syncing an offline queue."""
+from django.conf import settings
+
+
+def collapse_actions(actions, id_key, flag_key, limit=None):
+    """
+    Reduce `[{id_key: 1, flag_key: true}, ...]` to `{id: bool}`, keeping the
+    last action per id (the order the client queued them in).
+    Raises ValueError on malformed input or more than `limit` actions
+    (BATCH_ACTIONS_MAX by default).
+    """
+    limit = limit or getattr(settings, 'BATCH_ACTIONS_MAX', 200)
+    if not isinstance(actions, list) or not actions:
+        raise ValueError('actions must be a non-empty list')
+    if len(actions) > limit:
+        raise ValueError(f'at most {limit} actions per request')
+    final = {}
+    for action in actions:
+        if not isinstance(action, dict):
+            raise ValueError(f'each action needs {id_key} and {flag_key}')
+        pk, flag = action.get(id_key), action.get(flag_key)
+        if isinstance(pk, bool) or not isinstance(pk, int) or not isinstance(flag, bool):
+            raise ValueError(f'each action needs an integer {id_key} and a boolean {flag_key}')
+        final.pop(pk, None)
+        final[pk] = flag
+    return final
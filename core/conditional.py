@@ -0,0 +1,164 @@
+"""Versioned response caching with ETag / Last-Modified for read endpoints.
+
+Every cached resource has a version counter in the default cache, keyed by
+a scope ("user", "post", ...) and an id, so a conditional GET costs one
+cache round trip and no query. Writers call `bump_version(scope, id)`
+(usually from a post_save receiver), which `incr`s the counter and records
+the Last-Modified time; `cached_response` derives the ETag and Last-Modified
+headers from them, answers conditional requests with 304 without running the
+view, and otherwise serves the response data cached (RESPONSE_CACHE_SECONDS)
+under the current version. A bump makes every older ETag and cache entry
+stale at once, so nothing has to be deleted.
+
+Only a missing counter (never read, or evicted) touches the database: it is
+seeded from the clock, above the high-water mark kept in ResponseVersion,
+so an old ETag can never match again. With more than one worker process the
+cache must be shared (REDIS_URL), like the user cache in users.authentication.
+
+    @api_view(['GET'])
+    @permission_classes([IsAuthenticated])
+    @cached_response('user')            # keyed on request.user.pk
+    def profile(request): ...
+
+    @cached_response('post', key=lambda request, post_id: post_id)
+    def post_detail(request, post_id): ...
+
+`stats()` reports hits, misses and 304s per scope for this process.
+"""
+import functools
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from rest_framework.response import Response
+
+from . import metrics
+from .models import ResponseVersion
+
+VERSION_KEY = 'version:{}:{}'
+MODIFIED_KEY = 'version-modified:{}:{}'
+RESPONSE_KEY = 'response:{}:{}:{}'
+
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+def get_version(scope, ident):
+    """`(version, last_modified)` of `scope`/`ident`: a counter and unix seconds, seeding them if missing."""
+    version_key, modified_key = VERSION_KEY.format(scope, ident), MODIFIED_KEY.format(scope, ident)
+    found = cache.get_many([version_key, modified_key])
+    version = found.get(version_key)
+    if version is None:
+        return _seed(scope, ident)
+    return version, found.get(modified_key, version // 1_000_000)
+
+
+def _seed(scope, ident):
+    """Start a counter above every version handed out before, recorded in ResponseVersion."""
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        rows = ResponseVersion.objects.using(DEFAULT_DB_ALIAS)
+        stored = rows.filter(scope=scope, ident=str(ident)).values_list('version', flat=True).first()
+        # microseconds since the epoch, far ahead of one bump per request since the last seed
+        seed = max(time.time_ns() // 1000, (stored or 0) + 1)
+        rows.bulk_create(
+            [ResponseVersion(scope=scope, ident=str(ident), version=seed)],
+            update_conflicts=True, unique_fields=['scope', 'ident'], update_fields=['version'],
+        )
+    version_key, modified_key = VERSION_KEY.format(scope, ident), MODIFIED_KEY.format(scope, ident)
+    # another process may have seeded it meanwhile; keep whichever got there first
+    cache.add(version_key, seed, timeout=None)
+    cache.add(modified_key, seed // 1_000_000, timeout=None)
+    found = cache.get_many([version_key, modified_key])
+    return found.get(version_key, seed), found.get(modified_key, seed // 1_000_000)
+
+
+def bump_version(scope, *idents):
+    """Invalidate cached responses and ETags of `scope` for every id in `idents`."""
+    for ident in idents:
+        try:
+            cache.incr(VERSION_KEY.format(scope, ident))
+        except ValueError:
+            # not cached: the next read seeds a version above every one handed out
+            pass
+    now = int(time.time())
+    cache.set_many({MODIFIED_KEY.format(scope, ident): now for ident in idents}, timeout=None)
+
+
+def _count(scope, outcome):
+    with _stats_lock:
+        _stats[scope, outcome] += 1
+    metrics.inc('response_cache_total', scope=scope, outcome=outcome)
+
+
+def stats():
+    """{scope: {'hits', 'misses', 'not_modified', 'hit_ratio'}} for this process; 304s count as hits."""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    result = {}
+    for scope in {scope for scope, _ in snapshot}:
+        counts = {outcome: snapshot.get((scope, outcome), 0) for outcome in ('hits', 'misses', 'not_modified')}
+        served = counts['hits'] + counts['not_modified']
+        total = served + counts['misses']
+        counts['hit_ratio'] = served / total if total else 0.0
+        result[scope] = counts
+    return result
+
+
+def _user_key(request, *args, **kwargs):
+    return request.user.pk
+
+
+def cached_response(scope, key=_user_key, timeout=None):
+    """
+    Decorator for DRF function views (place it under @api_view): serve GET/HEAD
+    responses from the cache for the current version of `scope`/`key(request,
+    *args, **kwargs)`, with validators and 304 support. Only 200 responses
+    are cached. Responses are private to the requesting user.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            ident = key(request, *args, **kwargs)
+            version, last_modified = get_version(scope, ident)
+            etag = f'"{scope}-{ident}-{version:x}"'
+
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                _count(scope, 'not_modified')
+                return _finish(not_modified, etag, last_modified)
+
+            response_key = RESPONSE_KEY.format(scope, ident, version)
+            data = cache.get(response_key)
+            if data is not None:
+                _count(scope, 'hits')
+                return _finish(Response(data), etag, last_modified)
+
+            _count(scope, 'misses')
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and isinstance(response, Response):
+                cache.set(
+                    response_key, response.data,
+                    timeout if timeout is not None else getattr(settings, 'RESPONSE_CACHE_SECONDS', 300),
+                )
+                _finish(response, etag, last_modified)
+            return response
+        return wrapped
+    return decorator
+
+
+def _finish(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # clients must revalidate, and shared caches must not store per-user data
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
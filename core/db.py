@@ -0,0 +1,126 @@
+"""Database configuration built from DATABASE_URL.
+
+- `database_config(url)` turns a URL into a DATABASES entry with persistent
+  connections (CONN_MAX_AGE + CONN_HEALTH_CHECKS).
+- `configure_sqlite` runs on every new SQLite connection and switches it to
+  WAL with a busy timeout, so concurrent signups/likes wait for the writer
+  instead of failing with "database is locked".
+- `ReplicaRouter` + `read_replica` send reads made inside decorated views
+  to one of the DATABASE_REPLICA_URLS databases.
+"""
+import contextvars
+import functools
+import random
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote, urlparse
+
+import django
+from django.conf import settings
+
+ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'sqlite3': 'django.db.backends.sqlite3',
+    'postgres': 'django.db.backends.postgresql',
+    'postgresql': 'django.db.backends.postgresql',
+    'pgsql': 'django.db.backends.postgresql',
+    'mysql': 'django.db.backends.mysql',
+}
+
+REPLICA_PREFIX = 'replica'
+
+
+def database_config(url, base_dir=None, conn_max_age=60, health_checks=True, busy_timeout_ms=5000):
+    """Build a DATABASES entry from `url` (sqlite:///relative.db, sqlite:////abs.db, postgres://u:p@h:5432/db)."""
+    scheme = url.split(':', 1)[0].lower()
+    if scheme not in ENGINES:
+        raise ValueError(f'Unsupported DATABASE_URL scheme: {scheme!r}')
+    engine = ENGINES[scheme]
+
+    if engine == 'django.db.backends.sqlite3':
+        path = url.split(':///', 1)[1] if ':///' in url else ''
+        path, _, query = path.partition('?')
+        if path in ('', ':memory:'):
+            name = ':memory:'
+        elif path.startswith('/'):
+            name = Path(path)
+        else:
+            name = Path(base_dir or '.') / path
+        config = {
+            'ENGINE': engine,
+            'NAME': name,
+            # SQLite connections are cheap and per-thread; keeping them avoids re-running pragmas
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': health_checks,
+            'OPTIONS': {'timeout': busy_timeout_ms / 1000},
+        }
+        if django.VERSION >= (5, 1):
+            # take the write lock at BEGIN: read-then-write transactions cannot deadlock on upgrade
+            config['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+        config['OPTIONS'].update(dict(parse_qsl(query)))
+        return config
+
+    parsed = urlparse(url)
+    return {
+        'ENGINE': engine,
+        'NAME': unquote(parsed.path.lstrip('/')),
+        'USER': unquote(parsed.username or ''),
+        'PASSWORD': unquote(parsed.password or ''),
+        'HOST': parsed.hostname or '',
+        'PORT': str(parsed.port or ''),
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': health_checks,
+        'OPTIONS': dict(parse_qsl(parsed.query)),
+    }
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created handler: WAL journal, relaxed fsync and a busy timeout for SQLite."""
+    if connection.vendor != 'sqlite' or connection.settings_dict['NAME'] in (':memory:', ''):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        # NORMAL is durable in WAL mode except for the last commits on power loss
+        cursor.execute(f"PRAGMA synchronous={getattr(settings, 'SQLITE_SYNCHRONOUS', 'NORMAL')}")
+        cursor.execute(f"PRAGMA busy_timeout={int(getattr(settings, 'SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+
+
+# ---- read replicas ----------------------------------------------------------
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+def read_replica(view):
+    """Decorator for read-only views: their queries go to a replica when one is configured."""
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        token = _use_replica.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapped
+
+
+class ReplicaRouter:
+    """Reads inside `read_replica` views go to a random replica; everything else to default."""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            replicas = replica_aliases()
+            if replicas:
+                return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas mirror default, so objects from either may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,73 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+
+def _connect(path, tuned, busy_ms):
+    conn = sqlite3.connect(path, timeout=busy_ms / 1000, isolation_level=None, check_same_thread=False)
+    if tuned:
+        # what core.db.configure_sqlite + transaction_mode=IMMEDIATE give Django connections;
+        # untuned is Django's previous default: rollback journal, deferred transactions
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={busy_ms}')
+    return conn
+
+
+class Command(BaseCommand):
+    help = 'Concurrent read-then-write transactions on a scratch SQLite file: default vs WAL/IMMEDIATE settings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=3.0)
+        parser.add_argument('--busy-ms', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'mode':>8} {'commits/s':>10} {'lock errors':>12}")
+        for tuned in (False, True):
+            commits, errors = self._run(tuned, options)
+            self.stdout.write(f"{'tuned' if tuned else 'default':>8} {commits / options['seconds']:>10.1f} {errors:>12}")
+
+    def _run(self, tuned, options):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.sqlite3')
+            setup = _connect(path, tuned, options['busy_ms'])
+            setup.execute('CREATE TABLE likes (id INTEGER PRIMARY KEY, post INTEGER, n INTEGER)')
+            setup.execute('INSERT INTO likes (post, n) VALUES (1, 0)')
+            setup.close()
+
+            stop = time.monotonic() + options['seconds']
+            totals = {'commits': 0, 'errors': 0}
+            lock = threading.Lock()
+            begin = 'BEGIN IMMEDIATE' if tuned else 'BEGIN'
+
+            def worker():
+                conn = _connect(path, tuned, options['busy_ms'])
+                commits = errors = 0
+                while time.monotonic() < stop:
+                    try:
+                        conn.execute(begin)
+                        # like a signup/like view: read, then write in the same transaction
+                        conn.execute('SELECT n FROM likes WHERE post = 1').fetchone()
+                        conn.execute('INSERT INTO likes (post, n) VALUES (2, 1)')
+                        conn.execute('COMMIT')
+                        commits += 1
+                    except sqlite3.OperationalError:
+                        errors += 1
+                        if conn.in_transaction:
+                            conn.execute('ROLLBACK')
+                conn.close()
+                with lock:
+                    totals['commits'] += commits
+                    totals['errors'] += errors
+
+            threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            return totals['commits'], totals['errors']
@@ -0,0 +1,202 @@
+"""Request metrics aggregated across worker processes, exported as Prometheus text.
+
+Observations are buffered per process in plain dicts (a lock and a few
+additions per request) and flushed every METRICS_FLUSH_SECONDS into
+MetricSeries rows: one INSERT of the new series, then one UPDATE adding
+every delta (`value = value + CASE name ...`), so every worker adds to the
+same totals in the database. `render()` reads the totals back for the
+/metrics view.
+
+Series are stored under their exposition name (e.g.
+`http_requests_total{view="login",status="200"}`) with integer values;
+seconds are kept as microseconds and scaled back when rendered.
+"""
+import atexit
+import contextvars
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, F, Value, When
+
+from .models import MetricSeries
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help); names ending in "_seconds_sum"/"_seconds_total" are stored in microseconds
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Request latency by resolved view.'),
+    'http_requests_total': ('counter', 'Requests by resolved view and status code.'),
+    'db_queries_total': ('counter', 'Database queries issued while serving a view.'),
+    'db_query_seconds_total': ('counter', 'Time spent in database queries while serving a view.'),
+    'email_send_seconds_total': ('counter', 'Time spent talking to the email backend.'),
+    'emails_sent_total': ('counter', 'Messages handed to the email backend.'),
+    'response_cache_total': ('counter', 'core.conditional lookups by scope and outcome.'),
+    'jwt_blacklist_checks_total': ('counter', 'Refresh token blacklist checks by outcome (filtered = no query).'),
+    'jwt_tokens_pruned_total': ('counter', 'Outstanding refresh tokens deleted by prune_tokens, by reason.'),
+    'db_table_rows': ('gauge', 'Rows per table (estimated on PostgreSQL), as of the last measurement.'),
+}
+
+# view label for work done outside a request (outbox worker, commands)
+_current_view = contextvars.ContextVar('metrics_view', default='background')
+
+_lock = threading.Lock()
+_pending = defaultdict(int)
+_last_flush = time.monotonic()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _series(name, **labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}'
+
+
+def _us(seconds):
+    return int(seconds * 1_000_000)
+
+
+def set_view(view):
+    """Label observations made from here on (see observe_email) with `view`; returns a reset token."""
+    return _current_view.set(view)
+
+
+def reset_view(token):
+    _current_view.reset(token)
+
+
+def inc(name, value=1, **labels):
+    with _lock:
+        _pending[_series(name, **labels)] += value
+    flush_if_due()
+
+
+def set_gauge(name, value, **labels):
+    """Overwrite a gauge in the shared store right away (gauges are not summed across processes)."""
+    try:
+        with transaction.atomic():
+            MetricSeries.objects.update_or_create(name=_series(name, **labels), defaults={'value': value})
+    except Exception:
+        pass
+
+
+def observe_request(view, status, seconds, queries, query_seconds):
+    le = next((b for b in LATENCY_BUCKETS if seconds <= b), None)
+    with _lock:
+        # buckets are stored non-cumulative and summed up in render()
+        _pending[_series('http_request_duration_seconds_bucket', view=view, le=le if le is not None else '+Inf')] += 1
+        _pending[_series('http_request_duration_seconds_sum', view=view)] += _us(seconds)
+        _pending[_series('http_request_duration_seconds_count', view=view)] += 1
+        _pending[_series('http_requests_total', view=view, status=status)] += 1
+        if queries:
+            _pending[_series('db_queries_total', view=view)] += queries
+            _pending[_series('db_query_seconds_total', view=view)] += _us(query_seconds)
+    flush_if_due()
+
+
+def observe_email(seconds, messages, view=None):
+    """Time spent handing `messages` to the email backend, labelled `view` (the current view by default)."""
+    view = view or _current_view.get()
+    with _lock:
+        _pending[_series('email_send_seconds_total', view=view)] += _us(seconds)
+        _pending[_series('emails_sent_total', view=view)] += messages
+    flush_if_due()
+
+
+def flush_if_due():
+    if _pending and time.monotonic() - _last_flush >= _setting('METRICS_FLUSH_SECONDS', 10):
+        flush()
+
+
+def flush():
+    """Add the buffered deltas to the shared totals."""
+    global _pending, _last_flush
+    with _lock:
+        pending, _pending = _pending, defaultdict(int)
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+    try:
+        # a savepoint when called inside a transaction: a failed flush leaves it usable
+        with transaction.atomic():
+            MetricSeries.objects.bulk_create([MetricSeries(name=s) for s in pending], ignore_conflicts=True)
+            names = list(pending)
+            for start in range(0, len(names), 500):
+                chunk = names[start:start + 500]
+                delta = Case(*[When(name=s, then=Value(pending[s])) for s in chunk], output_field=BigIntegerField())
+                MetricSeries.objects.filter(name__in=chunk).update(value=F('value') + delta)
+    except Exception:
+        # metrics must never fail a request; keep the deltas for the next flush
+        with _lock:
+            for series, delta in pending.items():
+                _pending[series] += delta
+
+
+def _split(series):
+    name, _, labels = series.partition('{')
+    return name, labels.rstrip('}')
+
+
+def _le(labels):
+    le = labels.rsplit('le="', 1)[1].rstrip('"')
+    return float('inf') if le == '+Inf' else float(le)
+
+
+def render():
+    """Prometheus text exposition of the shared totals (plus this process's unflushed deltas)."""
+    flush()
+    by_metric = defaultdict(list)
+    for s, value in MetricSeries.objects.order_by('name').values_list('name', 'value'):
+        name, labels = _split(s)
+        for suffix in ('_bucket', '_sum', '_count'):
+            if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+                name = name[:-len(suffix)]
+                break
+        by_metric[name].append((s, value))
+
+    lines = []
+    for name in sorted(by_metric):
+        kind, help_text = METRICS.get(name, ('untyped', ''))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            lines.extend(_histogram_lines(name, by_metric[name]))
+            continue
+        for s, value in by_metric[name]:
+            lines.append(f'{s} {_format(s, value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(name, samples):
+    buckets, others = defaultdict(dict), []
+    for s, value in samples:
+        metric, labels = _split(s)
+        if metric.endswith('_bucket'):
+            view_labels = labels.rsplit(',le=', 1)[0]
+            buckets[view_labels][_le(labels)] = value
+        else:
+            others.append((s, value))
+    lines = []
+    for view_labels, counts in sorted(buckets.items()):
+        running = 0
+        for bound in LATENCY_BUCKETS + (float('inf'),):
+            running += counts.get(bound, 0)
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_bucket{{{view_labels},le="{le}"}} {running}')
+    lines.extend(f'{s} {_format(s, value)}' for s, value in others)
+    return lines
+
+
+def _format(series, value):
+    name = _split(series)[0]
+    if name.endswith('_seconds_sum') or name.endswith('_seconds_total'):
+        return f'{value / 1_000_000:.6f}'
+    return str(value)
+
+
+atexit.register(flush)
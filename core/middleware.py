@@ -0,0 +1,105 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+slow_logger = logging.getLogger('core.slow_requests')
+
+
+class MetricsMiddleware:
+    """
+    Record latency, status and DB query count/time per resolved view
+    (see core.metrics). Queries are timed with an execute wrapper, not
+    DEBUG's query log. A sampled share of requests (METRICS_SLOW_SAMPLE_RATE)
+    also keeps its SQL and is logged to `core.slow_requests` when slower
+    than METRICS_SLOW_REQUEST_SECONDS. Works in both sync and async stacks, so
+    under ASGI async views such as the notification stream need no thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer, sampled = self._timer()
+        token = metrics.set_view('unresolved')
+        started = time.perf_counter()
+        try:
+            with self._timing(timer):
+                response = self.get_response(request)
+        finally:
+            metrics.reset_view(token)
+        return self._record(request, response, timer, sampled, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        timer, sampled = self._timer()
+        token = metrics.set_view('unresolved')
+        started = time.perf_counter()
+        # connections are per thread, and an async view queries from the request's
+        # sync_to_async thread (one per request under ASGI); wrap that thread's
+        timing = await sync_to_async(self._timing)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(timing.close)()
+            metrics.reset_view(token)
+        # recording may flush to the shared store, which is blocking I/O
+        return await sync_to_async(self._record)(request, response, timer, sampled, time.perf_counter() - started)
+
+    def _timer(self):
+        sampled = random.random() < getattr(settings, 'METRICS_SLOW_SAMPLE_RATE', 0.0)
+        return _QueryTimer(capture_sql=sampled), sampled
+
+    def _timing(self, timer):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        return stack
+
+    def _record(self, request, response, timer, sampled, elapsed):
+        match = request.resolver_match
+        # unresolved paths (404s) share one label so scanners cannot blow up the series count
+        view = match.view_name if match else 'unresolved'
+        metrics.observe_request(view, response.status_code, elapsed, timer.count, timer.seconds)
+
+        if sampled and elapsed >= getattr(settings, 'METRICS_SLOW_REQUEST_SECONDS', 1.0):
+            slow_logger.warning(
+                'slow request %s %s -> %s (%s) %.3fs, %d queries in %.3fs\n%s',
+                request.method, request.path, view, response.status_code, elapsed, timer.count, timer.seconds,
+                '\n'.join(f'  {duration * 1000:.1f}ms {sql}' for sql, duration in timer.statements),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # observations made while the view runs (see metrics.set_view) are labelled with it too
+        metrics.set_view(request.resolver_match.view_name)
+
+
+class _QueryTimer:
+
+    def __init__(self, capture_sql=False):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = [] if capture_sql else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.seconds += duration
+            if self.statements is not None:
+                self.statements.append((sql, duration))
@@ -0,0 +1,27 @@
+from django.db import models
+
+
+class MetricSeries(models.Model):
+    """Running total (or gauge value) of one Prometheus series, summed over every worker by core.metrics."""
+    # exposition name with labels, e.g. http_requests_total{view="login",status="200"}
+    name = models.CharField(max_length=255, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} {self.value}"
+
+
+class ResponseVersion(models.Model):
+    """Last version seeded for one core.conditional resource; new seeds start above it."""
+    scope = models.CharField(max_length=32)
+    ident = models.CharField(max_length=64)
+    # microseconds since the epoch of the last seed (bumps only touch the cache)
+    version = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'ident'], name='response_version_uniq'),
+        ]
+
+    def __str__(self):
+        return f"ResponseVersion({self.scope}:{self.ident}={self.version})"
@@ -0,0 +1,91 @@
+"""Keyset (cursor) pagination helpers shared by the list endpoints.
+
+Cursors are opaque urlsafe-base64 strings wrapping the `(created_at, id)` of
+the last row on a page, so fetching page N costs the same as page one.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at, pk):
+    raw = json.dumps([created_at.isoformat(), pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return `(created_at, pk)` for a cursor string; raises ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_raw, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = parse_datetime(created_raw)
+    except Exception as exc:
+        raise ValueError('invalid cursor') from exc
+    if created_at is None or not isinstance(pk, int):
+        raise ValueError('invalid cursor')
+    return created_at, pk
+
+
+def encode_values(*values):
+    """Opaque cursor for an arbitrary JSON-serializable sort key, e.g. `(score, pk)`."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_values(cursor, count):
+    """Inverse of `encode_values`; raises ValueError unless it holds `count` values."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as exc:
+        raise ValueError('invalid cursor') from exc
+    if not isinstance(values, list) or len(values) != count:
+        raise ValueError('invalid cursor')
+    return values
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def keyset_filter(queryset, cursor, fields=('created_at', 'id')):
+    """Restrict `queryset` to rows strictly after `cursor` in `fields` descending order."""
+    if not cursor:
+        return queryset
+    created_at, pk = decode_cursor(cursor) if isinstance(cursor, str) else cursor
+    time_field, pk_field = fields
+    return queryset.filter(
+        Q(**{f'{time_field}__lt': created_at}) | Q(**{time_field: created_at, f'{pk_field}__lt': pk})
+    )
+
+
+def keyset_page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE, fields=('created_at', 'id')):
+    """
+    Return `(rows, next_cursor)` for one page ordered newest first.
+    `next_cursor` is None on the last page.
+    """
+    time_field, pk_field = fields
+    qs = keyset_filter(queryset, cursor, fields).order_by(f'-{time_field}', f'-{pk_field}')
+    rows = list(qs[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(_attr(last, time_field), _attr(last, pk_field))
+    return rows, next_cursor
+
+
+def _attr(obj, field):
+    # rows may be model instances or .values() dicts
+    if isinstance(obj, dict):
+        return obj[field]
+    return getattr(obj, field)
@@ -0,0 +1,116 @@
+import tempfile
+import threading
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.test import SimpleTestCase, TestCase
+
+from core import metrics
+from core.db import database_config
+from core.models import MetricSeries
+from outbox.queue import enqueue, send_batch
+from users.tokens import VersionedRefreshToken
+
+
+class SQLiteConcurrencyTests(SimpleTestCase):
+    """Connections built by database_config (and set up by configure_sqlite) under concurrent writers."""
+
+    alias = 'concurrency'
+    threads = 8
+    writes = 25
+
+    @classmethod
+    def setUpClass(cls):
+        # a scratch file database, added after the runner has set up the test databases
+        tmp = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(tmp.cleanup)
+        config = database_config('sqlite:///concurrency.sqlite3', base_dir=tmp.name)
+        connections.settings[cls.alias] = connections.configure_settings({'default': config})['default']
+        cls.addClassCleanup(connections.settings.pop, cls.alias)
+        cls.databases = {cls.alias}
+        super().setUpClass()
+
+    def setUp(self):
+        self.addCleanup(connections[self.alias].close)
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS counter')
+            cursor.execute('CREATE TABLE counter (id INTEGER PRIMARY KEY, n INTEGER NOT NULL)')
+            cursor.execute('INSERT INTO counter (id, n) VALUES (1, 0)')
+
+    def test_connections_use_wal_and_a_busy_timeout(self):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_concurrent_read_then_write_transactions_all_commit(self):
+        errors = []
+        start = threading.Barrier(self.threads)
+
+        def worker():
+            try:
+                start.wait()
+                for _ in range(self.writes):
+                    # read, then write in the same transaction, like a like or a signup
+                    with transaction.atomic(using=self.alias), connections[self.alias].cursor() as cursor:
+                        cursor.execute('SELECT n FROM counter WHERE id = 1')
+                        n = cursor.fetchone()[0]
+                        cursor.execute('UPDATE counter SET n = %s WHERE id = 1', [n + 1])
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections[self.alias].close()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('SELECT n FROM counter WHERE id = 1')
+            # no lost updates: BEGIN IMMEDIATE serializes the read with the write
+            self.assertEqual(cursor.fetchone()[0], self.threads * self.writes)
+
+
+class MetricsTests(TestCase):
+    def test_flush_adds_to_the_shared_totals(self):
+        metrics.flush()
+        MetricSeries.objects.all().delete()
+        metrics.observe_request('login', 200, 0.02, 3, 0.001)
+        metrics.flush()
+        # another process's deltas land on the same rows
+        metrics.observe_request('login', 200, 0.2, 1, 0.002)
+        metrics.inc('jwt_blacklist_checks_total', outcome='filtered')
+        metrics.flush()
+        totals = dict(MetricSeries.objects.values_list('name', 'value'))
+        self.assertEqual(totals['http_requests_total{view="login",status="200"}'], 2)
+        self.assertEqual(totals['db_queries_total{view="login"}'], 4)
+        self.assertEqual(totals['http_request_duration_seconds_sum{view="login"}'], 220_000)
+        self.assertEqual(totals['jwt_blacklist_checks_total{outcome="filtered"}'], 1)
+
+        text = metrics.render()
+        self.assertIn('http_request_duration_seconds_bucket{view="login",le="0.025"} 1\n', text)
+        self.assertIn('http_request_duration_seconds_bucket{view="login",le="0.25"} 2\n', text)
+        self.assertIn('http_request_duration_seconds_sum{view="login"} 0.220000\n', text)
+
+    async def test_async_views_count_queries_made_through_sync_to_async(self):
+        user = await get_user_model().objects.acreate(username='cook', email='cook@example.com')
+        token = await sync_to_async(lambda: str(VersionedRefreshToken.for_user(user).access_token))()
+        with mock.patch('core.metrics.observe_request') as observe:
+            response = await self.async_client.get('/notifications/stream/', headers={'authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        view, status, _, queries, _ = observe.call_args.args
+        # the JWT user lookup, run in the request's sync thread
+        self.assertEqual((view, status, queries), ('notification_stream', 200, 1))
+
+    def test_outbox_sends_are_labelled_email(self):
+        metrics.flush()
+        enqueue('Hello', 'Body', ['kid@example.com'])
+        send_batch()
+        metrics.flush()
+        self.assertTrue(MetricSeries.objects.filter(name='emails_sent_total{view="email"}', value=1).exists())
@@ -1,12 +1,31 @@
+from django.conf import settings
 from django.urls import path, include
 from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from . import metrics as metrics_store
 
 
 def health(request):
     return HttpResponse('OK')
 
+
+def metrics(request):
+    """Prometheus scrape endpoint; see core.metrics."""
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not constant_time_compare(supplied, settings.METRICS_TOKEN):
+            return HttpResponse(status=403)
+    return HttpResponse(metrics_store.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 urlpatterns = [
     path('', health, name='health'),
+    path('metrics', metrics, name='metrics'),
     path('users/', include('users.urls')),
-    # posts and followers can be added similarly
+    path('posts/', include('posts.urls')),
+    path('followers/', include('followers.urls')),
+    path('search/', include('search.urls')),
+    path('notifications/', include('notifications.urls')),
+    path('media/', include('media.urls')),
+    path('exports/', include('exports.urls')),
 ]
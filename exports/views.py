@@ -0,0 +1,44 @@
+import random
+
+from django.http import StreamingHttpResponse
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from core.db import replica_aliases
+
+from .stream import Export, parse_watermark
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export(request, dataset):
+    """
+    GET /exports/<users|posts|comments|likes|followers>/?type=jsonl|csv&gzip=1&since=<watermark>
+    -> the rows as a streamed download. The X-Export-Watermark header is the
+    `since` to pass next time to get only newer rows.
+    """
+    params = request.query_params
+    try:
+        since = parse_watermark(params['since']) if params.get('since') else None
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    # the body is produced after this view returns, outside read_replica's scope: pick the database now
+    replicas = replica_aliases()
+    try:
+        rows = Export(
+            dataset, fmt=params.get('type', 'jsonl'), compress=params.get('gzip') in ('1', 'true'),
+            since=since, using=random.choice(replicas) if replicas else 'default',
+        )
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(rows, content_type=rows.content_type)
+    response['Content-Disposition'] = f'attachment; filename="{rows.filename}"'
+    response['X-Export-Watermark'] = rows.until.isoformat()
+    response['Cache-Control'] = 'no-store'
+    # nginx would otherwise buffer the whole file
+    response['X-Accel-Buffering'] = 'no'
+    return response
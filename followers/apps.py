@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class FollowersConfig(AppConfig):
+    name = 'followers'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,309 @@
+"""Follower graph service.
+
+`Follower(user=B, follower=A)` means A follows B. This module keeps per-user
+follower/following totals in FollowStats (fronted by the cache), answers
+relationship questions for a whole page of users in one query, and keeps
+friends-of-friends suggestions up to date as edges are added and removed.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import Greatest, RowNumber
+
+from .models import Follower, FollowStats, FollowSuggestion
+
+COUNTS_KEY = 'follow:counts:{}'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ---- counts -----------------------------------------------------------------
+
+def counts_for(user_ids):
+    """Return `{user_id: {'followers_count': n, 'following_count': n}}` for many users (at most one query)."""
+    user_ids = list(user_ids)
+    keys = {COUNTS_KEY.format(uid): uid for uid in user_ids}
+    cached = cache.get_many(keys.keys())
+    result = {keys[k]: v for k, v in cached.items()}
+    missing = [uid for uid in user_ids if uid not in result]
+    if missing:
+        found = {
+            uid: {'followers_count': followers, 'following_count': following}
+            for uid, followers, following in FollowStats.objects.filter(user_id__in=missing)
+            .values_list('user_id', 'followers_count', 'following_count')
+        }
+        fresh = {uid: found.get(uid, {'followers_count': 0, 'following_count': 0}) for uid in missing}
+        cache.set_many({COUNTS_KEY.format(uid): v for uid, v in fresh.items()}, _setting('FOLLOW_COUNTS_CACHE_SECONDS', 300))
+        result.update(fresh)
+    return result
+
+
+def _bump_stats(user_id, field, delta):
+    updated = FollowStats.objects.filter(user_id=user_id).update(**{field: Greatest(F(field) + delta, 0)})
+    if not updated and delta > 0:
+        FollowStats.objects.get_or_create(user_id=user_id, defaults={field: delta})
+    cache.delete(COUNTS_KEY.format(user_id))
+
+
+def _bump_stats_many(user_ids, field, delta):
+    """_bump_stats for many users in two statements."""
+    if delta > 0:
+        FollowStats.objects.bulk_create([FollowStats(user_id=uid) for uid in user_ids], ignore_conflicts=True)
+    FollowStats.objects.filter(user_id__in=user_ids).update(**{field: Greatest(F(field) + delta, 0)})
+    cache.delete_many([COUNTS_KEY.format(uid) for uid in user_ids])
+
+
+# ---- relationships ----------------------------------------------------------
+
+def relationships(viewer_id, user_ids):
+    """
+    Return `{user_id: {'following': bool, 'followed_by': bool}}` describing how
+    `viewer` relates to each of `user_ids`, using a single query.
+    """
+    user_ids = set(user_ids)
+    result = {uid: {'following': False, 'followed_by': False} for uid in user_ids}
+    edges = Follower.objects.filter(
+        Q(follower_id=viewer_id, user_id__in=user_ids) | Q(user_id=viewer_id, follower_id__in=user_ids)
+    ).values_list('user_id', 'follower_id')
+    for followee, follower in edges:
+        if follower == viewer_id and followee in result:
+            result[followee]['following'] = True
+        if followee == viewer_id and follower in result:
+            result[follower]['followed_by'] = True
+    return result
+
+
+def mutual_ids(user_id):
+    """Ids of users who follow `user_id` and are followed back."""
+    followers = Follower.objects.filter(user_id=user_id).values('follower_id')
+    return list(
+        Follower.objects.filter(follower_id=user_id, user_id__in=followers).values_list('user_id', flat=True)
+    )
+
+
+# ---- friends-of-friends suggestions ----------------------------------------
+
+def suggestions(user_id, limit=20):
+    """Top suggested users for `user_id` as `[(candidate_id, score)]`, best first."""
+    return list(
+        FollowSuggestion.objects.filter(user_id=user_id)
+        .exclude(candidate_id__in=Follower.objects.filter(follower_id=user_id).values('user_id'))
+        .order_by('-score', 'candidate_id').values_list('candidate_id', 'score')[:limit]
+    )
+
+
+def _adjust(user_id, candidate_ids, delta):
+    """Add `delta` to (user, candidate) scores for one user and many candidates."""
+    candidate_ids = set(candidate_ids) - {user_id}
+    if not candidate_ids:
+        return
+    rows = FollowSuggestion.objects.filter(user_id=user_id, candidate_id__in=candidate_ids)
+    _apply(rows, delta, [FollowSuggestion(user_id=user_id, candidate_id=c, score=delta) for c in candidate_ids])
+    if delta > 0:
+        _trim([user_id])
+
+
+def _adjust_users(user_ids, candidate_id, delta):
+    """Add `delta` to (user, candidate) scores for many users and one candidate."""
+    user_ids = set(user_ids) - {candidate_id}
+    if not user_ids:
+        return
+    rows = FollowSuggestion.objects.filter(user_id__in=user_ids, candidate_id=candidate_id)
+    _apply(rows, delta, [FollowSuggestion(user_id=u, candidate_id=candidate_id, score=delta) for u in user_ids])
+    if delta > 0:
+        _trim(user_ids)
+
+
+def _apply(rows, delta, new_rows):
+    if delta > 0:
+        # bump existing pairs first, then insert the rest (conflicts are the rows just bumped)
+        rows.update(score=F('score') + delta)
+        FollowSuggestion.objects.bulk_create(new_rows, ignore_conflicts=True)
+    else:
+        rows.filter(score__lte=-delta).delete()
+        rows.update(score=F('score') + delta)
+
+
+def _trim(user_ids):
+    """Drop all but each user's top FOLLOW_SUGGESTIONS_PER_USER rows, as rebuild_suggestions keeps."""
+    keep = _setting('FOLLOW_SUGGESTIONS_PER_USER', 50)
+    over = (
+        FollowSuggestion.objects.filter(user_id__in=user_ids).order_by().values('user_id')
+        .annotate(n=Count('id')).filter(n__gt=keep).values_list('user_id', flat=True)
+    )
+    for uid in over:
+        rows = FollowSuggestion.objects.filter(user_id=uid)
+        top = list(rows.order_by('-score', 'candidate_id').values_list('pk', flat=True)[:keep])
+        rows.exclude(pk__in=top).delete()
+
+
+def _fan_limit():
+    return _setting('FOLLOW_SUGGESTION_FANOUT', 1000)
+
+
+def _followed_by(user_id):
+    """Up to the fan-out limit of the users `user_id` follows, lowest id first (the follower_follows_idx order)."""
+    return Follower.objects.filter(follower_id=user_id).order_by('user_id').values_list('user_id', flat=True)[:_fan_limit()]
+
+
+def _followers_of(user_id):
+    """Up to the fan-out limit of `user_id`'s followers, lowest id first (the unique index order)."""
+    return Follower.objects.filter(user_id=user_id).order_by('follower_id').values_list('follower_id', flat=True)[:_fan_limit()]
+
+
+def _followed_by_many(user_ids):
+    """The `_followed_by` slices of many users in one windowed query, concatenated (ids repeat across slices)."""
+    ranked = Follower.objects.filter(follower_id__in=user_ids).annotate(
+        rank=Window(RowNumber(), partition_by=F('follower_id'), order_by=F('user_id').asc()),
+    )
+    return ranked.filter(rank__lte=_fan_limit()).values_list('user_id', flat=True)
+
+
+def on_follow(follower_id, followee_id):
+    """Update counts and suggestions after `follower` starts following `followee`."""
+    with transaction.atomic():
+        _bump_stats(followee_id, 'followers_count', 1)
+        _bump_stats(follower_id, 'following_count', 1)
+        # people followee follows become candidates for follower; a fixed order
+        # keeps the slice on_unfollow subtracts from the one added to here
+        _adjust(follower_id, _followed_by(followee_id), 1)
+        # followee becomes a candidate for everyone who follows the follower
+        _adjust_users(_followers_of(follower_id), followee_id, 1)
+
+
+def on_follow_many(follower_id, followee_ids):
+    """on_follow for many followees of one follower, in statements that do not grow with the followees."""
+    followee_ids = set(followee_ids) - {follower_id}
+    if not followee_ids:
+        return
+    with transaction.atomic():
+        _bump_stats_many(followee_ids, 'followers_count', 1)
+        _bump_stats(follower_id, 'following_count', len(followee_ids))
+
+        # a candidate scores once per followee whose slice holds it; one statement pair per distinct score
+        by_score = defaultdict(list)
+        for candidate_id, score in Counter(_followed_by_many(followee_ids)).items():
+            if candidate_id != follower_id:
+                by_score[score].append(candidate_id)
+        for score, candidate_ids in by_score.items():
+            rows = FollowSuggestion.objects.filter(user_id=follower_id, candidate_id__in=candidate_ids)
+            _apply(rows, score, [FollowSuggestion(user_id=follower_id, candidate_id=c, score=score) for c in candidate_ids])
+
+        fans = set(_followers_of(follower_id))
+        rows = FollowSuggestion.objects.filter(user_id__in=fans, candidate_id__in=followee_ids)
+        _apply(rows, 1, [
+            FollowSuggestion(user_id=u, candidate_id=c, score=1) for u in fans for c in followee_ids if u != c
+        ])
+        _trim(fans | {follower_id})
+
+
+def on_unfollow(follower_id, followee_id):
+    """Reverse of on_follow; followee may become a suggestion again if friends still follow them."""
+    with transaction.atomic():
+        _bump_stats(followee_id, 'followers_count', -1)
+        _bump_stats(follower_id, 'following_count', -1)
+        _adjust(follower_id, _followed_by(followee_id), -1)
+        _adjust_users(_followers_of(follower_id), followee_id, -1)
+        # recompute the one pair that was excluded while the edge existed
+        score = Follower.objects.filter(
+            user_id=followee_id,
+            follower_id__in=Follower.objects.filter(follower_id=follower_id).values('user_id'),
+        ).count()
+        if score:
+            FollowSuggestion.objects.update_or_create(
+                user_id=follower_id, candidate_id=followee_id, defaults={'score': score},
+            )
+
+
+# ---- batch follow / unfollow --------------------------------------------------
+
+def follow_many(follower_id, user_ids):
+    """
+    Follow every user in `user_ids` (which must exist) with one insert;
+    returns the ids this call followed. bulk_create sends no post_save, so
+    the feed backfill, graph updates and notifications the signals would
+    produce are scheduled here, batched across all the new followees.
+    """
+    from notifications.inbox import notify_follows
+    from posts import feed
+
+    existing = set(
+        Follower.objects.filter(follower_id=follower_id, user_id__in=user_ids).values_list('user_id', flat=True)
+    )
+    new = [uid for uid in dict.fromkeys(user_ids) if uid not in existing and uid != follower_id]
+    if not new:
+        return new
+    edges = [Follower(user_id=uid, follower_id=follower_id) for uid in new]
+    Follower.objects.bulk_create(edges, ignore_conflicts=True)
+    # as in posts.likes.like_many: an edge a concurrent follow inserted keeps its own created_at
+    stamped = {edge.user_id: edge.created_at for edge in edges}
+    stored = Follower.objects.filter(follower_id=follower_id, user_id__in=new).values_list('user_id', 'created_at')
+    inserted = {uid for uid, created_at in stored if stamped[uid] == created_at}
+    new = [uid for uid in new if uid in inserted]
+    if not new:
+        return new
+
+    def after_commit():
+        on_follow_many(follower_id, new)
+        feed.backfill_many(follower_id, new)
+        notify_follows(follower_id, new)
+    transaction.on_commit(after_commit)
+    return new
+
+
+def unfollow_many(follower_id, user_ids):
+    """Unfollow `user_ids` with one queryset delete (its post_delete signals update feed and graph)."""
+    return Follower.objects.filter(follower_id=follower_id, user_id__in=user_ids).delete()[1].get(Follower._meta.label, 0)
+
+
+# ---- bulk rebuild -----------------------------------------------------------
+
+def rebuild_stats():
+    """Recompute every FollowStats row from Follower. Returns the number of users with edges."""
+    totals = {}
+    for uid, n in Follower.objects.values('user_id').annotate(n=Count('id')).values_list('user_id', 'n'):
+        totals.setdefault(uid, [0, 0])[0] = n
+    for uid, n in Follower.objects.values('follower_id').annotate(n=Count('id')).values_list('follower_id', 'n'):
+        totals.setdefault(uid, [0, 0])[1] = n
+    with transaction.atomic():
+        FollowStats.objects.all().delete()
+        FollowStats.objects.bulk_create(
+            [FollowStats(user_id=uid, followers_count=a, following_count=b) for uid, (a, b) in totals.items()],
+            batch_size=1000,
+        )
+    cache.delete_many([COUNTS_KEY.format(uid) for uid in totals])
+    return len(totals)
+
+
+def rebuild_suggestions(user_ids, keep=None):
+    """
+    Recompute suggestions for a chunk of users with one grouped join:
+    candidate C scores one point for every B such that user -> B -> C.
+    """
+    keep = keep or _setting('FOLLOW_SUGGESTIONS_PER_USER', 50)
+    user_ids = list(user_ids)
+    # f2 = (B follows C); its follower (B) is followed by the user (via f1)
+    pairs = (
+        Follower.objects.filter(follower__following__follower_id__in=user_ids)
+        .values('follower__following__follower_id', 'user_id')
+        .annotate(score=Count('id'))
+    )
+    already = set(Follower.objects.filter(follower_id__in=user_ids).values_list('follower_id', 'user_id'))
+    ranked = {}
+    for row in pairs:
+        uid, cid = row['follower__following__follower_id'], row['user_id']
+        if uid != cid and (uid, cid) not in already:
+            ranked.setdefault(uid, []).append((row['score'], cid))
+    rows = []
+    for uid, scored in ranked.items():
+        scored.sort(key=lambda sc: (-sc[0], sc[1]))
+        rows.extend(FollowSuggestion(user_id=uid, candidate_id=cid, score=s) for s, cid in scored[:keep])
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user_id__in=user_ids).delete()
+        FollowSuggestion.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,36 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from followers import graph
+from followers.models import Follower
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recompute follower counts and friends-of-friends suggestions from the Follower table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='users per suggestion rebuild query')
+        parser.add_argument('--skip-suggestions', action='store_true')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        users = graph.rebuild_stats()
+        self.stdout.write(f"rebuilt follow counts for {users} users")
+        if options['skip_suggestions']:
+            return
+
+        chunk = options['chunk_size']
+        follower_ids = Follower.objects.values_list('follower_id', flat=True).distinct().order_by('follower_id')
+        batch, total = [], 0
+        for uid in follower_ids.iterator():
+            batch.append(uid)
+            if len(batch) >= chunk:
+                total += graph.rebuild_suggestions(batch)
+                batch = []
+        if batch:
+            total += graph.rebuild_suggestions(batch)
+        self.stdout.write(f"wrote {total} suggestions in {time.monotonic() - started:.2f}s")
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('followers', '0002_follow_stats_and_suggestions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follower',
+            index=models.Index(fields=['created_at', 'id'], name='follower_created_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('followers', '0003_export_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='followstats',
+            index=models.Index(fields=['followers_count'], name='followstats_followers_idx'),
+        ),
+    ]
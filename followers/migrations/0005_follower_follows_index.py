@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('followers', '0004_followstats_followers_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follower',
+            index=models.Index(fields=['follower', 'user'], name='follower_follows_idx'),
+        ),
+    ]
@@ -9,6 +9,44 @@ class Follower(models.Model):
 
     class Meta:
         unique_together = ('user', 'follower')
+        indexes = [
+            # exports walk the whole table in (created_at, id) order, from a watermark
+            models.Index(fields=['created_at', 'id'], name='follower_created_idx'),
+            # who a user follows, in user order: the fixed fan-out slice of followers.graph
+            models.Index(fields=['follower', 'user'], name='follower_follows_idx'),
+        ]
 
     def __str__(self):
         return f"{self.follower} -> {self.user}"
+
+
+class FollowStats(models.Model):
+    """Cached follower/following totals per user, maintained by followers.graph."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='follow_stats')
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # the few authors above FEED_FANOUT_LIMIT, whose posts feeds pull at read time
+            models.Index(fields=['followers_count'], name='followstats_followers_idx'),
+        ]
+
+    def __str__(self):
+        return f"FollowStats(user={self.user_id}, followers={self.followers_count}, following={self.following_count})"
+
+
+class FollowSuggestion(models.Model):
+    """Precomputed friends-of-friends candidate: `score` of the people `user` follows also follow `candidate`."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='follow_suggestions')
+    candidate = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    score = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'candidate')
+        indexes = [
+            models.Index(fields=['user', '-score'], name='suggestion_user_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"FollowSuggestion({self.user_id} -> {self.candidate_id}, score={self.score})"
@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import graph
+from .models import Follower
+
+
+@receiver(post_save, sender=Follower)
+def update_graph_on_follow(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: graph.on_follow(instance.follower_id, instance.user_id))
+
+
+@receiver(post_delete, sender=Follower)
+def update_graph_on_unfollow(sender, instance, **kwargs):
+    transaction.on_commit(lambda: graph.on_unfollow(instance.follower_id, instance.user_id))
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from followers import graph
+from followers.models import Follower, FollowSuggestion
+from posts.models import Post, TimelineEntry
+
+User = get_user_model()
+
+
+class SuggestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(username=f'cook{i}', email=f'cook{i}@example.com') for i in range(8)]
+
+    def _follow(self, follower, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            Follower.objects.create(follower=follower, user=user)
+
+    def _unfollow(self, follower, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            Follower.objects.get(follower=follower, user=user).delete()
+
+    def _scores(self, user):
+        return dict(FollowSuggestion.objects.filter(user=user).values_list('candidate_id', 'score'))
+
+    @override_settings(FOLLOW_SUGGESTION_FANOUT=2)
+    def test_unfollow_subtracts_the_slice_follow_added(self):
+        reader, friend, *others = self.users
+        # friend follows four people, added in reverse id order
+        for other in reversed(others[:4]):
+            self._follow(friend, other)
+        self._follow(reader, friend)
+        # the two lowest ids, whatever order the edges were made in
+        self.assertEqual(self._scores(reader), {others[0].pk: 1, others[1].pk: 1})
+
+        self._unfollow(reader, friend)
+        self.assertEqual(self._scores(reader), {})
+
+    @override_settings(FOLLOW_SUGGESTIONS_PER_USER=2)
+    def test_incremental_updates_keep_the_top_n(self):
+        reader, first, second, *others = self.users
+        for friend in (first, second):
+            self._follow(friend, others[0])
+        self._follow(first, others[1])
+        self._follow(second, others[2])
+        self._follow(reader, first)
+        self._follow(reader, second)
+        # others[0] scores 2; the others tie at 1 and the lower candidate id wins
+        self.assertEqual(self._scores(reader), {others[0].pk: 2, others[1].pk: 1})
+        self.assertEqual(graph.suggestions(reader.pk), [(others[0].pk, 2), (others[1].pk, 1)])
+
+        # a candidate added for every follower of others[3] is trimmed away for the reader too
+        self._follow(reader, others[3])
+        self._follow(others[3], others[4])
+        self.assertEqual(self._scores(reader), {others[0].pk: 2, others[1].pk: 1})
+
+
+class FollowManyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.first, cls.second, cls.fan, cls.candidate, *cls.authors = [
+            User.objects.create(username=f'cook{i}', email=f'cook{i}@example.com') for i in range(9)
+        ]
+        for reader in (cls.first, cls.second):
+            Follower.objects.create(follower=cls.fan, user=reader)
+        for author in cls.authors:
+            Follower.objects.create(follower=author, user=cls.candidate)
+            Post.objects.create(author=author, content='soup')
+
+    def _follow_many(self, follower, users):
+        with self.captureOnCommitCallbacks() as callbacks:
+            graph.follow_many(follower.pk, [u.pk for u in users])
+        with CaptureQueriesContext(connection) as ctx:
+            for callback in callbacks:
+                callback()
+        return len(ctx.captured_queries)
+
+    def test_post_commit_work_does_not_grow_with_the_batch(self):
+        small = self._follow_many(self.first, self.authors[:2])
+        self.assertEqual(self._follow_many(self.second, self.authors), small)
+
+        counts = graph.counts_for([self.second.pk, self.authors[0].pk])
+        self.assertEqual(counts[self.second.pk]['following_count'], 5)
+        self.assertEqual(counts[self.authors[0].pk]['followers_count'], 2)
+        self.assertEqual(graph.suggestions(self.second.pk), [(self.candidate.pk, 5)])
+        self.assertEqual(
+            dict(graph.suggestions(self.fan.pk)),
+            {author.pk: 2 if author in self.authors[:2] else 1 for author in self.authors},
+        )
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.second).count(), 5)
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('<int:user_id>/follow/', views.follow, name='follow'),
+    path('batch/', views.follow_batch, name='follow_batch'),
+    path('relationships/', views.relationships, name='follow_relationships'),
+    path('suggestions/', views.suggestions, name='follow_suggestions'),
+    path('mutuals/', views.mutuals, name='follow_mutuals'),
+]
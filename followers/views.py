@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.batching import collapse_actions
+from core.db import read_replica
+from core.pagination import parse_page_size
+
+from . import graph
+from .models import Follower
+
+User = get_user_model()
+
+
+def _parse_ids(raw, limit=100):
+    ids = []
+    for part in (raw or '').split(','):
+        part = part.strip()
+        if part.isdigit():
+            ids.append(int(part))
+    return ids[:limit]
+
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def follow(request, user_id):
+    """POST follows the user, DELETE unfollows. Both are idempotent."""
+    target = get_object_or_404(User, pk=user_id)
+    if target.pk == request.user.pk:
+        return Response({'error': 'cannot follow yourself'}, status=status.HTTP_400_BAD_REQUEST)
+    if request.method == 'DELETE':
+        Follower.objects.filter(user=target, follower=request.user).delete()
+        following = False
+    else:
+        try:
+            with transaction.atomic():
+                Follower.objects.get_or_create(user=target, follower=request.user)
+        except IntegrityError:
+            pass
+        following = True
+    return Response({'user_id': target.pk, 'following': following}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def follow_batch(request):
+    """
+    POST { "actions": [{ "user_id": 7, "following": true }, { "user_id": 9, "following": false }, ...] }
+    Applies queued follows/unfollows in one round trip; the last action per user wins.
+    Unknown users (and yourself) are reported as missing. Returns the resulting state and counts.
+    """
+    try:
+        wanted = collapse_actions(request.data.get('actions'), 'user_id', 'following')
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    me = request.user.pk
+    known = set(User.objects.filter(pk__in=list(wanted)).exclude(pk=me).values_list('pk', flat=True))
+    with transaction.atomic():
+        graph.follow_many(me, [uid for uid, follow in wanted.items() if follow and uid in known])
+        graph.unfollow_many(me, [uid for uid, follow in wanted.items() if not follow and uid in known])
+
+    counts = graph.counts_for(known)
+    return Response({
+        'results': [
+            {'user_id': uid, 'following': follow, **counts[uid]}
+            for uid, follow in wanted.items() if uid in known
+        ],
+        'missing': [uid for uid in wanted if uid not in known],
+    }, status=status.HTTP_200_OK)
+
+
+@read_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def relationships(request):
+    """
+    GET /followers/relationships/?ids=1,2,3
+    Follow state and counts for a page of users, in two queries at most.
+    """
+    ids = _parse_ids(request.query_params.get('ids'))
+    rel = graph.relationships(request.user.pk, ids)
+    counts = graph.counts_for(ids)
+    return Response({
+        str(uid): {**rel[uid], **counts[uid]} for uid in ids
+    }, status=status.HTTP_200_OK)
+
+
+@read_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def suggestions(request):
+    """GET /followers/suggestions/?limit=20 -> friends-of-friends the user does not follow yet."""
+    limit = parse_page_size(request.query_params.get('limit'))
+    ranked = graph.suggestions(request.user.pk, limit)
+    users = User.objects.in_bulk([cid for cid, _ in ranked])
+    return Response({
+        'results': [
+            {
+                'id': cid,
+                'username': users[cid].username,
+                'chef_star_name': users[cid].chef_star_name,
+                'mutual_follows': score,
+            }
+            for cid, score in ranked if cid in users
+        ],
+    }, status=status.HTTP_200_OK)
+
+
+@read_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def mutuals(request):
+    """GET /followers/mutuals/ -> ids of users the authenticated user follows and is followed by."""
+    return Response({'results': graph.mutual_ids(request.user.pk)}, status=status.HTTP_200_OK)
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from media import thumbnails
+from media.models import MediaBlob
+
+
+class Command(BaseCommand):
+    help = 'Render thumbnails for blobs left pending (e.g. by a restart) or, with --retry-failed, that failed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true')
+        parser.add_argument('--limit', type=int, default=None, help='at most this many blobs')
+
+    def handle(self, *args, **options):
+        statuses = [MediaBlob.THUMBS_PENDING] + ([MediaBlob.THUMBS_FAILED] if options['retry_failed'] else [])
+        blobs = MediaBlob.objects.filter(thumb_status__in=statuses).order_by('pk')
+        if options['limit']:
+            blobs = blobs[:options['limit']]
+        started, done = time.monotonic(), 0
+        # inline: the command is already off the request path
+        with override_settings(MEDIA_THUMBNAIL_WORKERS=0):
+            for blob in blobs.iterator():
+                thumbnails.schedule(blob)
+                done += 1
+        counts = {
+            status: MediaBlob.objects.filter(thumb_status=status).count() for status, _ in MediaBlob.THUMB_STATUS_CHOICES
+        }
+        self.stdout.write(f"processed {done} in {time.monotonic() - started:.2f}s; {counts}")
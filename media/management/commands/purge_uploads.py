@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from media import storage, thumbnails
+from media.models import MediaBlob, PostMedia, Upload
+
+
+def _orphans():
+    """Blobs no upload and no post refers to any more (their upload and post were deleted)."""
+    return MediaBlob.objects.filter(
+        ~Exists(Upload.objects.filter(blob=OuterRef('pk'))),
+        ~Exists(PostMedia.objects.filter(blob=OuterRef('pk'))),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete unfinished uploads older than MEDIA_UPLOAD_EXPIRY_HOURS and their partial files, '
+        'then blobs no upload or post refers to and their files.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='only count matching uploads and blobs')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=settings.MEDIA_UPLOAD_EXPIRY_HOURS)
+        stale = Upload.objects.filter(blob__isnull=True, created_at__lt=cutoff)
+        if options['dry_run']:
+            self.stdout.write(f"stale uploads: {stale.count()}, orphan blobs: {_orphans().count()}")
+            return
+        purged = freed = 0
+        while True:
+            chunk = list(stale.order_by('created_at').values_list('pk', 'received')[:options['chunk_size']])
+            if not chunk:
+                break
+            for pk, received in chunk:
+                storage.discard(pk)
+                freed += received
+            Upload.objects.filter(pk__in=[pk for pk, _ in chunk]).delete()
+            purged += len(chunk)
+
+        orphans = orphan_bytes = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                # skip_locked: a blob an upload is completing into right now (media.storage.complete) is left alone
+                chunk = list(
+                    _orphans().filter(pk__gt=last_id).select_for_update(skip_locked=True)
+                    .order_by('pk').values_list('pk', 'sha256', 'size')[:options['chunk_size']]
+                )
+                if not chunk:
+                    break
+                MediaBlob.objects.filter(pk__in=[pk for pk, _, _ in chunk]).delete()
+                # files go while the rows are still locked, before a new upload of the same bytes can recreate them
+                for _, sha256, size in chunk:
+                    storage.remove_blob_files(sha256, thumbnails.sizes())
+                    orphan_bytes += size
+            orphans += len(chunk)
+            last_id = chunk[-1][0]
+        self.stdout.write(
+            f"purged {purged} uploads, freed {freed / 1024 / 1024:.1f} MiB; "
+            f"deleted {orphans} orphan blobs, freed {orphan_bytes / 1024 / 1024:.1f} MiB"
+        )
@@ -0,0 +1,66 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class MediaBlob(models.Model):
+    """A stored file, content-addressed: one row (and one file on disk) per distinct SHA-256."""
+    IMAGE = 'image'
+    VIDEO = 'video'
+    KIND_CHOICES = ((IMAGE, 'image'), (VIDEO, 'video'))
+
+    THUMBS_PENDING = 'pending'
+    THUMBS_READY = 'ready'
+    THUMBS_FAILED = 'failed'
+    THUMBS_SKIPPED = 'skipped'  # videos, or Pillow not installed
+    THUMB_STATUS_CHOICES = (
+        (THUMBS_PENDING, 'pending'), (THUMBS_READY, 'ready'), (THUMBS_FAILED, 'failed'), (THUMBS_SKIPPED, 'skipped'),
+    )
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    thumb_status = models.CharField(max_length=10, choices=THUMB_STATUS_CHOICES, default=THUMBS_PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"MediaBlob({self.sha256[:12]}, {self.content_type}, {self.size} bytes)"
+
+
+class Upload(models.Model):
+    """A resumable upload: the first `received` bytes are in the part file until it completes into `blob`."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    blob = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploads')
+    # set while a request writes a chunk (media.views.upload_detail); a crashed writer's claim lapses
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # purge_uploads: unfinished uploads by age
+            models.Index(fields=['created_at'], name='upload_created_idx', condition=models.Q(blob__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"Upload({self.id}, {self.received}/{self.size})"
+
+
+class PostMedia(models.Model):
+    """Attachment of a blob to a post, in display order."""
+    post = models.ForeignKey('posts.Post', on_delete=models.CASCADE, related_name='media')
+    blob = models.ForeignKey(MediaBlob, on_delete=models.PROTECT, related_name='+')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('post', 'position')
+
+    def __str__(self):
+        return f"PostMedia(post={self.post_id}, blob={self.blob_id}, position={self.position})"
@@ -0,0 +1,165 @@
+"""Local, content-addressed media storage.
+
+Layout under MEDIA_ROOT:
+
+    uploads/<upload id>.part          bytes received so far for an upload
+    blobs/<ab>/<sha256>               finished files, named by content hash
+    thumbs/<ab>/<sha256>_<size>.jpg   resized copies (media.thumbnails)
+
+Chunks are streamed from the request body straight into the part file at
+their offset, MEDIA_STREAM_BLOCK_BYTES at a time, so no upload is ever held
+in memory, and no database transaction is open while they are. When the
+last byte arrives `complete` hashes the part file, checks the real type
+from its leading bytes, and either renames it into blobs/ (same
+filesystem, atomic) or, when a blob with that hash already exists, just
+deletes it: identical photos are stored once.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import MediaBlob
+
+# leading bytes -> (content type, kind); MP4/MOV are matched on the "ftyp" box below
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg', MediaBlob.IMAGE),
+    (b'\x89PNG\r\n\x1a\n', 'image/png', MediaBlob.IMAGE),
+    (b'GIF87a', 'image/gif', MediaBlob.IMAGE),
+    (b'GIF89a', 'image/gif', MediaBlob.IMAGE),
+    (b'\x1a\x45\xdf\xa3', 'video/webm', MediaBlob.VIDEO),
+)
+
+
+class UnsupportedMedia(Exception):
+    """The uploaded bytes are not an image or video type we accept."""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _root(*parts):
+    return os.path.join(str(settings.MEDIA_ROOT), *parts)
+
+
+def part_path(upload_id):
+    return _root('uploads', f'{upload_id}.part')
+
+
+def blob_path(sha256):
+    return _root('blobs', sha256[:2], sha256)
+
+
+def thumb_path(sha256, size):
+    return _root('thumbs', sha256[:2], f'{sha256}_{size}.jpg')
+
+
+def sniff(head):
+    """(content_type, kind) for a file starting with `head`, or None."""
+    for magic, content_type, kind in SIGNATURES:
+        if head.startswith(magic):
+            return content_type, kind
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp', MediaBlob.IMAGE
+    if head[4:8] == b'ftyp':
+        return ('video/quicktime' if head[8:10] == b'qt' else 'video/mp4'), MediaBlob.VIDEO
+    return None
+
+
+def detect(upload_id):
+    """sniff() the start of an upload's part file, so a wrong type is refused after its first chunk."""
+    with open(part_path(upload_id), 'rb') as f:
+        return sniff(f.read(16))
+
+
+def write_chunk(upload, stream, offset, length):
+    """
+    Copy `length` bytes from `stream` into `upload`'s part file at `offset`.
+    Returns how many bytes were written; fewer than `length` means the
+    client went away, and the upload can resume from `offset + written`.
+    """
+    path = part_path(upload.pk)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    block = _setting('MEDIA_STREAM_BLOCK_BYTES', 256 * 1024)
+    written = 0
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        while written < length:
+            data = stream.read(min(block, length - written))
+            if not data:
+                break
+            os.pwrite(fd, data, offset + written)
+            written += len(data)
+    finally:
+        os.close(fd)
+    return written
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    block = bytearray(_setting('MEDIA_STREAM_BLOCK_BYTES', 256 * 1024))
+    view = memoryview(block)
+    with open(path, 'rb') as f:
+        head = f.read(16)
+        digest.update(head)
+        while n := f.readinto(block):
+            digest.update(view[:n])
+    return digest.hexdigest(), head
+
+
+def complete(upload):
+    """
+    Turn a fully received upload into a MediaBlob (deduplicated by hash) and
+    return it. The file is hashed before, and outside, the short transaction
+    that records the blob and the finished upload (its `received` and
+    released claim included).
+    """
+    path = part_path(upload.pk)
+    sha256, head = _hash_file(path)
+    detected = sniff(head)
+    if detected is None:
+        os.remove(path)
+        raise UnsupportedMedia('not a supported image or video file')
+    content_type, kind = detected
+
+    with transaction.atomic():
+        # locked: purge_uploads cannot delete it as an orphan before this upload points at it
+        blob = MediaBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is not None:
+            os.remove(path)
+        else:
+            final = blob_path(sha256)
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            # the file is in place before its row exists, so a row always has a file
+            os.replace(path, final)
+            blob, created = MediaBlob.objects.get_or_create(sha256=sha256, defaults={
+                'size': upload.size, 'content_type': content_type, 'kind': kind,
+            })
+            if created:
+                from . import thumbnails
+                transaction.on_commit(lambda: thumbnails.schedule(blob))
+
+        upload.blob = blob
+        upload.claimed_until = None
+        upload.save(update_fields=['blob', 'received', 'claimed_until'])
+    return blob
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def discard(upload_id):
+    _remove(part_path(upload_id))
+
+
+def remove_blob_files(sha256, thumb_sizes):
+    """Delete a blob's file and its thumbnails (for an orphan whose row is being deleted)."""
+    _remove(blob_path(sha256))
+    for size in thumb_sizes:
+        _remove(thumb_path(sha256, size))
@@ -0,0 +1,147 @@
+import io
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from media import storage
+from media.models import MediaBlob, PostMedia, Upload
+from posts.models import Post
+
+User = get_user_model()
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\0' * 24
+
+
+class MediaTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='cook', email='cook@example.com')
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings = override_settings(MEDIA_ROOT=root.name, MEDIA_THUMBNAIL_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_login(self.user)
+
+    def _put(self, upload_id, data, offset):
+        return self.client.put(
+            f'/media/uploads/{upload_id}/', data, content_type='application/octet-stream',
+            headers={'upload-offset': str(offset)},
+        )
+
+    def _upload(self, data, chunk=16):
+        upload_id = self.client.post('/media/uploads/', {'size': len(data)}, content_type='application/json').json()['id']
+        for offset in range(0, len(data), chunk):
+            response = self._put(upload_id, data[offset:offset + chunk], offset)
+        self.assertEqual(response.status_code, 201)
+        return Upload.objects.select_related('blob').get(pk=upload_id)
+
+
+class UploadTests(MediaTestCase):
+    def test_chunks_are_appended_in_order(self):
+        upload = self._upload(PNG)
+        self.assertEqual((upload.received, upload.blob.content_type), (len(PNG), 'image/png'))
+        self.assertTrue(os.path.exists(storage.blob_path(upload.blob.sha256)))
+
+
+class ConcurrentUploadTests(TransactionTestCase):
+    """Two requests writing one upload at once, each on its own thread and database connection."""
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings = override_settings(MEDIA_ROOT=root.name, MEDIA_THUMBNAIL_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create(username='cook', email='cook@example.com')
+        self.upload = Upload.objects.create(owner=self.user, size=len(PNG))
+
+    def _put(self, data, offset):
+        client = Client()
+        client.force_login(self.user)
+        return client.put(
+            f'/media/uploads/{self.upload.pk}/', data, content_type='application/octet-stream',
+            headers={'upload-offset': str(offset)},
+        )
+
+    def _put_in_thread(self, data, offset, responses):
+        try:
+            responses.append(self._put(data, offset))
+        finally:
+            connection.close()
+
+    def test_a_second_writer_is_refused_while_the_first_streams_its_chunk(self):
+        streaming, finish = threading.Event(), threading.Event()
+        write_chunk = storage.write_chunk
+
+        def slow_write(*args):
+            # the first writer holds its claim here, mid-chunk
+            streaming.set()
+            finish.wait(10)
+            return write_chunk(*args)
+
+        responses = []
+        with mock.patch('media.storage.write_chunk', side_effect=slow_write):
+            first = threading.Thread(target=self._put_in_thread, args=(PNG[:16], 0, responses))
+            first.start()
+            self.assertTrue(streaming.wait(10))
+            try:
+                second = self._put(PNG[:16], 0)
+                self.assertEqual(second.status_code, 409)
+                self.assertEqual(second.json(), {'error': 'another chunk of this upload is in progress'})
+                # no transaction is open while the chunk streams: other writes go straight through
+                User.objects.create(username='fan', email='fan@example.com')
+            finally:
+                finish.set()
+                first.join(10)
+        self.assertEqual((responses[0].status_code, responses[0].json()['offset']), (200, 16))
+
+        self.upload.refresh_from_db()
+        self.assertEqual((self.upload.received, self.upload.claimed_until), (16, None))
+        # committed for real here; PNG is only a signature, so skip rendering its thumbnails
+        with mock.patch('media.thumbnails.schedule'):
+            self.assertEqual(self._put(PNG[16:], 16).status_code, 201)
+        self.upload.refresh_from_db()
+        self.assertEqual((self.upload.blob.content_type, self.upload.claimed_until), ('image/png', None))
+
+    def test_a_lapsed_claim_can_be_taken_over(self):
+        Upload.objects.filter(pk=self.upload.pk).update(claimed_until=timezone.now() - timedelta(seconds=1))
+        response = self._put(PNG[:16], 0)
+        self.assertEqual((response.status_code, response.json()['offset']), (200, 16))
+
+
+class PurgeTests(MediaTestCase):
+    def test_orphan_blobs_and_their_files_are_deleted(self):
+        kept_by_upload = self._upload(PNG).blob
+        kept_by_post = self._upload(PNG + b'post').blob
+        post = Post.objects.create(author=self.user, content='soup')
+        PostMedia.objects.create(post=post, blob=kept_by_post)
+        Upload.objects.filter(blob=kept_by_post).delete()
+        orphan = self._upload(PNG + b'orphan').blob
+        Upload.objects.filter(blob=orphan).delete()
+        thumb = storage.thumb_path(orphan.sha256, 320)
+        os.makedirs(os.path.dirname(thumb), exist_ok=True)
+        open(thumb, 'wb').close()
+
+        out = io.StringIO()
+        call_command('purge_uploads', stdout=out)
+        self.assertIn('deleted 1 orphan blobs', out.getvalue())
+        self.assertEqual(set(MediaBlob.objects.all()), {kept_by_upload, kept_by_post})
+        self.assertFalse(os.path.exists(storage.blob_path(orphan.sha256)))
+        self.assertFalse(os.path.exists(thumb))
+        self.assertTrue(os.path.exists(storage.blob_path(kept_by_post.sha256)))
+
+        # a deleted post orphans its blob too
+        post.delete()
+        call_command('purge_uploads', stdout=out)
+        self.assertEqual(list(MediaBlob.objects.all()), [kept_by_upload])
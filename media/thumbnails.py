@@ -0,0 +1,115 @@
+"""Thumbnail generation in a background process pool.
+
+Decoding and resizing a phone photo takes tens of milliseconds of CPU, so
+it never runs on a request worker: `schedule` hands new image blobs to
+MEDIA_THUMBNAIL_WORKERS processes and records the result on the blob
+(`thumb_status`, width, height) when the worker is done. Every size in
+MEDIA_THUMBNAIL_SIZES is rendered from one decode (JPEG draft mode lets the
+decoder downscale while reading).
+
+Pillow is optional (`pip install Pillow`): without it, and for videos,
+blobs are marked "skipped" and clients show the original. Work lost to a
+restart stays "pending"; `manage.py generate_thumbnails` picks it up.
+MEDIA_THUMBNAIL_WORKERS=0 renders inline (tests, management commands).
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+from . import storage
+from .models import MediaBlob
+
+try:
+    import PIL  # noqa: F401
+except ImportError:  # optional dependency: pip install Pillow
+    PIL = None
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def sizes():
+    return tuple(_setting('MEDIA_THUMBNAIL_SIZES', (320, 1080)))
+
+
+def render(source, targets):
+    """
+    Write a JPEG no larger than `size` x `size` to `path` for every
+    `(size, path)` in `targets`; returns the original `(width, height)`.
+    Runs in a pool worker, so it only touches files.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        width, height = image.size
+        if image.getexif().get(0x0112) in (5, 6, 7, 8):
+            # EXIF rotation by 90 degrees: report the size as displayed
+            width, height = height, width
+        largest = max(size for size, _ in targets)
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for size, path in sorted(targets, reverse=True):
+            image.thumbnail((size, size))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f'{path}.tmp'
+            image.save(tmp, 'JPEG', quality=85, optimize=True)
+            os.replace(tmp, path)
+    return width, height
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=_setting('MEDIA_THUMBNAIL_WORKERS', 0))
+    return _executor
+
+
+def _record(blob_id, result=None, error=None):
+    if error is not None:
+        logger.warning('Thumbnails for blob %s failed: %s', blob_id, error)
+        MediaBlob.objects.filter(pk=blob_id).update(thumb_status=MediaBlob.THUMBS_FAILED)
+    else:
+        width, height = result
+        MediaBlob.objects.filter(pk=blob_id).update(
+            thumb_status=MediaBlob.THUMBS_READY, width=width, height=height,
+        )
+
+
+def _done(blob_id, future):
+    # runs on the executor's callback thread, which has its own connection
+    try:
+        _record(blob_id, future.result())
+    except Exception as exc:
+        _record(blob_id, error=exc)
+    finally:
+        connection.close()
+
+
+def schedule(blob):
+    """Queue thumbnails for `blob` (call on commit). Returns the Future, or None when nothing was queued."""
+    if blob.kind != MediaBlob.IMAGE or PIL is None:
+        MediaBlob.objects.filter(pk=blob.pk).update(thumb_status=MediaBlob.THUMBS_SKIPPED)
+        return None
+    targets = [(size, storage.thumb_path(blob.sha256, size)) for size in sizes()]
+    source = storage.blob_path(blob.sha256)
+    if _setting('MEDIA_THUMBNAIL_WORKERS', 0) <= 0:
+        try:
+            _record(blob.pk, render(source, targets))
+        except Exception as exc:
+            _record(blob.pk, error=exc)
+        return None
+    future = _pool().submit(render, source, targets)
+    future.add_done_callback(lambda f: _done(blob.pk, f))
+    return future
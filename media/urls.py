@@ -0,0 +1,9 @@
+from django.urls import path, re_path
+from . import views
+
+urlpatterns = [
+    path('uploads/', views.start_upload, name='start_upload'),
+    path('uploads/<uuid:upload_id>/', views.upload_detail, name='upload_detail'),
+    re_path(r'^(?P<sha256>[0-9a-f]{64})/$', views.serve, name='serve_media'),
+    re_path(r'^(?P<sha256>[0-9a-f]{64})/thumb/(?P<size>[0-9]+)/$', views.serve_thumbnail, name='serve_thumbnail'),
+]
@@ -0,0 +1,251 @@
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from . import storage, thumbnails
+from .models import MediaBlob, Upload
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def media_data(blob):
+    """What clients need to show a blob: original URL, type, size and ready thumbnail URLs."""
+    data = {
+        'id': blob.sha256,
+        'url': f'/media/{blob.sha256}/',
+        'content_type': blob.content_type,
+        'kind': blob.kind,
+        'size': blob.size,
+        'width': blob.width,
+        'height': blob.height,
+        'thumbnails': {},
+    }
+    if blob.thumb_status == MediaBlob.THUMBS_READY:
+        data['thumbnails'] = {size: f'/media/{blob.sha256}/thumb/{size}/' for size in thumbnails.sizes()}
+    return data
+
+
+def _upload_data(upload):
+    data = {'id': upload.pk, 'offset': upload.received, 'size': upload.size, 'complete': upload.blob_id is not None}
+    if upload.blob_id is not None:
+        data['media'] = media_data(upload.blob)
+    return data
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def start_upload(request):
+    """
+    POST { "size": bytes, "filename": "..." } -> an upload id and the chunk size to use.
+    Then PUT the bytes to /media/uploads/<id>/ in order, each chunk with an
+    Upload-Offset header; GET that URL to find where to resume.
+    """
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        return Response({'error': 'size required'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < size <= settings.MEDIA_MAX_UPLOAD_BYTES:
+        return Response(
+            {'error': f'size must be between 1 and {settings.MEDIA_MAX_UPLOAD_BYTES} bytes'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    filename = str(request.data.get('filename') or '')[:255]
+    upload = Upload.objects.create(owner=request.user, size=size, filename=filename)
+    data = _upload_data(upload)
+    data['chunk_size'] = settings.MEDIA_CHUNK_BYTES
+    return Response(data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def upload_detail(request, upload_id):
+    """
+    GET -> progress ({offset} to resume from). DELETE -> abandon the upload.
+    PUT (raw bytes, Upload-Offset: n) -> append a chunk; the request that
+    completes the file answers 201 with the stored media.
+    """
+    upload = get_object_or_404(Upload.objects.select_related('blob'), pk=upload_id, owner=request.user)
+    if request.method == 'GET':
+        return Response(_upload_data(upload), status=status.HTTP_200_OK)
+    if request.method == 'DELETE':
+        if upload.blob_id is None:
+            storage.discard(upload.pk)
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    if upload.blob_id is not None:
+        return Response(_upload_data(upload), status=status.HTTP_200_OK)
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return Response({'error': 'Upload-Offset header required'}, status=status.HTTP_400_BAD_REQUEST)
+    if offset != upload.received:
+        # the client lost track (e.g. a dropped response): tell it where to resume
+        return Response(_upload_data(upload), status=status.HTTP_409_CONFLICT)
+    if not 0 < length <= settings.MEDIA_CHUNK_MAX_BYTES or offset + length > upload.size:
+        return Response(
+            {'error': f'chunk must be 1..{settings.MEDIA_CHUNK_MAX_BYTES} bytes and end within the declared size'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    claim = _claim(upload.pk, offset)
+    if claim is None:
+        upload = Upload.objects.select_related('blob').filter(pk=upload.pk).first()
+        if upload is None:
+            raise Http404
+        if offset != upload.received or upload.blob_id is not None:
+            # a concurrent chunk landed between our read and the claim
+            return Response(_upload_data(upload), status=status.HTTP_409_CONFLICT)
+        return Response({'error': 'another chunk of this upload is in progress'}, status=status.HTTP_409_CONFLICT)
+    upload.claimed_until = claim
+
+    try:
+        # request.stream is the raw body; request.data is never touched, so DRF parses nothing
+        written = storage.write_chunk(upload, request.stream, offset, length)
+        if offset == 0 and written and storage.detect(upload.pk) is None:
+            storage.discard(upload.pk)
+            upload.delete()
+            return Response({'error': 'not a supported image or video file'}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        upload.received = offset + written
+        if upload.received < upload.size:
+            if not _release(upload):
+                return Response({'error': 'the upload was taken over by another request'}, status=status.HTTP_409_CONFLICT)
+            return Response(_upload_data(upload), status=status.HTTP_200_OK)
+        try:
+            storage.complete(upload)
+        except storage.UnsupportedMedia as exc:
+            upload.delete()
+            return Response({'error': str(exc)}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+    except Exception:
+        # the chunk did not land: free the upload for the client's retry
+        upload.received = offset
+        _release(upload)
+        raise
+    return Response(_upload_data(upload), status=status.HTTP_201_CREATED)
+
+
+def _claim(pk, offset):
+    """
+    Take the upload for one chunk at `offset` with a single compare-and-set
+    UPDATE, so chunks are written one at a time with no transaction (and, on
+    SQLite, no database write lock) held while the bytes stream in or the
+    file is hashed. Returns the claim's expiry, or None when the offset has
+    moved on or another request's claim is still live.
+    """
+    now = timezone.now()
+    claim = now + timedelta(seconds=settings.MEDIA_UPLOAD_CLAIM_SECONDS)
+    claimed = Upload.objects.filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lt=now), pk=pk, received=offset, blob__isnull=True,
+    ).update(claimed_until=claim)
+    return claim if claimed else None
+
+
+def _release(upload):
+    """Record `upload.received` and drop its claim; False if the claim lapsed and another request took the upload."""
+    return bool(
+        Upload.objects.filter(pk=upload.pk, claimed_until=upload.claimed_until)
+        .update(received=upload.received, claimed_until=None)
+    )
+
+
+class _FileSlice:
+    """File-like window onto `length` bytes of an open file (starting at its current position)."""
+
+    def __init__(self, f, length):
+        self._file = f
+        self._remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def _byte_range(header, size):
+    """(start, end) inclusive for a single-range Range header; None to send it all; ValueError if unsatisfiable."""
+    match = _RANGE.match(header.strip()) if header else None
+    if match is None:
+        return None  # absent, multi-range or malformed: ignore it (RFC 9110 allows that)
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        start, end = max(size - int(last), 0), size - 1  # suffix: the last N bytes
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError
+    return start, end
+
+
+def _send_file(request, path, content_type, etag):
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        raise Http404
+    size = os.fstat(f.fileno()).st_size
+
+    try:
+        byte_range = _byte_range(request.headers.get('Range'), size)
+    except ValueError:
+        f.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        # the file object itself: WSGI servers with wsgi.file_wrapper send it with sendfile()
+        response = FileResponse(f, content_type=content_type)
+    else:
+        start, end = byte_range
+        f.seek(start)
+        if end == size - 1:
+            # open-ended range (seeking video, resuming a download): still zero-copy from the offset
+            response = FileResponse(f, content_type=content_type, status=206)
+        else:
+            response = FileResponse(_FileSlice(f, end - start + 1), content_type=content_type, status=206)
+            response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    # content-addressed: a URL's bytes never change
+    patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+    return response
+
+
+@require_safe
+def serve(request, sha256):
+    """GET /media/<sha256>/ -> the original file, with Range support."""
+    blob = get_object_or_404(MediaBlob, sha256=sha256)
+    return _send_file(request, storage.blob_path(sha256), blob.content_type, f'"{sha256}"')
+
+
+@require_safe
+def serve_thumbnail(request, sha256, size):
+    """GET /media/<sha256>/thumb/<size>/ -> a JPEG thumbnail (404 until it has been generated)."""
+    size = int(size)
+    if size not in thumbnails.sizes():
+        raise Http404
+    return _send_file(request, storage.thumb_path(sha256, size), 'image/jpeg', f'"{sha256}-{size}"')
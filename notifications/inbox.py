@@ -0,0 +1,120 @@
+"""Notification fan-out and unread counters.
+
+`notify` writes any number of notifications with one `bulk_create`, adds
+to the recipients' NotificationCounter rows with one UPDATE per distinct
+delta. `unread_count` reads the counter through the cache, so the inbox
+badge never counts rows. Every counter change also stamps the recipient's
+STREAM_KEY in the shared cache once it commits; open SSE streams
+(notifications.views.stream) watch that key and only read new rows and the
+counter from the database when it moves.
+
+Like, Comment and Follower saves are hooked in notifications.signals; the
+batch paths (posts.likes.like_many, followers.graph.follow_many) use
+bulk_create, which sends no signals, and call `notify_likes` /
+`notify_follows` themselves; users.parents approves a parent's children with
+one UPDATE and calls `notify_parent_approved` for all of them. Call these on commit.
+"""
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import Notification, NotificationCounter
+
+UNREAD_KEY = 'notifications:unread:{}'
+STREAM_KEY = 'notifications:stream:{}'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def notify(notifications):
+    """Store `notifications` (unsaved Notification objects); self-notifications are dropped. Returns the saved ones."""
+    notifications = [n for n in notifications if n.recipient_id != n.actor_id]
+    if not notifications:
+        return []
+    per_user = Counter(n.recipient_id for n in notifications)
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications, batch_size=1000)
+        _add_unread(per_user)
+    return notifications
+
+
+def _add_unread(per_user):
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=uid) for uid in per_user], ignore_conflicts=True,
+    )
+    by_delta = defaultdict(list)
+    for uid, delta in per_user.items():
+        by_delta[delta].append(uid)
+    for delta, uids in by_delta.items():
+        NotificationCounter.objects.filter(user_id__in=uids).update(
+            unread_count=Greatest(F('unread_count') + delta, 0),
+        )
+    cache.delete_many([UNREAD_KEY.format(uid) for uid in per_user])
+    user_ids = list(per_user)
+    transaction.on_commit(lambda: wake(user_ids))
+
+
+def wake(user_ids):
+    """Tell the open streams of `user_ids`, in any process, that their inbox changed."""
+    stamp = time.time_ns()
+    cache.set_many(
+        {STREAM_KEY.format(uid): stamp for uid in user_ids}, _setting('NOTIFICATIONS_STREAM_MAX_SECONDS', 300),
+    )
+
+
+def unread_count(user_id):
+    key = UNREAD_KEY.format(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = NotificationCounter.objects.filter(user_id=user_id).values_list('unread_count', flat=True).first() or 0
+        cache.set(key, count, _setting('NOTIFICATIONS_UNREAD_CACHE_SECONDS', 300))
+    return count
+
+
+def mark_read(user_id, ids=None):
+    """Mark `ids` (all unread if None) read for `user_id`; returns how many changed."""
+    unread = Notification.objects.filter(recipient_id=user_id, is_read=False)
+    if ids is not None:
+        unread = unread.filter(pk__in=ids)
+    with transaction.atomic():
+        changed = unread.update(is_read=True)
+        if changed:
+            _add_unread({user_id: -changed})
+    return changed
+
+
+# ---- sources -----------------------------------------------------------------
+
+def notify_likes(actor_id, post_ids):
+    """Tell the authors of `post_ids` that `actor_id` liked their post."""
+    from posts.models import Post
+    authors = Post.objects.filter(pk__in=post_ids).values_list('pk', 'author_id')
+    return notify([
+        Notification(recipient_id=author_id, kind=Notification.LIKE, actor_id=actor_id, post_id=post_id)
+        for post_id, author_id in authors
+    ])
+
+
+def notify_comment(comment):
+    author_id = comment.post.author_id
+    return notify([
+        Notification(recipient_id=author_id, kind=Notification.COMMENT, actor_id=comment.author_id, post_id=comment.post_id)
+    ])
+
+
+def notify_follows(follower_id, user_ids):
+    """Tell every user in `user_ids` that `follower_id` started following them."""
+    return notify([
+        Notification(recipient_id=uid, kind=Notification.FOLLOW, actor_id=follower_id) for uid in user_ids
+    ])
+
+
+def notify_parent_approved(*user_ids):
+    return notify([Notification(recipient_id=uid, kind=Notification.PARENT_APPROVED) for uid in user_ids])
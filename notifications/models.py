@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import models
+
+
+class Notification(models.Model):
+    """One inbox row: `actor` did `kind` (to `post`, if any) and `recipient` should hear about it."""
+    LIKE = 1
+    COMMENT = 2
+    FOLLOW = 3
+    PARENT_APPROVED = 4
+    KIND_CHOICES = (
+        (LIKE, 'like'),
+        (COMMENT, 'comment'),
+        (FOLLOW, 'follow'),
+        (PARENT_APPROVED, 'parent_approved'),
+    )
+
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, related_name='+')
+    post = models.ForeignKey('posts.Post', on_delete=models.CASCADE, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    is_read = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # inbox pages (keyset on created_at, id) and the stream's "id > last seen" catch-up
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notification_inbox_idx'),
+            models.Index(fields=['recipient', 'id'], name='notification_stream_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notification({self.id}, {self.get_kind_display()}) for {self.recipient_id}"
+
+
+class NotificationCounter(models.Model):
+    """Unread total per user, maintained by notifications.inbox."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    unread_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"NotificationCounter(user={self.user_id}, unread={self.unread_count})"
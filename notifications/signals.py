@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from followers.models import Follower
+from posts.models import Comment, Like
+
+from . import inbox
+
+
+@receiver(post_save, sender=Like)
+def notify_like(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: inbox.notify_likes(instance.user_id, [instance.post_id]))
+
+
+@receiver(post_save, sender=Comment)
+def notify_comment(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: inbox.notify_comment(instance))
+
+
+@receiver(post_save, sender=Follower)
+def notify_follow(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: inbox.notify_follows(instance.follower_id, [instance.user_id]))
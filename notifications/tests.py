@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from notifications import inbox
+from users.tokens import VersionedRefreshToken
+
+User = get_user_model()
+
+
+# a long idle poll: the events below arrive because the writes wake the stream
+@override_settings(
+    NOTIFICATIONS_STREAM_POLL_SECONDS=0.01, NOTIFICATIONS_STREAM_IDLE_POLL_SECONDS=60, NOTIFICATIONS_STREAM_MAX_SECONDS=10,
+)
+class StreamTests(TestCase):
+    """/notifications/stream/ read through the in-process ASGI client."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cook = User.objects.create(username='cook', email='cook@example.com')
+        cls.fan = User.objects.create(username='fan', email='fan@example.com')
+        cls.first = inbox.notify_follows(cls.fan.pk, [cls.cook.pk])[0]
+        cls.token = str(VersionedRefreshToken.for_user(cls.cook).access_token)
+
+    async def _open(self, **headers):
+        response = await self.async_client.get(
+            '/notifications/stream/', headers={'authorization': f'Bearer {self.token}', **headers},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return aiter(response.streaming_content)
+
+    def _commit(self, write, *args):
+        """Run an inbox write with its on-commit wake, as a committed request would."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return write(*args)
+
+    async def _next_event(self, stream):
+        """The next event as (name, id, data), skipping the retry hint and heartbeats."""
+        while True:
+            chunk = (await asyncio.wait_for(anext(stream), timeout=5)).decode()
+            if chunk.startswith(('retry:', ':')):
+                continue
+            fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+            return fields['event'], fields.get('id'), json.loads(fields['data'])
+
+    async def test_requires_a_token(self):
+        response = await self.async_client.get('/notifications/stream/')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_a_ticket_opens_one_stream_and_tokens_stay_out_of_urls(self):
+        response = await self.async_client.get('/notifications/stream/', {'access_token': self.token})
+        self.assertEqual(response.status_code, 401)
+
+        ticket = (await self.async_client.post(
+            '/notifications/stream/ticket/', headers={'authorization': f'Bearer {self.token}'},
+        )).json()['ticket']
+        response = await self.async_client.get('/notifications/stream/', {'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await self._next_event(aiter(response.streaming_content)), ('unread', None, {'unread': 1}))
+        response = await self.async_client.get('/notifications/stream/', {'ticket': ticket})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_streams_new_notifications_and_the_unread_count(self):
+        stream = await self._open()
+        # nothing is replayed without Last-Event-ID: just the current count
+        self.assertEqual(await self._next_event(stream), ('unread', None, {'unread': 1}))
+
+        # written straight to the database, as another process would
+        follow = (await sync_to_async(self._commit)(inbox.notify_follows, self.fan.pk, [self.cook.pk]))[0]
+        name, event_id, data = await self._next_event(stream)
+        self.assertEqual((name, event_id), ('notification', str(follow.pk)))
+        self.assertEqual((data['kind'], data['actor']['username']), ('follow', 'fan'))
+        self.assertEqual(await self._next_event(stream), ('unread', None, {'unread': 2}))
+
+        await sync_to_async(self._commit)(inbox.mark_read, self.cook.pk)
+        self.assertEqual(await self._next_event(stream), ('unread', None, {'unread': 0}))
+
+    async def test_resumes_after_last_event_id(self):
+        second = (await sync_to_async(inbox.notify_follows)(self.fan.pk, [self.cook.pk]))[0]
+        stream = await self._open(**{'Last-Event-ID': str(self.first.pk)})
+        name, event_id, _ = await self._next_event(stream)
+        self.assertEqual((name, event_id), ('notification', str(second.pk)))
+        self.assertEqual(await self._next_event(stream), ('unread', None, {'unread': 2}))
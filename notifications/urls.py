@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.notification_list, name='notification_list'),
+    path('unread/', views.unread, name='notification_unread'),
+    path('read/', views.mark_read, name='notification_mark_read'),
+    path('stream/', views.stream, name='notification_stream'),
+    path('stream/ticket/', views.stream_ticket, name='notification_stream_ticket'),
+]
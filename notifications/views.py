@@ -0,0 +1,198 @@
+import asyncio
+import secrets
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import JsonResponse, StreamingHttpResponse
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from core.db import read_replica
+from core.pagination import keyset_page, parse_page_size
+from core.renderers import FastJSONRenderer
+from users.authentication import VersionedJWTAuthentication
+
+from . import inbox
+from .models import Notification, NotificationCounter
+
+User = get_user_model()
+
+KINDS = dict(Notification.KIND_CHOICES)
+TICKET_KEY = 'notifications:ticket:{}'
+
+
+def _notification_data(notification):
+    actor = notification.actor
+    return {
+        'id': notification.id,
+        'kind': KINDS[notification.kind],
+        'actor': {'id': actor.id, 'username': actor.username} if actor else None,
+        'post_id': notification.post_id,
+        'created_at': notification.created_at,
+        'is_read': notification.is_read,
+    }
+
+
+@read_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def notification_list(request):
+    """GET /notifications/?cursor=&limit= -> your notifications, newest first, plus the unread count."""
+    qs = Notification.objects.filter(recipient=request.user).select_related('actor')
+    limit = parse_page_size(request.query_params.get('limit'))
+    try:
+        rows, next_cursor = keyset_page(qs, request.query_params.get('cursor'), limit)
+    except ValueError:
+        return Response({'error': 'invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'results': [_notification_data(n) for n in rows],
+        'next_cursor': next_cursor,
+        'unread': inbox.unread_count(request.user.pk),
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def unread(request):
+    """GET /notifications/unread/ -> {"unread": n} (no row counting)."""
+    return Response({'unread': inbox.unread_count(request.user.pk)}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_read(request):
+    """POST { "ids": [...] } marks those read; an empty body marks everything read."""
+    ids = request.data.get('ids')
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return Response({'error': 'ids must be a list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+    changed = inbox.mark_read(request.user.pk, ids)
+    return Response({'marked': changed, 'unread': inbox.unread_count(request.user.pk)}, status=status.HTTP_200_OK)
+
+
+# ---- server-sent events ------------------------------------------------------
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def stream_ticket(request):
+    """
+    POST /notifications/stream/ticket/ -> {"ticket": "...", "expires_in": n}
+    For EventSource, which cannot send an Authorization header: open the stream
+    with ?ticket= instead. A ticket is good for one stream, within n seconds.
+    """
+    ticket = secrets.token_urlsafe(32)
+    expires_in = settings.NOTIFICATIONS_STREAM_TICKET_SECONDS
+    cache.set(TICKET_KEY.format(ticket), request.user.pk, expires_in)
+    return Response({'ticket': ticket, 'expires_in': expires_in}, status=status.HTTP_200_OK)
+
+
+def _redeem(ticket):
+    key = TICKET_KEY.format(ticket)
+    user_id = cache.get(key)
+    # delete reports whether this caller removed the key, so two redeemers cannot both win
+    if user_id is None or not cache.delete(key):
+        return None
+    return User.objects.filter(pk=user_id, is_active=True).first()
+
+
+def _authenticate(request):
+    """User for the request: a JWT in the Authorization header, or a ?ticket= from stream_ticket."""
+    auth = VersionedJWTAuthentication()
+    header = auth.get_header(request)
+    raw = auth.get_raw_token(header) if header else None
+    if not raw:
+        ticket = request.GET.get('ticket')
+        return _redeem(ticket) if ticket else None
+    try:
+        return auth.get_user(auth.get_validated_token(raw))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def _since(user_id, after_id, limit):
+    """Up to `limit` notifications newer than `after_id`, oldest first; with no `after_id`, only the newest id."""
+    qs = Notification.objects.filter(recipient_id=user_id)
+    if after_id is None:
+        return [], qs.order_by('-id').values_list('id', flat=True).first() or 0
+    rows = list(qs.filter(id__gt=after_id).select_related('actor').order_by('id')[:limit])
+    return rows, rows[-1].id if rows else after_id
+
+
+def _unread(user_id):
+    # straight from the counter row: a cached count may be another process's stale copy
+    return NotificationCounter.objects.filter(user_id=user_id).values_list('unread_count', flat=True).first() or 0
+
+
+def _event(name, data, event_id=None):
+    lines = [f'event: {name}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append('data: ' + FastJSONRenderer().render(data).decode())
+    return '\n'.join(lines) + '\n\n'
+
+
+async def _events(user_id, last_id):
+    poll = settings.NOTIFICATIONS_STREAM_POLL_SECONDS
+    idle_poll = settings.NOTIFICATIONS_STREAM_IDLE_POLL_SECONDS
+    started = last_beat = last_read = time.monotonic()
+    unread = None  # always send the initial count
+    woken = None
+    yield f'retry: {int(settings.NOTIFICATIONS_STREAM_RETRY_SECONDS * 1000)}\n\n'
+    while True:
+        sent = False
+        # one cache read per tick; the database only when inbox.wake stamped this user,
+        # or every IDLE_POLL seconds in case a stamp was lost (evicted key, cache restart)
+        stamp = await cache.aget(inbox.STREAM_KEY.format(user_id))
+        if unread is None or stamp != woken or time.monotonic() - last_read >= idle_poll:
+            woken, last_read = stamp, time.monotonic()
+            while True:
+                rows, last_id = await sync_to_async(_since)(user_id, last_id, settings.NOTIFICATIONS_STREAM_BATCH)
+                for notification in rows:
+                    yield _event('notification', _notification_data(notification), notification.id)
+                    sent = True
+                if len(rows) < settings.NOTIFICATIONS_STREAM_BATCH:
+                    break
+            current = await sync_to_async(_unread)(user_id)
+            if current != unread:
+                unread = current
+                yield _event('unread', {'unread': unread})
+                sent = True
+        if sent:
+            last_beat = time.monotonic()
+        elif time.monotonic() - last_beat >= settings.NOTIFICATIONS_STREAM_HEARTBEAT_SECONDS:
+            yield ': ping\n\n'
+            last_beat = time.monotonic()
+        if time.monotonic() - started >= settings.NOTIFICATIONS_STREAM_MAX_SECONDS:
+            # EventSource reconnects with Last-Event-ID and resumes where this left off
+            return
+        await asyncio.sleep(poll)
+
+
+async def stream(request):
+    """
+    GET /notifications/stream/ (text/event-stream): an `unread` event now and
+    whenever the count changes, a `notification` event (id = notification id)
+    for each new notification. Reconnects send Last-Event-ID and get what they
+    missed. Serve it with the ASGI application (core.asgi).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'method not allowed'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse({'error': 'authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+
+    response = StreamingHttpResponse(_events(user.pk, last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx would otherwise buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
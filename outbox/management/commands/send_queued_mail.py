@@ -0,0 +1,33 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from outbox.queue import queue_stats, send_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound emails in batches over a shared connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='messages per connection (default OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--loop', action='store_true', help='keep running and poll for new mail')
+        parser.add_argument('--interval', type=float, default=5.0, help='seconds to sleep when the queue is empty (with --loop)')
+        parser.add_argument('--stats', action='store_true', help='print queue depth and send latency, then exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(queue_stats(), indent=2))
+            return
+
+        while True:
+            result = send_batch(batch_size=options['batch_size'])
+            if result['claimed']:
+                self.stdout.write(
+                    f"sent {result['sent']}, failed {result['failed']} in {result['seconds']:.2f}s "
+                    f"(depth {queue_stats()['depth']})"
+                )
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
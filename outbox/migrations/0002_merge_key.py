@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outbox', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='merge_key',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddConstraint(
+            model_name='outboundemail',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending'), models.Q(('merge_key', ''), _negated=True)), fields=('merge_key',), name='outbox_pending_merge_key_uniq'),
+        ),
+    ]
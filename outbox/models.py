@@ -0,0 +1,48 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboundEmail(models.Model):
+    """An email waiting in the outbox; sent later by `manage.py send_queued_mail`."""
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(default=list)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # set while a worker holds the row; stale locks are picked up again
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # messages that collapse into one while unsent share a key (e.g. a parent's approval digest)
+    merge_key = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+        constraints = [
+            # at most one pending message per merge key, whichever process queues it
+            models.UniqueConstraint(
+                fields=['merge_key'], name='outbox_pending_merge_key_uniq',
+                condition=models.Q(status='pending') & ~models.Q(merge_key=''),
+            ),
+        ]
+
+    def __str__(self):
+        return f"OutboundEmail({self.id}) to {', '.join(self.to)} [{self.status}]"
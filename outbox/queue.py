@@ -0,0 +1,213 @@
+"""Durable outbound mail queue.
+
+Views call `enqueue()` and return right away; `send_batch()` (driven by
+`manage.py send_queued_mail`) delivers pending rows over a single backend
+connection and reschedules failures with exponential backoff.
+"""
+import logging
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core import metrics
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _build(subject, body, to, html_body='', from_email=None, send_at=None, merge_key=''):
+    if isinstance(to, str):
+        to = [to]
+    return OutboundEmail(
+        subject=subject,
+        body=body,
+        html_body=html_body or '',
+        from_email=from_email or _setting('DEFAULT_FROM_EMAIL', 'noreply@localhost'),
+        to=list(to),
+        next_attempt_at=send_at or timezone.now(),
+        merge_key=merge_key,
+    )
+
+
+def enqueue(subject, body, to, html_body='', from_email=None, send_at=None, merge_key=''):
+    """
+    Store a message in the outbox and return the saved row; `send_at` holds it
+    back until then. Only one pending row may carry a given `merge_key`
+    (IntegrityError otherwise): see `enqueue_or_merge`.
+    """
+    row = _build(subject, body, to, html_body=html_body, from_email=from_email, send_at=send_at, merge_key=merge_key)
+    row.save()
+    return row
+
+
+def enqueue_or_merge(merge_key, subject, body, to, html_body='', from_email=None, send_at=None):
+    """
+    Replace the content of the message still pending under `merge_key`, or
+    queue a new one (held until `send_at`) when there is none. Returns True
+    when an existing message was rewritten. The pending row is found in the
+    database, so every process merges into the same one.
+    """
+    for attempt in range(3):
+        pending = OutboundEmail.objects.filter(merge_key=merge_key, status=OutboundEmail.STATUS_PENDING)
+        if pending.update(subject=subject, body=body, html_body=html_body or ''):
+            return True
+        try:
+            with transaction.atomic():
+                enqueue(subject, body, to, html_body=html_body, from_email=from_email, send_at=send_at, merge_key=merge_key)
+            return False
+        except IntegrityError:
+            # another process queued one in between: merge into that
+            if attempt == 2:
+                raise
+
+
+def enqueue_many(messages):
+    """Store many messages with one INSERT. `messages` is an iterable of enqueue() kwargs."""
+    rows = [_build(**m) for m in messages]
+    return OutboundEmail.objects.bulk_create(rows)
+
+
+def _claim(batch_size):
+    """Lock up to `batch_size` due rows for this worker and return them."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=_setting('OUTBOX_LOCK_SECONDS', 300))
+    due = (
+        Q(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+        | Q(status=OutboundEmail.STATUS_SENDING, locked_at__lt=stale)
+    )
+    with transaction.atomic():
+        rows = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if rows:
+            OutboundEmail.objects.filter(pk__in=[r.pk for r in rows]).update(
+                status=OutboundEmail.STATUS_SENDING, locked_at=now,
+            )
+    return rows
+
+
+def _retry_delay(attempts):
+    base = _setting('OUTBOX_RETRY_BASE_SECONDS', 30)
+    cap = _setting('OUTBOX_RETRY_MAX_SECONDS', 3600)
+    return min(cap, base * (2 ** max(attempts - 1, 0)))
+
+
+def _mark_failed(row, exc):
+    row.attempts += 1
+    row.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+    row.locked_at = None
+    if row.attempts >= _setting('OUTBOX_MAX_ATTEMPTS', 5):
+        row.status = OutboundEmail.STATUS_FAILED
+        logger.error("Giving up on outbound email %s after %s attempts: %s", row.pk, row.attempts, row.last_error)
+    else:
+        row.status = OutboundEmail.STATUS_PENDING
+        row.next_attempt_at = timezone.now() + timedelta(seconds=_retry_delay(row.attempts))
+        # a newer message may already be pending under the key: the retry no longer takes merges
+        row.merge_key = ''
+        logger.warning("Outbound email %s failed (attempt %s), retrying at %s", row.pk, row.attempts, row.next_attempt_at)
+    row.save(update_fields=['attempts', 'last_error', 'locked_at', 'status', 'next_attempt_at', 'merge_key'])
+
+
+def send_batch(batch_size=None, connection=None):
+    """
+    Send one batch of due messages over a shared connection.
+    Returns a dict with sent/failed counts and elapsed seconds.
+    """
+    batch_size = batch_size or _setting('OUTBOX_BATCH_SIZE', 50)
+    started = time.monotonic()
+    rows = _claim(batch_size)
+    result = {'claimed': len(rows), 'sent': 0, 'failed': 0, 'seconds': 0.0}
+    if not rows:
+        return result
+
+    connection = connection or get_connection(fail_silently=False)
+    sent_ids = []
+    failed_ids = set()
+    sending = time.perf_counter()
+    try:
+        connection.open()
+        for row in rows:
+            msg = EmailMultiAlternatives(row.subject, row.body, row.from_email, row.to, connection=connection)
+            if row.html_body:
+                msg.attach_alternative(row.html_body, 'text/html')
+            try:
+                msg.send(fail_silently=False)
+            except smtplib.SMTPServerDisconnected as exc:
+                # server dropped us mid-batch: reopen once for the rest of the batch
+                _mark_failed(row, exc)
+                failed_ids.add(row.pk)
+                connection.close()
+                connection.open()
+            except Exception as exc:
+                _mark_failed(row, exc)
+                failed_ids.add(row.pk)
+            else:
+                sent_ids.append(row.pk)
+    except Exception as exc:
+        # could not (re)open the connection: reschedule everything not yet sent
+        logger.exception("Outbox connection failed: %s", exc)
+        done = failed_ids.union(sent_ids)
+        for row in rows:
+            if row.pk not in done:
+                _mark_failed(row, exc)
+                failed_ids.add(row.pk)
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+        # the worker runs outside any view: label its sends as email, not the generic 'background'
+        metrics.observe_email(time.perf_counter() - sending, len(sent_ids), view='email')
+        if sent_ids:
+            OutboundEmail.objects.filter(pk__in=sent_ids).update(
+                status=OutboundEmail.STATUS_SENT, sent_at=timezone.now(), locked_at=None, last_error='',
+            )
+
+    result['sent'] = len(sent_ids)
+    result['failed'] = len(failed_ids)
+    result['seconds'] = time.monotonic() - started
+    return result
+
+
+def queue_stats(sample=500):
+    """Queue depth per status, age of the oldest due message and recent send latency."""
+    counts = {s: 0 for s, _ in OutboundEmail.STATUS_CHOICES}
+    for row in OutboundEmail.objects.values('status').annotate(n=Count('id')).order_by():
+        counts[row['status']] = row['n']
+
+    now = timezone.now()
+    oldest = (
+        OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING)
+        .order_by('created_at').values_list('created_at', flat=True).first()
+    )
+    recent = list(
+        OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENT, sent_at__isnull=False)
+        .order_by('-sent_at').values_list('created_at', 'sent_at')[:sample]
+    )
+    latencies = sorted((sent - created).total_seconds() for created, sent in recent)
+
+    def pct(p):
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+    return {
+        'depth': counts[OutboundEmail.STATUS_PENDING] + counts[OutboundEmail.STATUS_SENDING],
+        'by_status': counts,
+        'oldest_pending_seconds': (now - oldest).total_seconds() if oldest else None,
+        'latency_p50_seconds': pct(0.50),
+        'latency_p95_seconds': pct(0.95),
+    }
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from outbox.models import OutboundEmail
+from outbox.queue import enqueue, enqueue_or_merge, send_batch
+
+
+class RejectingBackend(EmailBackend):
+    """The locmem backend, except that mail to bounce@example.com fails."""
+
+    def send_messages(self, messages):
+        if any('bounce@example.com' in message.to for message in messages):
+            raise ConnectionRefusedError('rejected')
+        return super().send_messages(messages)
+
+
+class OutboxTests(TestCase):
+    def test_registration_mail_waits_for_the_worker(self):
+        response = self.client.post('/users/register/', {
+            'email': 'kid@example.com', 'password': 'Str0ng-pass!', 'password_confirm': 'Str0ng-pass!',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        row = OutboundEmail.objects.get(to=['kid@example.com'])
+        self.assertEqual(row.status, OutboundEmail.STATUS_PENDING)
+
+        result = send_batch()
+        self.assertEqual((result['claimed'], result['sent'], result['failed']), (1, 1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['kid@example.com'])
+        self.assertEqual(mail.outbox[0].alternatives[0].mimetype, 'text/html')
+        row.refresh_from_db()
+        self.assertEqual(row.status, OutboundEmail.STATUS_SENT)
+        self.assertIsNotNone(row.sent_at)
+
+    def test_batch_shares_one_connection(self):
+        for i in range(3):
+            enqueue('Hello', 'Body', [f'user{i}@example.com'])
+        connection = EmailBackend()
+        opened = []
+        connection.open = lambda: opened.append(True)
+        self.assertEqual(send_batch(connection=connection)['sent'], 3)
+        self.assertEqual(len(opened), 1)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['user0@example.com', 'user1@example.com', 'user2@example.com'])
+
+    @override_settings(EMAIL_BACKEND='outbox.tests.RejectingBackend', OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_send_is_retried_then_given_up(self):
+        enqueue('Hello', 'Body', ['bounce@example.com'])
+        enqueue('Hello', 'Body', ['ok@example.com'])
+        result = send_batch()
+        self.assertEqual((result['sent'], result['failed']), (1, 1))
+        self.assertEqual([m.to for m in mail.outbox], [['ok@example.com']])
+
+        row = OutboundEmail.objects.get(to=['bounce@example.com'])
+        self.assertEqual((row.status, row.attempts), (OutboundEmail.STATUS_PENDING, 1))
+        self.assertIn('rejected', row.last_error)
+        self.assertGreater(row.next_attempt_at, timezone.now())
+        self.assertEqual(send_batch()['claimed'], 0)  # backing off
+
+        OutboundEmail.objects.filter(pk=row.pk).update(next_attempt_at=timezone.now())
+        send_batch()
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (OutboundEmail.STATUS_FAILED, 2))
+
+    def test_send_at_holds_the_message_back(self):
+        enqueue('Later', 'Body', ['later@example.com'], send_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(send_batch()['claimed'], 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_merge_rewrites_the_pending_message(self):
+        send_at = timezone.now() + timedelta(minutes=5)
+        self.assertFalse(enqueue_or_merge('digest:a', 'One', 'first', ['a@example.com'], send_at=send_at))
+        self.assertTrue(enqueue_or_merge('digest:a', 'Two', 'second', ['a@example.com'], send_at=send_at))
+        self.assertFalse(enqueue_or_merge('digest:b', 'Other', 'body', ['b@example.com'], send_at=send_at))
+        self.assertEqual(
+            list(OutboundEmail.objects.order_by('id').values_list('merge_key', 'subject')),
+            [('digest:a', 'Two'), ('digest:b', 'Other')],
+        )
@@ -0,0 +1,144 @@
+"""Write-behind like/comment counters for Post.
+
+A Like or Comment change inserts a PostCounterDelta row in the same
+transaction as the change itself, instead of updating the Post row: inserts
+never wait on each other, however popular the post. `flush()` (run by any
+process every POST_COUNTER_FLUSH_SECONDS, or after POST_COUNTER_FLUSH_SIZE
+local changes) claims the pending rows, applies them in batched
+`UPDATE ... SET like_count = like_count + n` statements, one per distinct
+delta, and deletes them.
+
+The deltas live in the database, so every process sees the same pending
+set: `manage.py reconcile_post_counters` sets each post to its true count
+minus what is still pending, and the flush that follows lands exactly.
+
+Each UPDATE also folds the delta into the post's time-decayed trending score
+(posts.trending.score_update).
+"""
+import atexit
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+
+# pending rows claimed per flush transaction
+FLUSH_BATCH = 5000
+
+_lock = threading.Lock()
+_ops = 0
+_last_flush = time.monotonic()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def record(post_id, likes=0, comments=0):
+    """Record a change to a post's counters; call it in the transaction making the change."""
+    record_many([post_id], likes, comments)
+
+
+def record_many(post_ids, likes=0, comments=0):
+    """Record the same change to each of `post_ids` with one INSERT."""
+    global _ops
+    from .models import PostCounterDelta
+    PostCounterDelta.objects.bulk_create([
+        PostCounterDelta(post_id=post_id, likes=likes, comments=comments) for post_id in post_ids
+    ])
+    with _lock:
+        _ops += len(post_ids)
+
+
+def _flush_overdue():
+    return time.monotonic() - _last_flush >= _setting('POST_COUNTER_FLUSH_SECONDS', 5)
+
+
+def flush_if_due(**kwargs):
+    if _ops >= _setting('POST_COUNTER_FLUSH_SIZE', 100) or (_ops and _flush_overdue()):
+        flush()
+
+
+def flush():
+    """Apply every pending delta, whichever process recorded it. Returns the number of UPDATE statements issued."""
+    global _ops, _last_flush
+    with _lock:
+        _ops = 0
+        _last_flush = time.monotonic()
+
+    statements = 0
+    while True:
+        claimed, updates = _flush_batch()
+        statements += updates
+        if claimed < FLUSH_BATCH:
+            return statements
+
+
+def _flush_batch():
+    from .models import Post, PostCounterDelta
+    from .trending import score_update
+    with transaction.atomic():
+        # skip_locked: concurrent flushes claim disjoint rows
+        rows = list(
+            PostCounterDelta.objects.select_for_update(skip_locked=True).order_by('id')
+            .values_list('id', 'post_id', 'likes', 'comments')[:FLUSH_BATCH]
+        )
+        if not rows:
+            return 0, 0
+        totals = defaultdict(lambda: [0, 0])
+        for _, post_id, likes, comments in rows:
+            totals[post_id][0] += likes
+            totals[post_id][1] += comments
+
+        by_delta = defaultdict(list)
+        for post_id, (likes, comments) in totals.items():
+            if likes or comments:
+                by_delta[(likes, comments)].append(post_id)
+
+        now = time.time()
+        for delta, post_ids in by_delta.items():
+            Post.objects.filter(pk__in=post_ids).update(
+                like_count=Greatest(F('like_count') + delta[0], 0),
+                comment_count=Greatest(F('comment_count') + delta[1], 0),
+                **score_update(*delta, now=now),
+            )
+        PostCounterDelta.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    return len(rows), len(by_delta)
+
+
+def pending(post_ids):
+    """Deltas recorded for `post_ids` and not yet flushed: `{post_id: (likes, comments)}`, one query."""
+    from .models import PostCounterDelta
+    rows = (
+        PostCounterDelta.objects.filter(post_id__in=post_ids).order_by().values('post_id')
+        .annotate(likes=Sum('likes'), comments=Sum('comments'))
+        .values_list('post_id', 'likes', 'comments')
+    )
+    return {post_id: (likes, comments) for post_id, likes, comments in rows}
+
+
+def counts(post, pending_deltas=None):
+    """
+    Current `(likes, comments)` for `post`: stored totals plus pending deltas.
+    Pass `pending_deltas` (from `pending()`) to avoid a query per post.
+    """
+    if pending_deltas is None:
+        pending_deltas = pending([post.pk])
+    likes, comments = pending_deltas.get(post.pk, (0, 0))
+    return max(post.like_count + likes, 0), max(post.comment_count + comments, 0)
+
+
+def _flush_at_exit():
+    if not _ops:
+        return
+    try:
+        flush()
+    except Exception:
+        # database may already be gone at interpreter shutdown; the rows wait for the next flush
+        pass
+
+
+atexit.register(_flush_at_exit)
@@ -0,0 +1,144 @@
+"""Home feed: fan-out-on-write into TimelineEntry, fan-out-on-read for big authors.
+
+When a post is created it is copied into the timeline of every follower
+(and the author), so reading a feed is a single indexed range scan on
+`(owner, created_at)`. Authors with more than FEED_FANOUT_LIMIT followers
+(per FollowStats, the same rows for every process) are skipped at write
+time; their posts are pulled at read time and merged in by keyset. Nothing
+else is pulled: a timeline holds at most FEED_MAX_ENTRIES entries, and the
+feed ends there.
+"""
+import heapq
+
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from core.pagination import DEFAULT_PAGE_SIZE, encode_cursor, keyset_filter
+
+from followers.models import Follower, FollowStats
+
+from .models import Post, TimelineEntry
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def fanout_limit():
+    return _setting('FEED_FANOUT_LIMIT', 5000)
+
+
+def celebrities():
+    """FollowStats of authors whose followers exceed the fan-out limit (served by followstats_followers_idx)."""
+    return FollowStats.objects.filter(followers_count__gt=fanout_limit())
+
+
+def is_celebrity(author_id):
+    return celebrities().filter(user_id=author_id).exists()
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Copy `post` into its author's and followers' timelines. Returns the number of timelines written."""
+    owners = {post.author_id}
+    # too many followers: readers pull this author's posts instead
+    if not is_celebrity(post.author_id):
+        owners.update(Follower.objects.filter(user_id=post.author_id).values_list('follower_id', flat=True))
+    _bulk_insert([
+        TimelineEntry(owner_id=owner_id, post_id=post.pk, author_id=post.author_id, created_at=post.created_at)
+        for owner_id in owners
+    ])
+    return len(owners)
+
+
+def backfill(owner_id, author_id):
+    """Seed `owner`'s timeline with `author`'s recent posts after a follow."""
+    if is_celebrity(author_id):
+        return 0
+    recent = (
+        Post.objects.filter(author_id=author_id).order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:_setting('FEED_BACKFILL_POSTS', 50)]
+    )
+    entries = [
+        TimelineEntry(owner_id=owner_id, post_id=pk, author_id=author_id, created_at=created_at)
+        for pk, created_at in recent
+    ]
+    _bulk_insert(entries)
+    return len(entries)
+
+
+def backfill_many(owner_id, author_ids):
+    """backfill for many authors at once: one query for all their recent posts, one insert."""
+    author_ids = set(author_ids) - set(celebrities().filter(user_id__in=author_ids).values_list('user_id', flat=True))
+    if not author_ids:
+        return 0
+    recent = (
+        Post.objects.filter(author_id__in=author_ids)
+        .annotate(rank=Window(RowNumber(), partition_by=F('author_id'), order_by=[F('created_at').desc(), F('id').desc()]))
+        .filter(rank__lte=_setting('FEED_BACKFILL_POSTS', 50))
+        .values_list('id', 'author_id', 'created_at')
+    )
+    entries = [
+        TimelineEntry(owner_id=owner_id, post_id=pk, author_id=author_id, created_at=created_at)
+        for pk, author_id, created_at in recent
+    ]
+    _bulk_insert(entries)
+    return len(entries)
+
+
+def remove_author(owner_id, author_id):
+    """Drop `author`'s posts from `owner`'s timeline after an unfollow."""
+    return TimelineEntry.objects.filter(owner_id=owner_id, author_id=author_id).delete()[0]
+
+
+def trim_timeline(owner_id, keep=None):
+    """Keep only the newest `keep` entries for `owner`; the feed ends with the oldest one kept."""
+    keep = keep or _setting('FEED_MAX_ENTRIES', 1000)
+    boundary = (
+        TimelineEntry.objects.filter(owner_id=owner_id).order_by('-created_at', '-post_id')
+        .values_list('created_at', 'post_id')[keep:keep + 1]
+    )
+    boundary = list(boundary)
+    if not boundary:
+        return 0
+    # delete the boundary row and everything older (pk + 1 makes the boundary inclusive)
+    return keyset_filter(
+        TimelineEntry.objects.filter(owner_id=owner_id), (boundary[0][0], boundary[0][1] + 1), fields=('created_at', 'post_id'),
+    ).delete()[0]
+
+
+def _key(post):
+    return post.created_at, post.pk
+
+
+def get_feed(user, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return `(posts, next_cursor)` for `user`'s home feed, newest first:
+    the materialized timeline merged with the posts of followed celebrity
+    authors. Both are read by the same keyset, `limit + 1` rows each, so
+    the merged page and its cursor are exact. Two queries.
+    """
+    entries = (
+        keyset_filter(TimelineEntry.objects.filter(owner_id=user.pk), cursor, fields=('created_at', 'post_id'))
+        .order_by('-created_at', '-post_id')
+        .select_related('post__author')[:limit + 1]
+    )
+    followed_celebrities = Follower.objects.filter(
+        follower_id=user.pk, user_id__in=celebrities().values('user_id'),
+    ).values('user_id')
+    pulled = (
+        keyset_filter(Post.objects.filter(author_id__in=followed_celebrities), cursor)
+        .order_by('-created_at', '-id').select_related('author')[:limit + 1]
+    )
+
+    page, seen = [], set()
+    # a post fanned out before its author became a celebrity comes from both sides
+    for post in heapq.merge([e.post for e in entries], list(pulled), key=_key, reverse=True):
+        if post.pk not in seen:
+            seen.add(post.pk)
+            page.append(post)
+    next_cursor = encode_cursor(*_key(page[limit - 1])) if len(page) > limit else None
+    return page[:limit], next_cursor
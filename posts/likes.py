@@ -0,0 +1,49 @@
+"""Many likes/unlikes for one user in a constant number of statements.
+
+`like_many` inserts with `bulk_create(ignore_conflicts=True)`, so a like that
+already exists (or races in concurrently) is skipped by the database rather
+than raising on the (post, user) unique constraint. Which rows this call
+actually inserted is read back afterwards: a row carrying the created_at this
+call stamped is ours, one with another timestamp was inserted by a concurrent
+like and is left to whoever inserted it. bulk_create sends no post_save, so
+the counter delta posts.signals.count_like would record is written here for
+the inserted rows only (one INSERT, in the same transaction), and the
+notifications are sent on commit. `unlike_many` is one queryset delete; its post_delete
+signals record a delta per removed like, as for a single unlike.
+"""
+from django.db import transaction
+
+from . import counters
+from .models import Like
+
+
+def _after_like_many(user_id, post_ids):
+    from notifications.inbox import notify_likes
+    notify_likes(user_id, post_ids)
+
+
+def _liked(user, post_ids):
+    return set(Like.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True))
+
+
+def like_many(user, post_ids):
+    """Like every post in `post_ids` (which must exist); returns the ids this call liked."""
+    existing = _liked(user, post_ids)
+    likes = [Like(user=user, post_id=pid) for pid in dict.fromkeys(post_ids) if pid not in existing]
+    if not likes:
+        return []
+    Like.objects.bulk_create(likes, ignore_conflicts=True)
+    # bulk_create stamped created_at on each object; a conflicting row kept its own
+    stamped = {like.post_id: like.created_at for like in likes}
+    stored = Like.objects.filter(user=user, post_id__in=list(stamped)).values_list('post_id', 'created_at')
+    inserted = {pid for pid, created_at in stored if stamped[pid] == created_at}
+    new = [pid for pid in stamped if pid in inserted]
+    if new:
+        counters.record_many(new, likes=1)
+        transaction.on_commit(lambda: _after_like_many(user.pk, new))
+    return new
+
+
+def unlike_many(user, post_ids):
+    """Remove the user's likes of `post_ids`; returns how many were removed."""
+    return Like.objects.filter(user=user, post_id__in=post_ids).delete()[1].get(Like._meta.label, 0)
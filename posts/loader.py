@@ -0,0 +1,46 @@
+"""Batch loading of everything a post card shows.
+
+`load_posts` takes a page of posts (authors already joined) and attaches, in
+three queries whatever the page size:
+
+- `post.latest_comments`: the newest `comments` comments with their authors,
+  via a sliced Prefetch, which Django runs as one ROW_NUMBER() window query
+  partitioned by post;
+- `post.liked_by_me`: whether `viewer` liked it, from one `post_id IN (...)`
+  lookup;
+- `post.attached_media`: its photos and clips in order, blobs joined.
+
+Like and comment totals come from the denormalized counters (posts.counters),
+so they cost nothing extra.
+"""
+from django.db.models import Prefetch, prefetch_related_objects
+
+from media.models import PostMedia
+
+from .models import Comment, Like
+
+
+def load_posts(posts, viewer, comments=3):
+    """Attach `latest_comments` and `liked_by_me` to every post in `posts`; returns `posts`."""
+    posts = list(posts)
+    if not posts:
+        return posts
+
+    if comments > 0:
+        newest = Comment.objects.select_related('author').order_by('-created_at', '-id')[:comments]
+        prefetch_related_objects(posts, Prefetch('comments', queryset=newest, to_attr='latest_comments'))
+    else:
+        for post in posts:
+            post.latest_comments = []
+
+    liked = set()
+    if viewer is not None and viewer.is_authenticated:
+        liked = set(
+            Like.objects.filter(user=viewer, post_id__in=[p.pk for p in posts]).values_list('post_id', flat=True)
+        )
+    for post in posts:
+        post.liked_by_me = post.pk in liked
+
+    attached = PostMedia.objects.select_related('blob').order_by('position')
+    prefetch_related_objects(posts, Prefetch('media', queryset=attached, to_attr='attached_media'))
+    return posts
@@ -0,0 +1,102 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from followers.models import Follower
+from posts.feed import get_feed
+from posts.models import Post, TimelineEntry
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = 'Measure home-feed latency as follows and posts grow (synthetic data, rolled back afterwards).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--follows', default='10,100,1000', help='comma separated followed-author counts')
+        parser.add_argument('--posts-per-author', type=int, default=20)
+        parser.add_argument('--runs', type=int, default=200, help='feed reads per scenario')
+        parser.add_argument('--pages', type=int, default=5, help='pages walked per read')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.stdout.write(f"{'follows':>8} {'posts':>8} {'feed p50 ms':>12} {'feed p99 ms':>12} {'naive p50 ms':>13} {'naive p99 ms':>13}")
+        for follows in [int(n) for n in options['follows'].split(',')]:
+            try:
+                with transaction.atomic():
+                    row = self._scenario(follows, options)
+                    raise _Rollback
+            except _Rollback:
+                pass
+            self.stdout.write(
+                f"{follows:>8} {row['posts']:>8} {row['feed_p50']:>12.2f} {row['feed_p99']:>12.2f} "
+                f"{row['naive_p50']:>13.2f} {row['naive_p99']:>13.2f}"
+            )
+
+    def _scenario(self, follows, options):
+        tag = f"bench{follows}x{random.randrange(1 << 30)}"
+        reader = User.objects.create(username=f"{tag}-reader", email=f"{tag}-reader@bench.local")
+        authors = User.objects.bulk_create([
+            User(username=f"{tag}-a{i}", email=f"{tag}-a{i}@bench.local", password='!') for i in range(follows)
+        ])
+        Follower.objects.bulk_create([Follower(user=a, follower=reader) for a in authors])
+
+        now = timezone.now()
+        posts = Post.objects.bulk_create([
+            Post(author=a, content='bench')
+            for a in authors for _ in range(options['posts_per_author'])
+        ], batch_size=1000)
+        # auto_now_add stamps one instant; spread posts out so ordering is meaningful
+        for p in posts:
+            p.created_at = now - timedelta(seconds=random.randrange(30 * 86400))
+        Post.objects.bulk_update(posts, ['created_at'], batch_size=1000)
+        # what fan-out-on-write would have produced for the reader
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(owner=reader, post=p, author_id=p.author_id, created_at=p.created_at) for p in posts
+        ], batch_size=1000)
+
+        def walk_feed():
+            cursor = None
+            for _ in range(options['pages']):
+                _, cursor = get_feed(reader, cursor, 20)
+                if not cursor:
+                    break
+
+        def walk_naive():
+            offset = 0
+            for _ in range(options['pages']):
+                list(
+                    Post.objects.filter(author__in=Follower.objects.filter(follower=reader).values('user_id'))
+                    .select_related('author').order_by('-created_at')[offset:offset + 20]
+                )
+                offset += 20
+
+        return {
+            'posts': len(posts),
+            **self._time('feed', walk_feed, options['runs']),
+            **self._time('naive', walk_naive, options['runs']),
+        }
+
+    def _time(self, name, fn, runs):
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        return {f'{name}_p50': statistics.median(samples), f'{name}_p99': _percentile(samples, 0.99)}
@@ -0,0 +1,78 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from posts.loader import load_posts
+from posts.models import Comment, Like, Post
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Load pages of posts with their latest comments and likes at growing page sizes (synthetic data, '
+        'rolled back) and fail if the query count grows with the page size.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,10,50,100', help='comma separated page sizes')
+        parser.add_argument('--comments-per-post', type=int, default=10)
+        parser.add_argument('--preview', type=int, default=3, help='comments loaded per post')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        sizes = [int(n) for n in options['sizes'].split(',')]
+        try:
+            with transaction.atomic():
+                rows = self._measure(sizes, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"{'page size':>10} {'queries':>8} {'ms':>8}")
+        for size, queries, ms in rows:
+            self.stdout.write(f"{size:>10} {queries:>8} {ms:>8.2f}")
+        if len({queries for _, queries, _ in rows}) > 1:
+            raise CommandError('query count depends on the page size (N+1 in posts.loader or its callers)')
+        self.stdout.write(self.style.SUCCESS(f'constant: {rows[0][1]} queries per page'))
+
+    def _measure(self, sizes, options):
+        tag = f"loader{random.randrange(1 << 30)}"
+        users = User.objects.bulk_create([
+            User(username=f"{tag}-u{i}", email=f"{tag}-u{i}@bench.local", password='!') for i in range(20)
+        ])
+        viewer = users[0]
+        posts = Post.objects.bulk_create([
+            Post(author=random.choice(users), content='bench') for _ in range(max(sizes))
+        ])
+        Comment.objects.bulk_create([
+            Comment(post=p, author=random.choice(users), text='bench')
+            for p in posts for _ in range(options['comments_per_post'])
+        ], batch_size=1000)
+        Like.objects.bulk_create([Like(post=p, user=viewer) for p in posts[::2]])
+        ids = [p.pk for p in posts]
+
+        rows = []
+        for size in sizes:
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                page = load_posts(
+                    Post.objects.filter(pk__in=ids[:size]).select_related('author'), viewer, options['preview'],
+                )
+                # touch everything a post card renders
+                for post in page:
+                    post.author.username, post.liked_by_me
+                    for comment in post.latest_comments:
+                        comment.author.username
+                elapsed = (time.perf_counter() - started) * 1000
+            rows.append((size, len(queries), elapsed))
+        return rows
@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+from posts import counters
+from posts.models import Comment, Like, Post, PostCounterDelta
+
+
+def _count_of(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(post=OuterRef('pk')).order_by().values('post')
+            .annotate(n=Count('id')).values('n'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _pending_of(field):
+    return Coalesce(
+        Subquery(
+            PostCounterDelta.objects.filter(post=OuterRef('pk')).order_by().values('post')
+            .annotate(n=Sum(field)).values('n'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Recompute exact Post.like_count / comment_count from Like and Comment rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='posts updated per transaction')
+
+    def handle(self, *args, **options):
+        # not required for correctness, but leaves less pending to subtract
+        counters.flush()
+        chunk = options['chunk_size']
+        started = time.monotonic()
+        last_id, fixed, scanned = 0, 0, 0
+        while True:
+            ids = list(
+                Post.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                # lock the chunk so no flush applies deltas between the read and the write;
+                # NO KEY: likes and comments (which key-share the post) are not blocked
+                chunk_posts = Post.objects.filter(pk__gte=ids[0], pk__lte=ids[-1])
+                list(chunk_posts.select_for_update(no_key=True).values_list('pk', flat=True))
+                # what the counters should hold once the deltas still pending are flushed
+                drifted = (
+                    chunk_posts
+                    .annotate(
+                        true_likes=Greatest(_count_of(Like) - _pending_of('likes'), 0),
+                        true_comments=Greatest(_count_of(Comment) - _pending_of('comments'), 0),
+                    )
+                    .exclude(like_count=F('true_likes'), comment_count=F('true_comments'))
+                    .values_list('pk', 'true_likes', 'true_comments')
+                )
+                for pk, likes, comments in drifted:
+                    Post.objects.filter(pk=pk).update(like_count=likes, comment_count=comments)
+                    fixed += 1
+            scanned += len(ids)
+            last_id = ids[-1]
+        elapsed = time.monotonic() - started
+        self.stdout.write(f"scanned {scanned} posts, corrected {fixed} in {elapsed:.2f}s")
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored per-age-group trending lists from the decayed post scores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=None, help='posts kept per group (default TRENDING_SIZE)')
+        parser.add_argument('--loop', action='store_true', help='keep running and refresh every --interval seconds')
+        parser.add_argument('--interval', type=float, default=60.0, help='seconds between refreshes (with --loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            sizes = trending.refresh(size=options['size'])
+            self.stdout.write(
+                ', '.join(f'{group}: {n}' for group, n in sizes.items())
+                + f' ({time.perf_counter() - started:.2f}s)'
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
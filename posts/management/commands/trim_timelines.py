@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from posts.feed import trim_timeline
+from posts.models import TimelineEntry
+
+
+class Command(BaseCommand):
+    help = 'Bound materialized home-feed timelines to FEED_MAX_ENTRIES rows per user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=None, help='entries to keep per user (default FEED_MAX_ENTRIES)')
+
+    def handle(self, *args, **options):
+        keep = options['keep'] or settings.FEED_MAX_ENTRIES
+        owners = (
+            TimelineEntry.objects.values('owner_id').annotate(n=Count('id')).filter(n__gt=keep)
+            .values_list('owner_id', flat=True)
+        )
+        removed = 0
+        for owner_id in owners.iterator():
+            removed += trim_timeline(owner_id, keep)
+        self.stdout.write(f"removed {removed} timeline entries")
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trend_at',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='trend_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['trend_at'], name='post_trend_at_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_export_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingList',
+            fields=[
+                ('group', models.CharField(max_length=10, primary_key=True, serialize=False)),
+                ('refreshed_at', models.FloatField()),
+                ('posts', models.JSONField(default=list)),
+            ],
+        ),
+    ]
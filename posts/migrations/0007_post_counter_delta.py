@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_trending_list'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCounterDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('likes', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('post', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='posts.post')),
+            ],
+        ),
+    ]
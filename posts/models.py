@@ -6,6 +6,22 @@ class Post(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # denormalized totals, maintained by posts.counters (reconcile_post_counters fixes drift)
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # time-decayed engagement as of trend_at (unix seconds), maintained by posts.trending
+    trend_score = models.FloatField(default=0.0)
+    trend_at = models.FloatField(default=0.0)
+
+    class Meta:
+        indexes = [
+            # keyset pagination of a user's posts: WHERE author = ? AND (created_at, id) < cursor
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_recent_idx'),
+            # trending refresh only reads posts engaged with inside the window
+            models.Index(fields=['trend_at'], name='post_trend_at_idx'),
+            # exports walk the whole table in (created_at, id) order, from a watermark
+            models.Index(fields=['created_at', 'id'], name='post_created_idx'),
+        ]
 
     def __str__(self):
         return f"Post({self.id}) by {self.author}"
@@ -17,8 +33,14 @@ class Comment(models.Model):
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', '-created_at', '-id'], name='comment_post_recent_idx'),
+            models.Index(fields=['created_at', 'id'], name='comment_created_idx'),
+        ]
+
     def __str__(self):
-        return f"Comment({self.id}) on Post({self.post.id})"
+        return f"Comment({self.id}) on Post({self.post_id})"
 
 
 class Like(models.Model):
@@ -28,6 +50,51 @@ class Like(models.Model):
 
     class Meta:
         unique_together = ('post', 'user')
+        indexes = [
+            models.Index(fields=['post', '-created_at', '-id'], name='like_post_recent_idx'),
+            models.Index(fields=['created_at', 'id'], name='like_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Like(user={self.user_id}, post={self.post_id})"
+
+
+class TimelineEntry(models.Model):
+    """Materialized home-feed row: `post` fanned out into `owner`'s timeline."""
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    # denormalized from the post so unfollow and paging never join Post
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('owner', 'post')
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-post'], name='timeline_owner_recent_idx'),
+            models.Index(fields=['owner', 'author'], name='timeline_owner_author_idx'),
+        ]
+
+    def __str__(self):
+        return f"TimelineEntry(owner={self.owner_id}, post={self.post_id})"
+
+
+class TrendingList(models.Model):
+    """One age group's top posts as of the last posts.trending.refresh(), shared by every process."""
+    group = models.CharField(max_length=10, primary_key=True)
+    refreshed_at = models.FloatField()
+    # [[post_id, score], ...], best first
+    posts = models.JSONField(default=list)
+
+    def __str__(self):
+        return f"TrendingList({self.group}, {len(self.posts)} posts)"
+
+
+class PostCounterDelta(models.Model):
+    """A like/comment change not yet applied to its Post's counters (see posts.counters)."""
+    # no constraint: a delta for a since-deleted post just updates nothing when flushed
+    post = models.ForeignKey(Post, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    likes = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
 
     def __str__(self):
-        return f"Like(user={self.user}, post={self.post.id})"
+        return f"PostCounterDelta(post={self.post_id}, likes={self.likes}, comments={self.comments})"
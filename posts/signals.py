@@ -0,0 +1,53 @@
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from followers.models import Follower
+
+from . import counters, feed
+from .models import Comment, Like, Post
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: feed.fan_out_post(instance))
+
+
+@receiver(post_save, sender=Follower)
+def backfill_on_follow(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: feed.backfill(instance.follower_id, instance.user_id))
+
+
+@receiver(post_delete, sender=Follower)
+def prune_on_unfollow(sender, instance, **kwargs):
+    feed.remove_author(instance.follower_id, instance.user_id)
+
+
+# counter deltas are written in the same transaction as the like or comment,
+# so reconcile_post_counters never sees one without the other
+@receiver(post_save, sender=Like)
+def count_like(sender, instance, created, **kwargs):
+    if created:
+        counters.record(instance.post_id, likes=1)
+
+
+@receiver(post_delete, sender=Like)
+def uncount_like(sender, instance, **kwargs):
+    counters.record(instance.post_id, likes=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.record(instance.post_id, comments=1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.record(instance.post_id, comments=-1)
+
+
+request_finished.connect(counters.flush_if_due, dispatch_uid='posts.counters.flush_if_due')
@@ -0,0 +1,208 @@
+import io
+import time
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from followers.models import Follower, FollowStats
+from posts import counters, feed, likes, trending
+from posts.loader import load_posts
+from posts.models import Comment, Like, Post, PostCounterDelta, TimelineEntry
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'asserts on the SQLite query plan')
+class KeysetPlanTests(TestCase):
+    """Every page of the list endpoints is an index range scan, with no sort step."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(username=f'cook{i}', email=f'cook{i}@example.com') for i in range(3)]
+        cls.post = Post.objects.create(author=cls.users[0], content='soup')
+        for user in cls.users:
+            Post.objects.create(author=cls.users[0], content='more soup')
+            Comment.objects.create(post=cls.post, author=user, text='yummy')
+            Like.objects.create(post=cls.post, user=user)
+
+    def _page_plans(self, url, table):
+        """Query plans of the `table` page query for the first two pages of `url`."""
+        self.client.force_login(self.users[0])
+        plans, cursor = [], None
+        for page in range(2):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, {'limit': 2, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            cursor = response.json()['next_cursor']
+            self.assertEqual(cursor is None, page == 1)
+            sql = next(q['sql'] for q in ctx.captured_queries if f'FROM "{table}"' in q['sql'] and 'ORDER BY' in q['sql'])
+            with connection.cursor() as cur:
+                cur.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans.append(' / '.join(row[-1] for row in cur.fetchall()))
+        return plans
+
+    def assertIndexScan(self, plans, table, index):
+        for plan in plans:
+            self.assertIn(f'SEARCH {table} USING INDEX {index}', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_user_posts(self):
+        plans = self._page_plans(f'/posts/user/{self.users[0].pk}/', 'posts_post')
+        self.assertIndexScan(plans, 'posts_post', 'post_author_recent_idx')
+
+    def test_post_comments(self):
+        plans = self._page_plans(f'/posts/{self.post.pk}/comments/', 'posts_comment')
+        self.assertIndexScan(plans, 'posts_comment', 'comment_post_recent_idx')
+
+    def test_post_likes(self):
+        plans = self._page_plans(f'/posts/{self.post.pk}/likes/', 'posts_like')
+        self.assertIndexScan(plans, 'posts_like', 'like_post_recent_idx')
+
+
+class PostLoaderTests(TestCase):
+    """A page of post cards costs the same number of queries whatever its size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(username=f'cook{i}', email=f'cook{i}@example.com') for i in range(3)]
+        cls.posts = [Post.objects.create(author=cls.users[0], content=f'soup {i}') for i in range(20)]
+        for post in cls.posts:
+            for user in cls.users:
+                Comment.objects.create(post=post, author=user, text='yummy')
+            Like.objects.create(post=post, user=cls.users[1])
+
+    def test_load_posts_runs_three_queries(self):
+        for size in (1, 20):
+            posts = list(Post.objects.select_related('author').order_by('-id')[:size])
+            with self.assertNumQueries(3):
+                load_posts(posts, self.users[1], comments=2)
+            with self.assertNumQueries(0):
+                cards = [(p.liked_by_me, [(c.author.username, c.text) for c in p.latest_comments], p.attached_media) for p in posts]
+            self.assertEqual(cards[0], (True, [('cook2', 'yummy'), ('cook1', 'yummy')], []))
+
+    def test_user_posts_page_query_count_is_fixed(self):
+        self.client.force_login(self.users[1])
+        for limit in (1, 20):
+            # session, user, the page, then load_posts' comments, likes and media
+            with self.assertNumQueries(6):
+                response = self.client.get(f'/posts/user/{self.users[0].pk}/', {'limit': limit})
+            self.assertEqual(len(response.json()['results']), limit)
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(username=f'cook{i}', email=f'cook{i}@example.com') for i in range(3)]
+        cls.post, cls.other = (Post.objects.create(author=cls.users[0], content=c) for c in ('soup', 'stew'))
+
+    def _counts(self, post):
+        post.refresh_from_db()
+        return post.like_count, post.comment_count
+
+    def test_deltas_wait_in_the_database_until_flushed(self):
+        counters.flush()
+        for user in self.users:
+            Like.objects.create(post=self.post, user=user)
+            Like.objects.create(post=self.other, user=user)
+        Comment.objects.create(post=self.post, author=self.users[1], text='yummy')
+        Like.objects.filter(post=self.other, user=self.users[0]).delete()
+        self.assertEqual(PostCounterDelta.objects.count(), 8)
+        self.assertEqual(self._counts(self.post), (0, 0))
+        self.assertEqual(counters.counts(self.post), (3, 1))
+
+        # one UPDATE per distinct delta: (3, 1) and (2, 0)
+        self.assertEqual(counters.flush(), 2)
+        self.assertEqual((self._counts(self.post), self._counts(self.other)), ((3, 1), (2, 0)))
+        self.assertFalse(PostCounterDelta.objects.exists())
+
+    def test_reconcile_leaves_room_for_pending_deltas(self):
+        Like.objects.create(post=self.post, user=self.users[0])
+        counters.flush()
+        Post.objects.filter(pk=self.post.pk).update(like_count=7)  # drift
+        # recorded by another process after reconcile's own flush
+        Like.objects.create(post=self.post, user=self.users[1])
+
+        with mock.patch('posts.counters.flush'):
+            call_command('reconcile_post_counters', stdout=io.StringIO())
+        self.assertEqual(self._counts(self.post), (1, 0))
+        counters.flush()
+        self.assertEqual(self._counts(self.post), (2, 0))
+
+    def test_like_response_includes_pending_deltas(self):
+        self.client.force_login(self.users[1])
+        response = self.client.post(f'/posts/{self.post.pk}/like/')
+        self.assertEqual(response.json()['like_count'], 1)
+        response = self.client.post('/posts/likes/batch/', {
+            'actions': [{'post_id': self.post.pk, 'liked': False}, {'post_id': self.other.pk, 'liked': True}],
+        }, content_type='application/json')
+        self.assertEqual({r['post_id']: r['like_count'] for r in response.json()['results']}, {self.post.pk: 0, self.other.pk: 1})
+
+    def test_like_many_counts_only_the_rows_it_inserted(self):
+        user = self.users[1]
+        # the same like lands from another request between like_many's read and its insert
+        with mock.patch('posts.likes._liked', side_effect=lambda *args: Like.objects.create(post=self.post, user=user) and set()):
+            self.assertEqual(likes.like_many(user, [self.post.pk, self.other.pk]), [self.other.pk])
+        self.assertEqual(counters.pending([self.post.pk, self.other.pk]), {self.post.pk: (1, 0), self.other.pk: (1, 0)})
+
+
+class TrendingTests(TestCase):
+    def test_lists_are_shared_through_the_database(self):
+        kid = User.objects.create(username='kid', email='kid@example.com', age_group='5-10')
+        teen = User.objects.create(username='teen', email='teen@example.com', age_group='15-17')
+        now = time.time()
+        low = Post.objects.create(author=kid, content='toast', trend_score=1.0, trend_at=now)
+        high = Post.objects.create(author=teen, content='cake', trend_score=5.0, trend_at=now)
+        Post.objects.create(author=kid, content='old', trend_score=9.0, trend_at=now - 100 * 3600)
+
+        self.assertEqual(trending.refresh(now=now)['all'], 2)
+        cache.clear()  # another process: nothing local to go on
+        entry = trending.get_trending()
+        self.assertEqual(entry['refreshed_at'], now)
+        self.assertEqual(entry['posts'], [(high.pk, 5.0), (low.pk, 1.0)])
+        self.assertEqual(trending.get_trending('5-10')['posts'], [(low.pk, 1.0)])
+
+        self.client.force_login(kid)
+        response = self.client.get('/posts/trending/')
+        self.assertEqual([p['id'] for p in response.json()['results']], [low.pk])
+
+
+@override_settings(FEED_FANOUT_LIMIT=1)
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.cook, cls.star, cls.fan = [
+            User.objects.create(username=name, email=f'{name}@example.com') for name in ('reader', 'cook', 'star', 'fan')
+        ]
+        # bulk_create: no signals, the follow graph is set up by hand
+        Follower.objects.bulk_create([
+            Follower(user=cls.cook, follower=cls.reader),
+            Follower(user=cls.star, follower=cls.reader),
+            Follower(user=cls.star, follower=cls.fan),
+        ])
+        FollowStats.objects.bulk_create([FollowStats(user=cls.cook, followers_count=1), FollowStats(user=cls.star, followers_count=2)])
+
+    def test_timeline_merged_with_celebrity_posts_only(self):
+        # never fanned out (e.g. trimmed away): not pulled back in
+        Post.objects.create(author=self.cook, content='old')
+        expected = []
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                expected += [Post.objects.create(author=self.cook, content=f'cook {i}'),
+                             Post.objects.create(author=self.star, content=f'star {i}')]
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.reader, author=self.star).exists())
+        expected.reverse()
+
+        pages, cursor = [], None
+        while True:
+            with self.assertNumQueries(2):
+                page, cursor = feed.get_feed(self.reader, cursor, limit=4)
+            pages.append(page)
+            if cursor is None:
+                break
+        self.assertEqual([len(p) for p in pages], [4, 2])
+        self.assertEqual([p.pk for page in pages for p in page], [p.pk for p in expected])
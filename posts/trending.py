@@ -0,0 +1,126 @@
+"""Trending posts: time-decayed engagement scores and per-age-group top lists.
+
+Every post carries `trend_score`, its engagement decayed to `trend_at` (unix
+seconds). A like or comment is applied incrementally by posts.counters in
+the same batched UPDATE as the like/comment totals:
+
+    trend_score = trend_score * exp((trend_at - now) / tau) + weight
+    trend_at    = now
+
+so the score halves every TRENDING_HALF_LIFE_HOURS without any job touching
+idle posts. Unlikes and deleted comments subtract their weight at the time
+they happen (clamped at zero), which is close enough for a ranking.
+
+`refresh()` scans only posts engaged with inside TRENDING_WINDOW_HOURS (via
+the trend_at index), keeps a bounded top-K heap per `User.AGE_CHOICES` group
+(by the author's age group, so kids see posts of kids their age) plus one
+for everybody, and stores the lists as TrendingList rows, so every worker
+process serves the same lists. The trending endpoint reads those rows;
+`manage.py refresh_trending --loop` keeps them current.
+"""
+import heapq
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F, Value
+from django.db.models.functions import Exp, Greatest, Least
+
+from .models import Post, TrendingList
+
+ALL = 'all'
+REFRESH_LOCK_KEY = 'trending:refreshing'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def groups():
+    """Top lists: one per User.AGE_CHOICES value plus ALL."""
+    return [value for value, _ in get_user_model().AGE_CHOICES] + [ALL]
+
+
+def _tau():
+    # e-folding time in seconds for the configured half-life
+    return _setting('TRENDING_HALF_LIFE_HOURS', 6) * 3600 / math.log(2)
+
+
+def weight(likes=0, comments=0):
+    return likes * _setting('TRENDING_LIKE_WEIGHT', 1.0) + comments * _setting('TRENDING_COMMENT_WEIGHT', 3.0)
+
+
+def score_update(likes, comments, now=None):
+    """UPDATE kwargs that decay a post's score to `now` and add the weight of the delta."""
+    now = time.time() if now is None else now
+    # Least(): a post touched "in the future" by a host with a fast clock is not boosted
+    decay = Exp(Least(F('trend_at') - Value(now), Value(0.0)) / Value(_tau()))
+    return {
+        'trend_score': Greatest(F('trend_score') * decay + Value(weight(likes, comments)), Value(0.0)),
+        'trend_at': Value(now),
+    }
+
+
+def current(score, at, now=None):
+    """`score` recorded at `at`, decayed to `now`."""
+    now = time.time() if now is None else now
+    return score * math.exp(min(at - now, 0.0) / _tau())
+
+
+def refresh(now=None, size=None):
+    """Recompute the top lists of every group and store them. Returns {group: number of posts}."""
+    now = time.time() if now is None else now
+    size = size or _setting('TRENDING_SIZE', 50)
+    cutoff = now - _setting('TRENDING_WINDOW_HOURS', 72) * 3600
+    heaps = {group: [] for group in groups()}
+
+    rows = (
+        Post.objects.filter(trend_at__gte=cutoff, trend_score__gt=0)
+        .values_list('id', 'trend_score', 'trend_at', 'author__age_group')
+    )
+    for post_id, score, at, age_group in rows.iterator(chunk_size=2000):
+        entry = (current(score, at, now), post_id)
+        for group in (age_group, ALL):
+            heap = heaps.get(group)
+            if heap is None:
+                continue
+            if len(heap) < size:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+    TrendingList.objects.bulk_create(
+        [
+            TrendingList(
+                group=group, refreshed_at=now,
+                posts=[(post_id, score) for score, post_id in sorted(heap, reverse=True)],
+            )
+            for group, heap in heaps.items()
+        ],
+        update_conflicts=True, unique_fields=['group'], update_fields=['refreshed_at', 'posts'],
+    )
+    return {group: len(heap) for group, heap in heaps.items()}
+
+
+def get_trending(age_group=None):
+    """Stored `{'refreshed_at', 'posts': [(post_id, score), ...]}` for `age_group` (ALL if None), best first."""
+    group = age_group if age_group in groups() else ALL
+    entry = _stored(group)
+    if entry is None:
+        # never refreshed: one request rebuilds, the others serve an empty list meanwhile
+        if cache.add(REFRESH_LOCK_KEY, 1, timeout=60):
+            try:
+                refresh()
+            finally:
+                cache.delete(REFRESH_LOCK_KEY)
+            entry = _stored(group)
+    return entry or {'refreshed_at': None, 'posts': []}
+
+
+def _stored(group):
+    row = TrendingList.objects.filter(group=group).values('refreshed_at', 'posts').first()
+    if row is not None:
+        row['posts'] = [tuple(entry) for entry in row['posts']]
+    return row
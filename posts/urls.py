@@ -0,0 +1,15 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('feed/', views.feed, name='feed'),
+    path('create/', views.create_post, name='create_post'),
+    path('trending/', views.trending, name='trending'),
+    path('user/<int:user_id>/', views.user_posts, name='user_posts'),
+    path('<int:post_id>/', views.post_detail, name='post_detail'),
+    path('likes/batch/', views.like_batch, name='like_batch'),
+    path('<int:post_id>/like/', views.like_post, name='like_post'),
+    path('<int:post_id>/likes/', views.post_likes, name='post_likes'),
+    path('<int:post_id>/comment/', views.comment_post, name='comment_post'),
+    path('<int:post_id>/comments/', views.post_comments, name='post_comments'),
+]
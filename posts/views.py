@@ -1,13 +1,265 @@
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404
 
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
+from core.batching import collapse_actions
+from core.db import read_replica
+from core.pagination import keyset_page, parse_page_size
+from media.models import MediaBlob, PostMedia, Upload
+from media.views import media_data
+
+from . import counters
+from . import feed as feed_service
+from . import trending as trending_service
+from .likes import like_many, unlike_many
+from .loader import load_posts
+from .models import Comment, Like, Post
+
+
+def _post_data(post):
+    # stored totals: at most one counter flush behind
+    return {
+        'id': post.id,
+        'content': post.content,
+        'created_at': post.created_at,
+        'like_count': post.like_count,
+        'comment_count': post.comment_count,
+        'author': _user_data(post.author),
+    }
+
+
+def _post_card(post):
+    """_post_data plus what posts.loader.load_posts attached."""
+    data = _post_data(post)
+    data['liked_by_me'] = post.liked_by_me
+    data['latest_comments'] = [_comment_data(c) for c in post.latest_comments]
+    data['media'] = [media_data(m.blob) for m in post.attached_media]
+    return data
+
+
+def _preview_comments(request):
+    """?comments=N (0..POST_PREVIEW_COMMENTS_MAX), POST_PREVIEW_COMMENTS by default."""
+    try:
+        n = int(request.query_params.get('comments', settings.POST_PREVIEW_COMMENTS))
+    except (TypeError, ValueError):
+        n = settings.POST_PREVIEW_COMMENTS
+    return max(0, min(n, settings.POST_PREVIEW_COMMENTS_MAX))
+
+
+def _user_data(user):
+    return {'id': user.id, 'username': user.username, 'chef_star_name': user.chef_star_name}
+
+
+def _comment_data(comment):
+    return {
+        'id': comment.id,
+        'post_id': comment.post_id,
+        'text': comment.text,
+        'created_at': comment.created_at,
+        'author': _user_data(comment.author),
+    }
+
+
+def _like_data(like):
+    return {'user': _user_data(like.user), 'created_at': like.created_at}
+
+
+def _paged(request, queryset, serialize, load=None):
+    """Run one keyset page of `queryset` and wrap it as {results, next_cursor}; `load(rows)` batch-loads extras."""
+    limit = parse_page_size(request.query_params.get('limit'))
+    try:
+        rows, next_cursor = keyset_page(queryset, request.query_params.get('cursor'), limit)
+    except ValueError:
+        return Response({'error': 'invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    if load is not None:
+        rows = load(rows)
+    return Response({
+        'results': [serialize(r) for r in rows],
+        'next_cursor': next_cursor,
+    }, status=status.HTTP_200_OK)
+
+
+@read_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def feed(request):
+    """
+    Home feed of the authenticated user, newest first.
+    GET /posts/feed/?cursor=<next_cursor>&limit=20&comments=3
+    """
+    limit = parse_page_size(request.query_params.get('limit'))
+    try:
+        posts, next_cursor = feed_service.get_feed(request.user, request.query_params.get('cursor'), limit)
+    except ValueError:
+        return Response({'error': 'invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    posts = load_posts(posts, request.user, _preview_comments(request))
+    return Response({
+        'results': [_post_card(p) for p in posts],
+        'next_cursor': next_cursor,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
 def create_post(request):
-    return HttpResponse('Create post (placeholder)')
+    """POST { "content": "...", "media": [media id, ...] } -> the created post. Media ids come from finished uploads."""
+    content = (request.data.get('content') or '').strip()
+    media_ids = request.data.get('media') or []
+    if not isinstance(media_ids, list) or not all(isinstance(m, str) for m in media_ids):
+        return Response({'error': 'media must be a list of media ids'}, status=status.HTTP_400_BAD_REQUEST)
+    if not content and not media_ids:
+        return Response({'error': 'content or media required'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(media_ids) > settings.MEDIA_MAX_PER_POST:
+        return Response({'error': f'at most {settings.MEDIA_MAX_PER_POST} media per post'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # only media this user uploaded can be attached, even though identical files share a blob
+    blobs = MediaBlob.objects.in_bulk(
+        Upload.objects.filter(owner=request.user, blob__sha256__in=media_ids).values_list('blob_id', flat=True)
+    )
+    by_sha = {blob.sha256: blob for blob in blobs.values()}
+    missing = [m for m in media_ids if m not in by_sha]
+    if missing:
+        return Response({'error': 'unknown media', 'missing': missing}, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        post = Post.objects.create(author=request.user, content=content)
+        PostMedia.objects.bulk_create([
+            PostMedia(post=post, blob=by_sha[sha], position=i) for i, sha in enumerate(media_ids)
+        ])
+    data = _post_data(post)
+    data['media'] = [media_data(by_sha[sha]) for sha in media_ids]
+    return Response(data, status=status.HTTP_201_CREATED)
 
 
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
 def like_post(request, post_id):
-    return HttpResponse(f'Like post {post_id} (placeholder)')
+    """POST likes the post, DELETE removes the like. Both are idempotent."""
+    post = get_object_or_404(Post, pk=post_id)
+    if request.method == 'DELETE':
+        Like.objects.filter(post=post, user=request.user).delete()
+        liked = False
+    else:
+        try:
+            with transaction.atomic():
+                Like.objects.get_or_create(post=post, user=request.user)
+        except IntegrityError:
+            # lost a race with a concurrent like from the same user
+            pass
+        liked = True
+    like_count, _ = counters.counts(post)
+    return Response({'post_id': post.id, 'liked': liked, 'like_count': like_count}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def like_batch(request):
+    """
+    POST { "actions": [{ "post_id": 1, "liked": true }, { "post_id": 2, "liked": false }, ...] }
+    Applies queued likes/unlikes in one round trip; the last action per post wins.
+    Unknown posts are reported as missing. Returns each post's resulting state.
+    """
+    try:
+        wanted = collapse_actions(request.data.get('actions'), 'post_id', 'liked')
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
+    posts = Post.objects.in_bulk(list(wanted))
+    with transaction.atomic():
+        like_many(request.user, [pid for pid, liked in wanted.items() if liked and pid in posts])
+        unlike_many(request.user, [pid for pid, liked in wanted.items() if not liked and pid in posts])
 
+    # reload: pending deltas may have been flushed into the rows meanwhile
+    posts = Post.objects.only('id', 'like_count', 'comment_count').in_bulk(list(posts))
+    pending = counters.pending(list(posts))
+    results = []
+    for pid, liked in wanted.items():
+        if pid in posts:
+            like_count, _ = counters.counts(posts[pid], pending)
+            results.append({'post_id': pid, 'liked': liked, 'like_count': like_count})
+    return Response({
+        'results': results,
+        'missing': [pid for pid in wanted if pid not in posts],
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
 def comment_post(request, post_id):
-    return HttpResponse(f'Comment on post {post_id} (placeholder)')
+    """POST { "text": "..." } -> the created comment."""
+    post = get_object_or_404(Post, pk=post_id)
+    text = (request.data.get('text') or '').strip()
+    if not text:
+        return Response({'error': 'text required'}, status=status.HTTP_400_BAD_REQUEST)
+    with transaction.atomic():
+        # together with the counter delta its post_save records
+        comment = Comment.objects.create(post=post, author=request.user, text=text)
+    return Response(_comment_data(comment), status=status.HTTP_201_CREATED)
+
+
+@read_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def user_posts(request, user_id):
+    """GET /posts/user/<user_id>/?cursor=&limit=&comments= -> the user's posts, newest first."""
+    comments = _preview_comments(request)
+    return _paged(
+        request, Post.objects.filter(author_id=user_id).select_related('author'), _post_card,
+        load=lambda posts: load_posts(posts, request.user, comments),
+    )
+
+
+@read_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def post_detail(request, post_id):
+    """GET /posts/<post_id>/?comments= -> the post with its newest comments and whether you liked it."""
+    post = get_object_or_404(Post.objects.select_related('author'), pk=post_id)
+    load_posts([post], request.user, _preview_comments(request))
+    return Response(_post_card(post), status=status.HTTP_200_OK)
+
+
+@read_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def trending(request):
+    """GET /posts/trending/?limit=&comments= -> top posts for your age group, from the last refresh_trending run."""
+    entry = trending_service.get_trending(request.user.age_group)
+    limit = parse_page_size(request.query_params.get('limit'), maximum=settings.TRENDING_SIZE)
+    top = entry['posts'][:limit]
+    found = Post.objects.select_related('author').in_bulk([post_id for post_id, _ in top])
+    # posts deleted since the refresh simply drop out
+    posts = [found[post_id] for post_id, _ in top if post_id in found]
+    load_posts(posts, request.user, _preview_comments(request))
+    scores = dict(top)
+    results = []
+    for post in posts:
+        data = _post_card(post)
+        data['trend_score'] = scores[post.id]
+        results.append(data)
+    return Response({
+        'age_group': request.user.age_group or trending_service.ALL,
+        'refreshed_at': entry['refreshed_at'],
+        'results': results,
+    }, status=status.HTTP_200_OK)
+
+
+@read_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def post_comments(request, post_id):
+    """GET /posts/<post_id>/comments/?cursor=&limit= -> comments, newest first."""
+    return _paged(request, Comment.objects.filter(post_id=post_id).select_related('author'), _comment_data)
+
+
+@read_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def post_likes(request, post_id):
+    """GET /posts/<post_id>/likes/?cursor=&limit= -> users who liked the post, newest first."""
+    return _paged(request, Like.objects.filter(post_id=post_id).select_related('user'), _like_data)
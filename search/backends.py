@@ -0,0 +1,213 @@
+"""Full-text index storage per database vendor.
+
+Posts and users are indexed in side tables created by search/migrations:
+FTS5 virtual tables on SQLite, tsvector tables with GIN indexes on
+PostgreSQL. Other databases fall back to `icontains` scans (no index).
+
+Every backend returns hits as `(score, id)` where a lower score is a better
+match, so callers paginate with the same `(score, id) > cursor` keyset
+whatever the engine.
+"""
+import re
+from abc import ABC, abstractmethod
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Q
+
+KINDS = ('post', 'user')
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def terms(query):
+    """Words of a user query, lowercased; punctuation and operators are dropped."""
+    return _WORD.findall((query or '').lower())
+
+
+class Backend(ABC):
+    def __init__(self, using='default'):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def create(self):
+        """Create the index tables (migrations call this)."""
+
+    def drop(self):
+        """Drop the index tables."""
+
+    def index(self, kind, rows):
+        """Insert or replace documents. Posts: `(id, content)`; users: `(id, username, chef_star_name)`."""
+
+    def remove(self, kind, ids):
+        """Delete documents by id."""
+
+    def clear(self, kind):
+        """Delete every document of `kind`."""
+
+    def optimize(self, kind):
+        """Compact the index after a bulk load."""
+
+    @abstractmethod
+    def search(self, kind, query, after=None, limit=20):
+        """Up to `limit` `(score, id)` hits for `query` sorted best first, strictly after `after`."""
+
+
+class SQLiteBackend(Backend):
+    TABLES = {'post': 'search_post_fts', 'user': 'search_user_fts'}
+    COLUMNS = {'post': ('content',), 'user': ('username', 'chef_star_name')}
+    # porter stemming matches "baking" to "bake" in recipes; names are matched as written
+    TOKENIZERS = {'post': 'porter unicode61 remove_diacritics 2', 'user': 'unicode61 remove_diacritics 2'}
+    # bm25 column weights: a username hit outranks a star-name hit
+    WEIGHTS = {'post': '', 'user': ', 2.0, 1.0'}
+
+    def create(self):
+        with self.connection.cursor() as cursor:
+            for kind, table in self.TABLES.items():
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                    f"{', '.join(self.COLUMNS[kind])}, tokenize = '{self.TOKENIZERS[kind]}', prefix = '2 3')"
+                )
+
+    def drop(self):
+        with self.connection.cursor() as cursor:
+            for table in self.TABLES.values():
+                cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+    def index(self, kind, rows):
+        rows = [tuple('' if v is None else v for v in row) for row in rows]
+        if not rows:
+            return
+        table, columns = self.TABLES[kind], self.COLUMNS[kind]
+        with self.connection.cursor() as cursor:
+            # FTS5 has no upsert; replacing is delete + insert
+            cursor.executemany(f'DELETE FROM {table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {table} (rowid, {', '.join(columns)}) VALUES (%s{', %s' * len(columns)})", rows,
+            )
+
+    def remove(self, kind, ids):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.TABLES[kind]} WHERE rowid = %s', [(i,) for i in ids])
+
+    def clear(self, kind):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.TABLES[kind]}')
+
+    def optimize(self, kind):
+        table = self.TABLES[kind]
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+
+    def search(self, kind, query, after=None, limit=20):
+        words = terms(query)
+        if not words:
+            return []
+        # every word must match, the last one as a prefix (search-as-you-type)
+        match = ' '.join(f'"{w}"' for w in words[:-1]) + f' "{words[-1]}"*'
+        table = self.TABLES[kind]
+        sql = (
+            f'SELECT score, id FROM (SELECT bm25({table}{self.WEIGHTS[kind]}) AS score, rowid AS id '
+            f'FROM {table} WHERE {table} MATCH %s)'
+        )
+        params = [match.strip()]
+        if after is not None:
+            sql += ' WHERE score > %s OR (score = %s AND id > %s)'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY score, id LIMIT %s'
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return cursor.fetchall()
+
+
+class PostgresBackend(Backend):
+    TABLES = {'post': 'search_post_doc', 'user': 'search_user_doc'}
+    DOCUMENTS = {
+        'post': "to_tsvector('english', %s)",
+        'user': "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')",
+    }
+    CONFIGS = {'post': 'english', 'user': 'simple'}
+
+    def create(self):
+        with self.connection.cursor() as cursor:
+            for table in self.TABLES.values():
+                cursor.execute(f'CREATE TABLE IF NOT EXISTS {table} (id bigint PRIMARY KEY, document tsvector NOT NULL)')
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {table}_gin ON {table} USING GIN (document)')
+
+    def drop(self):
+        with self.connection.cursor() as cursor:
+            for table in self.TABLES.values():
+                cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+    def index(self, kind, rows):
+        rows = [tuple('' if v is None else v for v in row) for row in rows]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.TABLES[kind]} (id, document) VALUES (%s, {self.DOCUMENTS[kind]}) '
+                'ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document',
+                rows,
+            )
+
+    def remove(self, kind, ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.TABLES[kind]} WHERE id = ANY(%s)', [list(ids)])
+
+    def clear(self, kind):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.TABLES[kind]}')
+
+    def optimize(self, kind):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'VACUUM ANALYZE {self.TABLES[kind]}')
+
+    def search(self, kind, query, after=None, limit=20):
+        words = terms(query)
+        if not words:
+            return []
+        tsquery = ' & '.join(f'{w}:*' for w in words)
+        table = self.TABLES[kind]
+        sql = (
+            f'SELECT score, id FROM (SELECT -ts_rank_cd(document, q) AS score, id '
+            f'FROM {table}, to_tsquery(%s, %s) q WHERE document @@ q) hits'
+        )
+        params = [self.CONFIGS[kind], tsquery]
+        if after is not None:
+            sql += ' WHERE score > %s OR (score = %s AND id > %s)'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY score, id LIMIT %s'
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return cursor.fetchall()
+
+
+class ScanBackend(Backend):
+    """No index: `icontains` over the source tables, unranked (score 0, then id)."""
+
+    def search(self, kind, query, after=None, limit=20):
+        from posts.models import Post
+        words = terms(query)
+        if not words:
+            return []
+        if kind == 'post':
+            qs = Post.objects.using(self.using)
+            for w in words:
+                qs = qs.filter(content__icontains=w)
+        else:
+            qs = get_user_model().objects.using(self.using)
+            for w in words:
+                qs = qs.filter(Q(username__icontains=w) | Q(chef_star_name__icontains=w))
+        if after is not None:
+            qs = qs.filter(pk__gt=after[1])
+        return [(0.0, pk) for pk in qs.order_by('pk').values_list('pk', flat=True)[:limit]]
+
+
+BACKENDS = {'sqlite': SQLiteBackend, 'postgresql': PostgresBackend}
+
+
+def get_backend(using='default'):
+    return BACKENDS.get(connections[using].vendor, ScanBackend)(using)
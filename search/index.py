@@ -0,0 +1,48 @@
+"""Keeping the search index in step with Post and User rows.
+
+Signals (search/signals.py) call these after commit for single saves and
+deletes; bulk writers that skip signals call them directly, and
+`manage.py rebuild_search_index` rebuilds everything from scratch.
+"""
+from django.contrib.auth import get_user_model
+
+from .backends import get_backend
+
+User = get_user_model()
+
+# User fields that end up in the index; saves touching only other fields are skipped
+USER_FIELDS = ('username', 'chef_star_name')
+
+
+def index_posts(posts):
+    get_backend().index('post', [(p.pk, p.content) for p in posts])
+
+
+def index_users(users):
+    get_backend().index('user', [(u.pk, u.username, u.chef_star_name) for u in users])
+
+
+def remove_posts(ids):
+    get_backend().remove('post', ids)
+
+
+def remove_users(ids):
+    get_backend().remove('user', ids)
+
+
+def rebuild(kind, batch_size=2000):
+    """Re-index every row of `kind` ('post' or 'user') in batches; yields the running row count."""
+    from posts.models import Post
+    backend = get_backend()
+    model, fields = (Post, ('pk', 'content')) if kind == 'post' else (User, ('pk',) + USER_FIELDS)
+    backend.clear(kind)
+    last_pk, done = 0, 0
+    while True:
+        rows = list(model.objects.filter(pk__gt=last_pk).order_by('pk').values_list(*fields)[:batch_size])
+        if not rows:
+            break
+        backend.index(kind, rows)
+        last_pk = rows[-1][0]
+        done += len(rows)
+        yield done
+    backend.optimize(kind)
@@ -0,0 +1,109 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from posts.models import Post
+from search import index
+from search.backends import get_backend
+
+User = get_user_model()
+
+WORDS = (
+    'chocolate cake vanilla cookie bread sourdough pasta tomato basil garlic onion butter sugar flour egg '
+    'lemon honey cinnamon apple banana strawberry pancake waffle pizza cheese mushroom spinach carrot potato '
+    'rice noodle soup curry chicken salmon tofu bean lentil yogurt cream oven bake roast grill fry whisk knead '
+    'simmer boil slice chop mix stir fold crispy fluffy sweet spicy savory quick easy healthy family party'
+).split()
+QUERIES = ('chocolate cake', 'garlic', 'crispy potato oven', 'banan', 'sourdough bread knead')
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = 'Compare indexed search with icontains scans on a synthetic corpus (rolled back afterwards).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--words-per-post', type=int, default=30)
+        parser.add_argument('--runs', type=int, default=20, help='repetitions per query')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        started = time.perf_counter()
+        tag = f"search{random.randrange(1 << 30)}"
+        authors = User.objects.bulk_create([
+            User(username=f"{tag}{i}", email=f"{tag}{i}@bench.local", password='!',
+                 chef_star_name=f"{random.choice(WORDS).title()} {random.choice(WORDS).title()}")
+            for i in range(options['users'])
+        ], batch_size=1000)
+        Post.objects.bulk_create([
+            Post(author=random.choice(authors), content=' '.join(random.choices(WORDS, k=options['words_per_post'])))
+            for _ in range(options['posts'])
+        ], batch_size=2000)
+        self.stdout.write(f"corpus: {options['posts']} posts, {options['users']} users in {time.perf_counter() - started:.1f}s")
+
+        backend = get_backend()
+        for kind in ('post', 'user'):
+            started, done = time.perf_counter(), 0
+            for done in index.rebuild(kind):
+                pass
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"index {kind}: {done} rows in {elapsed:.2f}s ({done / elapsed:.0f} rows/s)")
+
+        self.stdout.write(f"{'query':<24} {'index p50':>10} {'index p99':>10} {'scan p50':>10} {'scan p99':>10}  (ms, first page of 20)")
+        for query in QUERIES:
+            indexed = self._time(lambda: backend.search('post', query, limit=20), options['runs'])
+            scan = self._time(lambda: self._scan(query), options['runs'])
+            self.stdout.write(
+                f"{query:<24} {statistics.median(indexed):>10.2f} {_percentile(indexed, 0.99):>10.2f} "
+                f"{statistics.median(scan):>10.2f} {_percentile(scan, 0.99):>10.2f}"
+            )
+        name = random.choice(WORDS)[:4]
+        indexed = self._time(lambda: backend.search('user', name, limit=20), options['runs'])
+        scan = self._time(lambda: list(
+            User.objects.filter(Q(username__icontains=name) | Q(chef_star_name__icontains=name))
+            .values_list('pk', flat=True)[:20]
+        ), options['runs'])
+        self.stdout.write(
+            f"{'users: ' + name:<24} {statistics.median(indexed):>10.2f} {_percentile(indexed, 0.99):>10.2f} "
+            f"{statistics.median(scan):>10.2f} {_percentile(scan, 0.99):>10.2f}"
+        )
+
+    @staticmethod
+    def _scan(query):
+        # what a view without the index would do: every word via icontains, newest first
+        qs = Post.objects.all()
+        for word in query.split():
+            qs = qs.filter(content__icontains=word)
+        return list(qs.order_by('-created_at', '-id').values_list('pk', flat=True)[:20])
+
+    @staticmethod
+    def _time(fn, runs):
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
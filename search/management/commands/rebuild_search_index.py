@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from search import index
+from search.backends import KINDS
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text index of posts and users from the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=KINDS, help='rebuild just one index')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        for kind in [options['only']] if options['only'] else KINDS:
+            started, done = time.monotonic(), 0
+            # one transaction per index: searches keep seeing the old index until it is swapped in
+            with transaction.atomic():
+                for done in index.rebuild(kind, options['batch_size']):
+                    pass
+            elapsed = time.monotonic() - started
+            rate = done / elapsed if elapsed else 0
+            self.stdout.write(f"{kind}: indexed {done} rows in {elapsed:.2f}s ({rate:.0f} rows/s)")
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def create_index_tables(apps, schema_editor):
+    from search.backends import get_backend
+    get_backend(schema_editor.connection.alias).create()
+
+
+def drop_index_tables(apps, schema_editor):
+    from search.backends import get_backend
+    get_backend(schema_editor.connection.alias).drop()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_keyset_indexes'),
+        ('users', '0004_verification_indexes'),
+    ]
+
+    operations = [
+        # FTS5 virtual tables (SQLite) or tsvector tables (PostgreSQL); filled by rebuild_search_index
+        migrations.RunPython(create_index_tables, drop_index_tables),
+    ]
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posts.models import Post
+
+from . import index
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    transaction.on_commit(lambda: index.index_posts([instance]))
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    # the collector clears instance.pk once the delete is done; keep it for on_commit
+    pk = instance.pk
+    transaction.on_commit(lambda: index.remove_posts([pk]))
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, update_fields=None, **kwargs):
+    # logins, token bumps and approvals save the user too; only name changes matter here
+    if update_fields is not None and not set(update_fields) & set(index.USER_FIELDS):
+        return
+    transaction.on_commit(lambda: index.index_users([instance]))
+
+
+@receiver(post_delete, sender=User)
+def unindex_user(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: index.remove_users([pk]))
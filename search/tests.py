@@ -0,0 +1,57 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from search.backends import Backend, SQLiteBackend, get_backend
+
+User = get_user_model()
+
+
+class BackendTests(TestCase):
+    def test_backend_must_implement_search(self):
+        with self.assertRaises(TypeError):
+            Backend()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'queries the FTS5 tables')
+class SQLiteBackendTests(TestCase):
+    def setUp(self):
+        self.backend = get_backend()
+        self.assertIsInstance(self.backend, SQLiteBackend)
+        self.backend.index('post', [
+            (1, 'tomato and basil soup, content near the stove'),
+            (2, 'soup soup soup'),
+            (3, 'a soup, then a long list of everything else that went into the pot'),
+            (4, 'baking bread'),
+        ])
+        self.backend.index('user', [(1, 'stew', 'Ann'), (2, 'ann', 'Stew Master')])
+
+    def _ids(self, kind, query, **kwargs):
+        return [pk for _, pk in self.backend.search(kind, query, **kwargs)]
+
+    def test_fts5_syntax_in_queries_is_matched_as_words(self):
+        # operators, column filters and quotes are dropped or searched as plain words, never parsed
+        for query in ('tomato" AND (soup', 'NEAR(tomato basil)', 'content:tomato', '-basil* ^soup', "tomato's"):
+            with self.subTest(query=query):
+                self.assertEqual(self._ids('post', query), [1])
+        self.assertEqual(self._ids('post', '"*()'), [])
+
+    def test_last_word_is_a_prefix_and_posts_are_stemmed(self):
+        self.assertEqual(self._ids('post', 'bread bak'), [4])
+        self.assertEqual(self._ids('post', 'bakes'), [4])
+
+    def test_hits_are_ranked_and_paged_by_score_then_id(self):
+        hits = self.backend.search('post', 'soup')
+        self.assertEqual([pk for _, pk in hits], [2, 1, 3])
+        self.assertEqual(self._ids('post', 'soup', after=hits[0], limit=1), [1])
+        self.assertEqual(self._ids('post', 'soup', after=hits[1]), [3])
+        # a username hit outranks a star-name hit
+        self.assertEqual(self._ids('user', 'stew'), [1, 2])
+
+    def test_replaced_and_removed_documents(self):
+        self.backend.index('post', [(2, 'stew')])
+        self.backend.remove('post', [1])
+        self.assertEqual(self._ids('post', 'soup'), [3])
+        self.assertEqual(self._ids('post', 'stew'), [2])
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.db import router
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.db import read_replica
+from core.pagination import decode_values, encode_values, parse_page_size
+from posts.models import Post
+
+from .backends import get_backend
+
+User = get_user_model()
+
+
+def _post_hit(post):
+    return {
+        'id': post.id,
+        'content': post.content,
+        'created_at': post.created_at,
+        'like_count': post.like_count,
+        'comment_count': post.comment_count,
+        'author': {'id': post.author.id, 'username': post.author.username, 'chef_star_name': post.author.chef_star_name},
+    }
+
+
+def _user_hit(user):
+    return {'id': user.id, 'username': user.username, 'chef_star_name': user.chef_star_name}
+
+
+def _search(request, kind, queryset, serialize):
+    """Ranked, keyset-paginated hits of `kind` for ?q=, wrapped as {results, next_cursor}."""
+    query = (request.query_params.get('q') or '').strip()
+    if not query:
+        return Response({'error': 'q required'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = parse_page_size(request.query_params.get('limit'))
+    after = None
+    if request.query_params.get('cursor'):
+        try:
+            after = decode_values(request.query_params['cursor'], 2)
+        except ValueError:
+            return Response({'error': 'invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+    backend = get_backend(router.db_for_read(queryset.model) or 'default')
+    hits = backend.search(kind, query, after, limit + 1)
+    next_cursor = encode_values(*hits[limit - 1]) if len(hits) > limit else None
+    hits = hits[:limit]
+    # the index can briefly lag a delete; drop ids whose row is gone
+    rows = queryset.in_bulk([pk for _, pk in hits])
+    return Response({
+        'results': [serialize(rows[pk]) for _, pk in hits if pk in rows],
+        'next_cursor': next_cursor,
+    }, status=status.HTTP_200_OK)
+
+
+@read_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_posts(request):
+    """GET /search/posts/?q=chocolate cake&cursor=&limit= -> best matching posts first."""
+    return _search(request, 'post', Post.objects.select_related('author'), _post_hit)
+
+
+@read_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_users(request):
+    """GET /search/users/?q=star&cursor=&limit= -> chefs by username / star name, best first."""
+    return _search(request, 'user', User.objects.filter(is_active=True), _user_hit)
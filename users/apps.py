@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class UsersConfig(AppConfig):
+    name = 'users'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import throttling  # noqa: F401  registers check_throttle_cache
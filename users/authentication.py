@@ -0,0 +1,74 @@
+"""JWT authentication that enforces the `token_version` claim.
+
+`resend_verification_code` bumps `User.token_version` to revoke every JWT
+issued before it. Checking that needs the user row, so users are cached
+(default cache, AUTH_USER_CACHE_SECONDS) and dropped from the cache whenever
+a User is saved or deleted; the common authenticated request does no query.
+Rows are always loaded from the primary database, never a lagging replica,
+and since request.user may be a cached copy, views save it with
+`update_fields`.
+Dropping a user also bumps its "user" response version (core.conditional),
+so cached profile responses and their ETags go stale with it; users.signals
+skips the bump for saves that touch no profile field (e.g. last_login).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from core.conditional import bump_version
+
+User = get_user_model()
+
+USER_CACHE_KEY = 'auth:user:{}'
+# core.conditional scope of responses built from a single user row
+USER_SCOPE = 'user'
+
+
+def cached_user(user_id):
+    """Return the User for `user_id` from the cache, loading it on a miss. None if it does not exist."""
+    key = USER_CACHE_KEY.format(user_id)
+    user = cache.get(key)
+    if user is None:
+        # even inside read_replica views: a replica's stale row would be cached for everyone
+        user = User.objects.using(DEFAULT_DB_ALIAS).filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None:
+            return None
+        cache.set(key, user, getattr(settings, 'AUTH_USER_CACHE_SECONDS', 300))
+    return user
+
+
+def forget_user(*user_ids):
+    """Drop cached user rows, leaving their profile responses cached."""
+    cache.delete_many([USER_CACHE_KEY.format(uid) for uid in user_ids])
+
+
+def invalidate_user(*user_ids):
+    """Drop cached users and their responses; call after changing users with QuerySet.update(), which sends no signals."""
+    forget_user(*user_ids)
+    bump_version(USER_SCOPE, *user_ids)
+
+
+class VersionedJWTAuthentication(JWTAuthentication):
+    """SimpleJWT authentication that rejects tokens whose `token_version` is stale."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        # tokens minted before token_version existed carry no claim and count as version 0
+        if validated_token.get('token_version', 0) != user.token_version:
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+        return user
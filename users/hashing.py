@@ -0,0 +1,113 @@
+"""Password hashing offloaded to a bounded process pool.
+
+PBKDF2 is deliberately slow; running it on the request worker lets a burst
+of logins pin every worker on CPU. Hashes run in PASSWORD_HASH_WORKERS
+processes instead, and at most PASSWORD_HASH_MAX_PENDING hashes may be
+queued or running at once: beyond that `HashingBusy` is raised and the view
+answers 429 instead of queueing without limit. A hash slower than
+PASSWORD_HASH_TIMEOUT raises `HashingTimeout` (503); it keeps its slot until
+it actually finishes, so abandoned hashes still count against the limit.
+Set PASSWORD_HASH_WORKERS=0 to hash inline (tests, management commands).
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class HashingBusy(Exception):
+    """The hashing pool is saturated; the caller should retry later."""
+
+
+class HashingTimeout(HashingBusy):
+    """The hash did not finish within PASSWORD_HASH_TIMEOUT."""
+
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _init_worker(settings_module):
+    # spawned workers (macOS/Windows) start without Django configured
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _pool():
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                workers = _setting('PASSWORD_HASH_WORKERS', 0)
+                _slots = threading.BoundedSemaphore(_setting('PASSWORD_HASH_MAX_PENDING', workers * 4))
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_init_worker,
+                    initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings'),),
+                )
+    return _executor
+
+
+def _inline():
+    return _setting('PASSWORD_HASH_WORKERS', 0) <= 0
+
+
+def _run(fn, *args):
+    if _inline():
+        return fn(*args)
+    pool = _pool()
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy('password hashing pool is saturated')
+    try:
+        future = pool.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    # released when the hash really ends, not when this caller stops waiting for it
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=_setting('PASSWORD_HASH_TIMEOUT', 5))
+    except FutureTimeout:
+        raise HashingTimeout('password hashing timed out')
+
+
+def make_password(raw_password):
+    """Hash `raw_password` with the default hasher, in the pool."""
+    return _run(hashers.make_password, raw_password)
+
+
+def make_passwords(raw_passwords):
+    """
+    Hash many passwords in parallel across the pool. Meant for batch paths
+    (bulk registration, commands), so it skips the per-request admission check.
+    """
+    raw_passwords = list(raw_passwords)
+    if _inline():
+        return [hashers.make_password(p) for p in raw_passwords]
+    workers = _setting('PASSWORD_HASH_WORKERS', 1)
+    chunksize = max(1, len(raw_passwords) // (workers * 4))
+    return list(_pool().map(hashers.make_password, raw_passwords, chunksize=chunksize))
+
+
+def check_password(user, raw_password):
+    """
+    Same contract as `user.check_password`, but the hash runs in the pool.
+    Upgrades the stored hash when the hasher settings changed, like Django does.
+    """
+    if not user.password or not user.has_usable_password():
+        return False
+    ok = _run(hashers.check_password, raw_password, user.password)
+    if ok and hashers.identify_hasher(user.password).must_update(user.password):
+        user.password = make_password(raw_password)
+        user.save(update_fields=['password'])
+    return ok
+
@@ -0,0 +1,73 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from users import hashing
+
+User = get_user_model()
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+
+class Command(BaseCommand):
+    help = 'Compare login password-check throughput inline vs. in the bounded hashing pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--workers', type=int, default=None, help='pool size (default PASSWORD_HASH_WORKERS)')
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or settings.PASSWORD_HASH_WORKERS or 1
+        # an unsaved user: only the password check is measured, no database access
+        user = User(username='bench', password=hashers.make_password('correct horse'))
+
+        self.stdout.write(f"{'mode':>8} {'logins/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'busy':>6} {'probe p99 ms':>13}")
+        with override_settings(PASSWORD_HASH_WORKERS=0):
+            self._report('inline', user, options)
+        with override_settings(PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_MAX_PENDING=workers * 4):
+            self._report('pool', user, options)
+
+    def _report(self, mode, user, options):
+        latencies, busy = [], [0]
+        probe, stop = [], threading.Event()
+
+        def login():
+            started = time.perf_counter()
+            try:
+                hashing.check_password(user, 'correct horse')
+            except hashing.HashingBusy:
+                busy[0] += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        def health_probe():
+            # stands in for core.urls.health sharing the worker with logins
+            while not stop.is_set():
+                started = time.perf_counter()
+                sum(range(1000))
+                probe.append((time.perf_counter() - started) * 1000)
+                time.sleep(0.01)
+
+        prober = threading.Thread(target=health_probe, daemon=True)
+        prober.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for _ in range(options['requests']):
+                pool.submit(login)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        prober.join()
+        self.stdout.write(
+            f"{mode:>8} {len(latencies) / elapsed:>10.1f} {statistics.median(latencies or [0]):>9.1f} "
+            f"{_percentile(latencies, 0.99):>9.1f} {busy[0]:>6} {_percentile(probe, 0.99):>13.2f}"
+        )
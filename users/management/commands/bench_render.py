@@ -0,0 +1,68 @@
+import timeit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONRenderer, orjson
+from users.schemas import ProfileSchema
+
+User = get_user_model()
+
+
+class ProfileModelSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ProfileSchema.__slots__
+
+
+def _dict_profile(user):
+    # the hand-built dict profile() returned before the schema layer
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "chef_star_name": getattr(user, "chef_star_name", None),
+        "age_group": getattr(user, "age_group", None),
+        "parent_email": getattr(user, "parent_email", None),
+        "is_email_verified": getattr(user, "is_email_verified", False),
+        "is_parent_approved": getattr(user, "is_parent_approved", False),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark profile payload building + JSON rendering: stdlib vs. schema/orjson.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=20000, help='renders per measurement')
+        parser.add_argument('--list-size', type=int, default=100, help='users per list payload')
+
+    def handle(self, *args, **options):
+        # unsaved users: only payload building and rendering are measured
+        users = [
+            User(
+                id=i, username=f'chef{i}', email=f'chef{i}@example.com', chef_star_name=f'Star {i}',
+                age_group='10-15', parent_email='parent@example.com', is_email_verified=True,
+            )
+            for i in range(1, options['list_size'] + 1)
+        ]
+        user, number = users[0], options['number']
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+
+        cases = [
+            ('profile  ModelSerializer + json', lambda: stdlib.render(ProfileModelSerializer(user).data)),
+            ('profile  dict + json', lambda: stdlib.render(_dict_profile(user))),
+            ('profile  schema + json', lambda: stdlib.render(ProfileSchema.dump(user))),
+            ('profile  schema + fast', lambda: fast.render(ProfileSchema.dump(user))),
+            ('list     ModelSerializer + json', lambda: stdlib.render(ProfileModelSerializer(users, many=True).data)),
+            ('list     dict + json', lambda: stdlib.render([_dict_profile(u) for u in users])),
+            ('list     schema + fast', lambda: fast.render(ProfileSchema.dump_many(users))),
+        ]
+        self.stdout.write(f"orjson: {'installed' if orjson else 'missing, fast renderer uses stdlib json'}")
+        self.stdout.write(f"{'case':<34} {'us/render':>10} {'renders/s':>11}")
+        for label, fn in cases:
+            runs = number if label.startswith('profile') else max(1, number // options['list_size'])
+            best = min(timeit.repeat(fn, number=runs, repeat=3)) / runs
+            self.stdout.write(f"{label:<34} {best * 1e6:>10.2f} {1 / best:>11.0f}")
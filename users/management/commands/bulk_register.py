@@ -0,0 +1,29 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.registration import bulk_register
+from users.serializers import BulkRegistrationSerializer
+from users.views import _generate_code
+
+
+class Command(BaseCommand):
+    help = 'Register many users from a CSV (email,password[,chef_star_name,age_group,parent_email,username]).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with open(options['csv_path'], newline='', encoding='utf-8') as fh:
+            rows = [{k: v for k, v in row.items() if v} for row in csv.DictReader(fh)]
+
+        started, created = time.monotonic(), 0
+        size = options['batch_size']
+        for start in range(0, len(rows), size):
+            serializer = BulkRegistrationSerializer(data={'users': rows[start:start + size]})
+            if not serializer.is_valid():
+                raise CommandError(f"rows {start + 1}-{start + size}: {serializer.errors}")
+            created += len(bulk_register(serializer.validated_data['users'], _generate_code))
+        self.stdout.write(f"registered {created} users in {time.monotonic() - started:.2f}s")
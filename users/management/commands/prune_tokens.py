@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from users import tokens
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired and superseded (stale token_version) JWT outstanding tokens in small transactions '
+        'and report the token table sizes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between chunks')
+        parser.add_argument('--dry-run', action='store_true', help='only count matching rows')
+        parser.add_argument('--stats', action='store_true', help='print table sizes, then exit')
+
+    def handle(self, *args, **options):
+        if not options['stats']:
+            result = tokens.prune(options['chunk_size'], options['pause'], options['dry_run'])
+            rate = result['scanned'] / result['seconds'] if result['seconds'] else 0
+            verb = 'would delete' if options['dry_run'] else 'deleted'
+            self.stdout.write(
+                f"{verb} {result['expired']} expired and {result['superseded']} superseded of "
+                f"{result['scanned']} scanned in {result['seconds']:.2f}s ({rate:.0f} rows/s)"
+            )
+        self.stdout.write(json.dumps(tokens.table_sizes(), indent=2))
@@ -0,0 +1,75 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users.authentication import invalidate_user
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Clear expired email verification codes and delete accounts that stayed unverified '
+        'past UNVERIFIED_ACCOUNT_TTL_DAYS, in small transactions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between chunks')
+        parser.add_argument('--dry-run', action='store_true', help='only count matching rows')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        code_cutoff = now - timedelta(minutes=settings.VERIFICATION_CODE_TTL_MINUTES)
+        account_cutoff = now - timedelta(days=settings.UNVERIFIED_ACCOUNT_TTL_DAYS)
+
+        # both filters are served by the partial indexes on unverified users
+        expired_codes = User.objects.filter(is_email_verified=False, code_created_at__lt=code_cutoff)
+        stale_accounts = (
+            User.objects.filter(is_email_verified=False, verification_required=True, date_joined__lt=account_cutoff)
+            # a code sent recently means the user is still trying to verify
+            .filter(Q(code_created_at__isnull=True) | Q(code_created_at__lt=account_cutoff))
+            # never delete admins, whatever their verification state
+            .exclude(is_staff=True).exclude(is_superuser=True)
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f"expired codes: {expired_codes.count()}, stale accounts: {stale_accounts.count()}")
+            return
+
+        self._report('stale accounts deleted', *self._sweep(stale_accounts, self._delete, options))
+        self._report('expired codes cleared', *self._sweep(expired_codes, self._clear_codes, options))
+
+    def _sweep(self, qs, apply, options):
+        """Apply `apply` to `qs` one chunk of primary keys per transaction; returns (rows, seconds)."""
+        started, total = time.monotonic(), 0
+        while True:
+            with transaction.atomic():
+                pks = list(qs.order_by('pk').values_list('pk', flat=True)[:options['chunk_size']])
+                if not pks:
+                    break
+                # re-apply the filter: a row may have been verified since it was selected
+                total += apply(qs.filter(pk__in=pks))
+            invalidate_user(*pks)
+            if options['pause']:
+                time.sleep(options['pause'])
+        return total, time.monotonic() - started
+
+    @staticmethod
+    def _clear_codes(qs):
+        return qs.update(email_verification_code='', code_created_at=None)
+
+    @staticmethod
+    def _delete(qs):
+        _, per_model = qs.delete()
+        return per_model.get(User._meta.label, 0)
+
+    def _report(self, label, rows, seconds):
+        rate = rows / seconds if seconds else 0
+        self.stdout.write(f"{label}: {rows} in {seconds:.2f}s ({rate:.0f} rows/s)")
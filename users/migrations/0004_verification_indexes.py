@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:46
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0003_user_token_version_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='verification_token',
+            field=models.UUIDField(db_index=True, default=uuid.uuid4, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_email_verified', False)), fields=['code_created_at'], name='user_unverified_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_email_verified', False)), fields=['date_joined'], name='user_unverified_joined_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0004_verification_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_parent_approved', False)), fields=['parent_email'], name='user_pending_parent_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_export_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='verification_required',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+from django.db.models.functions import Lower, Trim
+
+
+def normalize_parent_emails(apps, schema_editor):
+    # the parent dashboard matches parent_email exactly; rows written before
+    # every path normalized it would otherwise be missing from their parent's list
+    User = apps.get_model('users', 'User')
+    User.objects.exclude(parent_email=None).update(parent_email=Lower(Trim('parent_email')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_verification_required'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_parent_emails, migrations.RunPython.noop),
+    ]
@@ -18,11 +18,26 @@ class User(AbstractUser):
     is_parent_approved = models.BooleanField(default=False)
     
     # ভেরিফিকেশনের জন্য ইউনিক টোকেন
-    verification_token = models.UUIDField(default=uuid.uuid4, editable=False)
+    verification_token = models.UUIDField(default=uuid.uuid4, editable=False, db_index=True)
     # numeric code for email verification (sent to user's email)
     email_verification_code = models.CharField(max_length=6, blank=True)
     code_created_at = models.DateTimeField(null=True, blank=True)
     token_version = models.IntegerField(default=0)
+    # set for accounts created through the registration API, which must confirm a
+    # code; only these are ever deleted by sweep_verification (admins and legacy rows are not)
+    verification_required = models.BooleanField(default=False)
+
+    class Meta(AbstractUser.Meta):
+        swappable = 'AUTH_USER_MODEL'
+        indexes = [
+            # sweep_verification only ever scans unverified users, by code age and by signup age
+            models.Index(fields=['code_created_at'], name='user_unverified_code_idx', condition=models.Q(is_email_verified=False)),
+            models.Index(fields=['date_joined'], name='user_unverified_joined_idx', condition=models.Q(is_email_verified=False)),
+            # the parent dashboard lists a parent's children still waiting for approval
+            models.Index(fields=['parent_email'], name='user_pending_parent_idx', condition=models.Q(is_parent_approved=False)),
+            # exports walk the whole table in (date_joined, id) order, from a watermark
+            models.Index(fields=['date_joined', 'id'], name='user_joined_idx'),
+        ]
 
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
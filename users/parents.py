@@ -0,0 +1,143 @@
+"""Parent approval: one dashboard and one digest email per parent.
+
+A parent (or a school acting as guardian) may have many children on the
+site. Each `submit_parent` used to mail its own approve link; now the first
+submission for a parent queues a digest held back for
+PARENT_DIGEST_WINDOW_MINUTES, and later submissions inside the window just
+rewrite that still-pending outbox row. The row is found by its merge key in
+the database, so every worker process merges into the same one and the
+parent gets one email listing every child waiting. The email links to a
+dashboard (a signed, expiring URL keyed by the parent's address) that lists
+the pending children and approves the selected ones with a single UPDATE.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import escape
+
+from notifications.inbox import notify_parent_approved
+from outbox.queue import enqueue, enqueue_many, enqueue_or_merge
+
+from .authentication import invalidate_user
+
+User = get_user_model()
+
+DASHBOARD_SALT = 'users.parent-dashboard'
+DIGEST_MERGE_KEY = 'users:parent-digest:{}'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def normalize_email(email):
+    # one dashboard per address, however the children typed it
+    return str(email).strip().lower()
+
+
+def dashboard_token(parent_email):
+    return signing.dumps(parent_email, salt=DASHBOARD_SALT)
+
+
+def parent_for_token(token):
+    """The parent email a dashboard token was issued for; raises signing.BadSignature if forged or expired."""
+    max_age = timedelta(days=_setting('PARENT_DASHBOARD_LINK_DAYS', 14))
+    return signing.loads(token, salt=DASHBOARD_SALT, max_age=max_age)
+
+
+def dashboard_link(request, parent_email):
+    return request.build_absolute_uri(reverse('parent_dashboard', args=[dashboard_token(parent_email)]))
+
+
+def pending_children(parent_email):
+    """Children of `parent_email` still waiting for approval, oldest signup first."""
+    return (
+        User.objects.filter(parent_email=parent_email, is_parent_approved=False)
+        .only('id', 'username', 'chef_star_name', 'age_group', 'date_joined')
+        .order_by('date_joined', 'id')
+    )
+
+
+def digest_email(children, link):
+    """(subject, text, html) asking a parent to review `children` at `link`."""
+    names = [child.username for child in children]
+    if len(names) == 1:
+        subject = f"Please approve {names[0]}'s account"
+    else:
+        subject = f'{len(names)} accounts are waiting for your approval'
+    text = (
+        'These accounts are waiting for your approval:\n\n'
+        + ''.join(f'  - {name}\n' for name in names)
+        + f'\nReview and approve them here: {link}'
+    )
+    items = ''.join(f'<li><strong>{escape(name)}</strong></li>' for name in names)
+    html = f"""
+      <html>
+        <body>
+          <p>Hello,</p>
+          <p>These accounts are waiting for your approval:</p>
+          <ul>{items}</ul>
+          <p style="text-align:center;">
+            <a href="{escape(link)}" style="padding:12px 20px;background:#6f42c1;color:#fff;border-radius:6px;text-decoration:none;">Review accounts</a>
+          </p>
+        </body>
+      </html>
+    """
+    return subject, text, html
+
+
+def queue_digest(request, parent_email):
+    """
+    Queue (or refresh) the approval digest for `parent_email`. Returns whether
+    it was merged into a digest already waiting in the outbox.
+    """
+    children = list(pending_children(parent_email))
+    subject, text, html = digest_email(children, dashboard_link(request, parent_email))
+    window = _setting('PARENT_DIGEST_WINDOW_MINUTES', 10) * 60
+    if window <= 0:
+        enqueue(subject, text, [parent_email], html_body=html)
+        return False
+
+    # once the worker has claimed the digest, the next submission starts a new one
+    return enqueue_or_merge(
+        DIGEST_MERGE_KEY.format(parent_email), subject, text, [parent_email], html_body=html,
+        send_at=timezone.now() + timedelta(seconds=window),
+    )
+
+
+def approve_children(parent_email, child_ids=None):
+    """
+    Approve `parent_email`'s pending children (only those in `child_ids` when
+    given) with one UPDATE, queue each child's email and inbox notification.
+    Returns the approved children as (id, username, email) tuples.
+    """
+    with transaction.atomic():
+        pending = User.objects.select_for_update().filter(parent_email=parent_email, is_parent_approved=False)
+        if child_ids is not None:
+            pending = pending.filter(pk__in=child_ids)
+        children = list(pending.values_list('id', 'username', 'email'))
+        if not children:
+            return []
+        ids = [child_id for child_id, _, _ in children]
+        # update() sends no signals: cached users and profiles are dropped on commit below
+        User.objects.filter(pk__in=ids).update(is_parent_approved=True)
+        enqueue_many([
+            {
+                'subject': 'Your parent approved your account',
+                'body': f'Hi {username},\n\nYour parent has approved your account. You can now log in.',
+                'to': [email],
+            }
+            for _, username, email in children
+        ])
+        transaction.on_commit(lambda: _approved(ids))
+    return children
+
+
+def _approved(ids):
+    invalidate_user(*ids)
+    notify_parent_approved(*ids)
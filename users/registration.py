@@ -0,0 +1,129 @@
+"""Username allocation and bulk registration.
+
+Usernames derived from an email local part collide a lot ("chef", "chef1",
+"chef2", ...). Instead of probing `exists()` once per suffix, all names
+of the form base<digits> are read with one query (a prefix range on the
+username index, filtered by regex) and free suffixes are picked in memory.
+
+Emails are stored normalized (users.parents.normalize_email) by both the
+single and the bulk registration path, so uniqueness checks and lookups are
+plain indexed equality matches whatever case the user typed.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from outbox.queue import enqueue_many
+from search.index import index_users
+
+from . import hashing
+from .parents import normalize_email
+
+User = get_user_model()
+
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+
+
+def base_username(email):
+    base = email.split('@')[0] if '@' in email else email
+    # leave room for a numeric suffix
+    return base[:USERNAME_MAX_LENGTH - 6]
+
+
+def allocate_usernames(bases):
+    """
+    Return a free username for every entry of `bases` (same order), using
+    one query per distinct base. Duplicates within `bases` get distinct names.
+    """
+    allocated = []
+    taken_by_base = {}
+    for base in bases:
+        if base not in taken_by_base:
+            taken_by_base[base] = set(
+                User.objects.filter(username__startswith=base, username__regex=rf'^{re.escape(base)}[0-9]*$')
+                .values_list('username', flat=True)
+            )
+        taken = taken_by_base[base]
+        candidate, i = base, 1
+        while candidate in taken:
+            candidate = f"{base}{i}"
+            i += 1
+        taken.add(candidate)
+        allocated.append(candidate)
+    return allocated
+
+
+def allocate_username(base):
+    return allocate_usernames([base])[0]
+
+
+def user_for_email(email):
+    """
+    The user registered as `email`, typed in any case; raises User.DoesNotExist.
+    Accounts created before emails were normalized match as they were typed.
+    """
+    normalized = normalize_email(email)
+    found = {user.email: user for user in User.objects.filter(email__in={email, normalized})}
+    user = found.get(normalized) or found.get(email)
+    if user is None:
+        raise User.DoesNotExist(f'no user with email {email!r}')
+    return user
+
+
+def verification_email(user, code):
+    """Kwargs for outbox.queue.enqueue() carrying `code` to `user`."""
+    ttl = settings.VERIFICATION_CODE_TTL_MINUTES
+    return {
+        'subject': "Your verification code",
+        'body': f"Hello {user.username},\n\nYour verification code is: {code}\n\nIt expires in {ttl} minutes.",
+        'html_body': (
+            f"<p>Hello <strong>{user.username}</strong>,</p><p>Your verification code is: <strong>{code}</strong></p>"
+            f"<p>It expires in {ttl} minutes.</p>"
+        ),
+        'to': [user.email],
+    }
+
+
+def bulk_register(items, generate_code, retries=3):
+    """
+    Create many unverified users at once and queue their verification codes.
+    `items` are dicts of User fields plus a raw `password`; a missing
+    username is derived from the email. Returns the created users.
+    """
+    items = [dict(item) for item in items]
+    passwords = [item.pop('password') for item in items]
+    hashed = hashing.make_passwords(passwords)
+    derived = [i for i, item in enumerate(items) if not item.get('username')]
+    now = timezone.now()
+
+    for attempt in range(retries):
+        names = allocate_usernames([base_username(items[i]['email']) for i in derived])
+        for i, name in zip(derived, names):
+            items[i]['username'] = name
+
+        users = [
+            User(
+                **item,
+                password=password,
+                is_email_verified=False,
+                is_parent_approved=False,
+                verification_required=True,
+                email_verification_code=generate_code(),
+                code_created_at=now,
+            )
+            for item, password in zip(items, hashed)
+        ]
+        try:
+            with transaction.atomic():
+                created = User.objects.bulk_create(users)
+                enqueue_many(verification_email(u, u.email_verification_code) for u in created)
+                # bulk_create sends no post_save, so search.signals never sees these users
+                transaction.on_commit(lambda: index_users(created))
+            return created
+        except IntegrityError:
+            # a concurrent signup took one of the derived names; reallocate and retry
+            if attempt == retries - 1:
+                raise
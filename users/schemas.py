@@ -0,0 +1,68 @@
+"""Lightweight output schemas for the hot user/profile/token payloads.
+
+A ModelSerializer builds field objects and runs `to_representation` per
+field on every call, which is most of the cost of a small read endpoint.
+These schemas only name the attributes to copy: `dump(obj)` reads them with
+one precomputed `attrgetter` and zips them into a dict. Instances (slotted,
+no per-object __dict__) are for payloads assembled from several sources,
+like the auth response below.
+"""
+from operator import attrgetter
+
+
+class Schema:
+    __slots__ = ()
+    # fields left out of to_dict() while they are None
+    optional = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        get = attrgetter(*cls.__slots__)
+        # attrgetter returns a bare value, not a 1-tuple, for a single name
+        cls._get = staticmethod(lambda obj: (get(obj),)) if len(cls.__slots__) == 1 else get
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def from_obj(cls, obj, **values):
+        """Copy the schema fields from `obj`; `values` fill (or override) the rest."""
+        instance = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(instance, name, values[name] if name in values else getattr(obj, name, None))
+        return instance
+
+    @classmethod
+    def dump(cls, obj):
+        """Payload dict for `obj`, which must have every field as an attribute."""
+        return dict(zip(cls.__slots__, cls._get(obj)))
+
+    @classmethod
+    def dump_many(cls, objs):
+        names, get = cls.__slots__, cls._get
+        return [dict(zip(names, get(obj))) for obj in objs]
+
+    def to_dict(self):
+        data = dict(zip(self.__slots__, self._get(self)))
+        for name in self.optional:
+            if data[name] is None:
+                del data[name]
+        return data
+
+
+class UserSchema(Schema):
+    __slots__ = ('id', 'username', 'email')
+
+
+class ProfileSchema(Schema):
+    __slots__ = (
+        'id', 'username', 'email', 'chef_star_name', 'age_group', 'parent_email',
+        'is_email_verified', 'is_parent_approved',
+    )
+
+
+class AuthSchema(Schema):
+    """Login/verification response: the user plus whichever credentials could be issued."""
+    __slots__ = ('id', 'username', 'email', 'token', 'access', 'refresh')
+    optional = ('token', 'access', 'refresh')
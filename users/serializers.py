@@ -1,6 +1,15 @@
+from collections import Counter
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 
+from . import hashing
+from .parents import normalize_email
+from .registration import allocate_username, base_username
+
 
 User = get_user_model()
 
@@ -18,37 +27,90 @@ class RegistrationSerializer(serializers.ModelSerializer):
         }
 
     def validate_email(self, value):
+        # stored normalized, as bulk registration does, so the check ignores case
+        value = normalize_email(value)
         if User.objects.filter(email=value).exists():
             raise serializers.ValidationError('A user with that email already exists')
         return value
 
+    def validate_parent_email(self, value):
+        # stored normalized, so the parent dashboard finds every child (see users.parents)
+        return normalize_email(value) if value else value
+
     def create(self, validated_data):
         # remove password_confirm before creating
         validated_data.pop('password_confirm', None)
         password = validated_data.pop('password')
 
-        # Ensure username exists; if not, derive from email
-        username = validated_data.get('username')
-        if not username:
-            email = validated_data.get('email', '')
-            username = email.split('@')[0] if '@' in email else email
-            # ensure username uniqueness by appending suffix if needed
-            base = username
-            i = 1
-            while User.objects.filter(username=username).exists():
-                username = f"{base}{i}"
-                i += 1
-            validated_data['username'] = username
-
-        user = User(**validated_data)
-        user.set_password(password)
-        # newly registered users are not parent-approved or email-verified by default
-        user.is_parent_approved = False
-        user.is_email_verified = False
-        user.save()
-        return user
+        # Ensure username exists; if not, derive from email (one prefix query, see registration.py)
+        derive = not validated_data.get('username')
+        # hashed in the shared pool; raises hashing.HashingBusy when it is saturated
+        hashed = hashing.make_password(password)
+
+        for attempt in range(3):
+            if derive:
+                validated_data['username'] = allocate_username(base_username(validated_data.get('email', '')))
+            user = User(**validated_data)
+            user.password = hashed
+            # newly registered users are not parent-approved or email-verified by default
+            user.is_parent_approved = False
+            user.is_email_verified = False
+            user.verification_required = True
+            try:
+                with transaction.atomic():
+                    user.save()
+                return user
+            except IntegrityError:
+                # a concurrent signup took the derived name; pick the next free one
+                if not derive or attempt == 2:
+                    raise
 
     def validate(self, attrs):
         if attrs.get('password') != attrs.get('password_confirm'):
             raise serializers.ValidationError({'password_confirm': "Passwords do not match."})
         return attrs
+
+
+class BulkRegistrationItemSerializer(serializers.ModelSerializer):
+    """One child in a bulk registration; uniqueness is checked for the whole batch at once."""
+    password = serializers.CharField(write_only=True, required=True)
+
+    class Meta:
+        model = User
+        fields = ('username', 'email', 'password', 'chef_star_name', 'age_group', 'parent_email')
+        extra_kwargs = {
+            # per-item UniqueValidators would cost one query per child; the format check stays
+            'username': {'required': False, 'allow_blank': True, 'validators': [UnicodeUsernameValidator()]},
+            'email': {'required': True, 'validators': []},
+        }
+
+    def validate_email(self, value):
+        return normalize_email(value)
+
+    def validate_parent_email(self, value):
+        return normalize_email(value) if value else value
+
+
+class BulkRegistrationSerializer(serializers.Serializer):
+    users = BulkRegistrationItemSerializer(many=True, allow_empty=False)
+
+    def validate_users(self, items):
+        limit = getattr(settings, 'BULK_REGISTRATION_MAX', 500)
+        if len(items) > limit:
+            raise serializers.ValidationError(f'At most {limit} users per request.')
+
+        # emails are normalized by the item serializer
+        emails = Counter(item['email'] for item in items)
+        dupes = sorted(e for e, n in emails.items() if n > 1)
+        if dupes:
+            raise serializers.ValidationError({'duplicate_emails': dupes})
+        existing = sorted(User.objects.filter(email__in=[i['email'] for i in items]).values_list('email', flat=True))
+        if existing:
+            raise serializers.ValidationError({'existing_emails': existing})
+
+        usernames = Counter(item['username'] for item in items if item.get('username'))
+        unavailable = {u for u, n in usernames.items() if n > 1}
+        unavailable.update(User.objects.filter(username__in=list(usernames)).values_list('username', flat=True))
+        if unavailable:
+            raise serializers.ValidationError({'unavailable_usernames': sorted(unavailable)})
+        return items
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .authentication import forget_user, invalidate_user
+from .schemas import ProfileSchema
+from .tokens import forget_drf_token, mark_blacklisted
+
+User = get_user_model()
+
+# fields the cached profile response is built from
+PROFILE_FIELDS = frozenset(ProfileSchema.__slots__)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, update_fields=None, **kwargs):
+    # any save may bump token_version or change is_active: always drop the cached row;
+    # the profile response only when a field it shows may have changed
+    if update_fields is not None and not PROFILE_FIELDS.intersection(update_fields):
+        forget_user(instance.pk)
+    else:
+        invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def mark_blacklisted_token(sender, instance, created, **kwargs):
+    # processes only rebuild their blacklist filter periodically; the mark covers the gap
+    if created:
+        jti = instance.token.jti
+        transaction.on_commit(lambda: mark_blacklisted(jti))
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def drop_cached_drf_token(sender, instance, **kwargs):
+    forget_drf_token(instance.user_id)
@@ -0,0 +1,310 @@
+import time
+from datetime import timedelta
+from io import StringIO
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from outbox.models import OutboundEmail
+from users import hashing, tokens
+from users.parents import dashboard_token
+from users.registration import allocate_usernames
+from users.schemas import Schema, UserSchema
+from users.throttling import OTPSendEmailThrottle, check_throttle_cache
+from users.tokens import VersionedRefreshToken
+
+User = get_user_model()
+
+
+class SweepVerificationTests(TestCase):
+    def _user(self, username, **fields):
+        fields.setdefault('date_joined', timezone.now() - timedelta(days=30))
+        return User.objects.create(username=username, email=f'{username}@example.com', **fields)
+
+    def test_only_stale_api_signups_are_deleted(self):
+        stale = self._user('stale', verification_required=True)
+        recent = self._user('recent', verification_required=True, date_joined=timezone.now())
+        legacy = self._user('legacy')
+        admin = self._user('admin', is_staff=True, is_superuser=True, verification_required=True)
+        staff = self._user('staff', is_staff=True)
+
+        call_command('sweep_verification', stdout=StringIO())
+
+        remaining = set(User.objects.values_list('username', flat=True))
+        self.assertNotIn(stale.username, remaining)
+        self.assertEqual(remaining, {recent.username, legacy.username, admin.username, staff.username})
+
+    def test_registration_marks_accounts_for_verification(self):
+        response = self.client.post('/users/register/', {
+            'email': 'kid@example.com', 'password': 'Str0ng-pass!', 'password_confirm': 'Str0ng-pass!',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.get(email='kid@example.com').verification_required)
+
+
+class ParentApprovalTests(TestCase):
+    def setUp(self):
+        self.kids = [User.objects.create(username=f'kid{i}', email=f'kid{i}@example.com') for i in range(2)]
+
+    def _submit(self, kid, parent_email='parent@example.com'):
+        self.client.force_login(kid)
+        return self.client.post('/users/submit-parent/', {'parent_email': parent_email}, content_type='application/json')
+
+    def test_child_never_sees_the_dashboard_link(self):
+        response = self._submit(self.kids[0])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('email_preview', response.json())
+        self.assertNotIn('/users/parent/', response.content.decode())
+
+    def test_dashboard_lists_children_unselected(self):
+        for kid in self.kids:
+            self._submit(kid)
+        response = self.client.get(f'/users/parent/{dashboard_token("parent@example.com")}/')
+        self.assertEqual(response.status_code, 200)
+        page = response.content.decode()
+        self.assertIn('kid0', page)
+        self.assertIn('kid1', page)
+        self.assertNotIn('checked', page)
+
+    def test_submissions_merge_into_one_pending_digest(self):
+        for kid in self.kids:
+            self._submit(kid)
+        pending = OutboundEmail.objects.filter(to=['parent@example.com'], status=OutboundEmail.STATUS_PENDING)
+        self.assertEqual(pending.count(), 1)
+        self.assertIn('kid0', pending.get().body)
+        self.assertIn('kid1', pending.get().body)
+
+        # once the worker has claimed it, the next submission starts a new digest
+        pending.update(status=OutboundEmail.STATUS_SENT)
+        User.objects.create(username='kid2', email='kid2@example.com')
+        self._submit(User.objects.get(username='kid2'))
+        self.assertEqual(OutboundEmail.objects.filter(to=['parent@example.com']).count(), 2)
+
+    def test_parent_email_is_normalized_on_registration(self):
+        response = self.client.post('/users/register/', {
+            'email': 'kid9@example.com', 'password': 'Str0ng-pass!', 'password_confirm': 'Str0ng-pass!',
+            'parent_email': ' Parent@Example.COM ',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        admin = User.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.post('/users/register/bulk/', {'users': [
+            {'email': 'kid10@example.com', 'password': 'Str0ng-pass!', 'parent_email': 'PARENT@example.com'},
+        ]}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sorted(User.objects.filter(parent_email='parent@example.com').values_list('email', flat=True)),
+            ['kid10@example.com', 'kid9@example.com'],
+        )
+
+
+class ThrottleTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_rejected_requests_do_not_count(self):
+        throttle = OTPSendEmailThrottle()
+        request = SimpleNamespace(data={'email': ' Kid@Example.com'})
+        allowed = [throttle.allow_request(request, None) for _ in range(throttle.num_requests + 3)]
+        self.assertEqual(allowed, [True] * throttle.num_requests + [False] * 3)
+        self.assertGreater(throttle.wait(), 0)
+        window = int(time.time() // throttle.window)
+        self.assertEqual(cache.get(f'throttle:otp_send_email:kid@example.com:{window}'), throttle.num_requests)
+
+    @override_settings(THROTTLE_ALLOW_LOCAL_CACHE=False)
+    def test_check_requires_a_shared_cache(self):
+        self.assertEqual([e.id for e in check_throttle_cache(None)], ['users.E001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_throttle_cache(None), [])
+
+
+class ProfileETagTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='cook', email='cook@example.com')
+        self.client.force_login(self.user)
+
+    def test_etag_is_served_without_queries_and_changes_on_save(self):
+        response = self.client.get('/users/profile/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        # session and user lookups only: the version comes from the cache
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/users/profile/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # a save that changes nothing shown keeps the ETag
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get('/users/profile/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.user.chef_star_name = 'Chef Cook'
+        self.user.save()
+        response = self.client.get('/users/profile/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['chef_star_name'], 'Chef Cook')
+
+    def test_a_cold_cache_never_revives_an_old_etag(self):
+        old = self.client.get('/users/profile/')['ETag']
+        self.user.chef_star_name = 'Chef Cook'
+        self.user.save()
+        current = self.client.get('/users/profile/')['ETag']
+        self.assertNotEqual(current, old)
+
+        cache.clear()  # evicted, or a restarted cache
+        response = self.client.get('/users/profile/', HTTP_IF_NONE_MATCH=old)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(response['ETag'], (old, current))
+
+
+class CachedUserTests(TestCase):
+    def test_submit_parent_does_not_write_back_a_stale_cached_row(self):
+        user = User.objects.create(username='kid', email='kid@example.com')
+        token = str(VersionedRefreshToken.for_user(user).access_token)
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        self.assertEqual(self.client.get('/users/profile/', **auth).status_code, 200)  # caches the row
+        # changed without signals, e.g. by another process: the cached copy is stale
+        User.objects.filter(pk=user.pk).update(is_parent_approved=True)
+
+        response = self.client.post(
+            '/users/submit-parent/', {'parent_email': 'parent@example.com'}, content_type='application/json', **auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual((user.parent_email, user.is_parent_approved), ('parent@example.com', True))
+
+
+class HashingTests(TestCase):
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_TIMEOUT=0.05)
+    def test_slot_is_held_until_a_timed_out_hash_finishes(self):
+        release = threading.Event()
+        with ThreadPoolExecutor(1) as pool, \
+                mock.patch.multiple(hashing, _executor=pool, _slots=threading.BoundedSemaphore(1)):
+            with self.assertRaises(hashing.HashingTimeout):
+                hashing._run(release.wait, 5)
+            # the abandoned hash still runs, so the pool is still full
+            with self.assertRaises(hashing.HashingBusy):
+                hashing._run(sum, [1, 2])
+            release.set()
+            pool.submit(lambda: None).result()  # the blocked hash has finished and released its slot
+            self.assertEqual(hashing._run(sum, [1, 2]), 3)
+
+    def test_overload_answers_429_and_timeouts_503(self):
+        User.objects.create_user(username='cook', email='cook@example.com', password='Str0ng-pass!')
+        body = {'email': 'cook@example.com', 'password': 'Str0ng-pass!'}
+        for exc, code in ((hashing.HashingBusy('full'), 429), (hashing.HashingTimeout('slow'), 503)):
+            with mock.patch.object(hashing, 'check_password', side_effect=exc):
+                response = self.client.post('/users/login/', body, content_type='application/json')
+            self.assertEqual(response.status_code, code)
+            self.assertEqual(response['Retry-After'], '1')
+
+
+class VerificationTests(TestCase):
+    def test_resend_queues_the_same_email_as_registration(self):
+        self.client.post('/users/register/', {
+            'email': 'kid@example.com', 'password': 'Str0ng-pass!', 'password_confirm': 'Str0ng-pass!',
+        }, content_type='application/json')
+        response = self.client.post('/users/resend-code/', {'email': 'kid@example.com'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        user = User.objects.get(email='kid@example.com')
+        first, resent = OutboundEmail.objects.order_by('id')
+        self.assertEqual((resent.subject, resent.to), (first.subject, first.to))
+        self.assertIn(f'Your verification code is: {user.email_verification_code}', resent.body)
+        self.assertIn('It expires in', resent.html_body)
+
+
+class SchemaTests(SimpleTestCase):
+    def test_dump_with_one_field_and_with_many(self):
+        class IdSchema(Schema):
+            __slots__ = ('id',)
+
+        user = SimpleNamespace(id=7, username='cook', email='cook@example.com')
+        self.assertEqual(IdSchema.dump(user), {'id': 7})
+        self.assertEqual(IdSchema.dump_many([user, user]), [{'id': 7}, {'id': 7}])
+        self.assertEqual(IdSchema.from_obj(user).to_dict(), {'id': 7})
+        self.assertEqual(UserSchema.dump(user), {'id': 7, 'username': 'cook', 'email': 'cook@example.com'})
+
+
+class RegistrationTests(TestCase):
+    password = 'Str0ng-pass!'
+
+    def _register(self, email):
+        return self.client.post('/users/register/', {
+            'email': email, 'password': self.password, 'password_confirm': self.password,
+        }, content_type='application/json')
+
+    def _bulk(self, *emails):
+        return self.client.post('/users/register/bulk/', {
+            'users': [{'email': email, 'password': self.password} for email in emails],
+        }, content_type='application/json')
+
+    def test_emails_are_unique_whatever_the_case_in_both_paths(self):
+        self.assertEqual(self._register('Kid@Example.COM').status_code, 201)
+        self.assertEqual(User.objects.get(username='kid').email, 'kid@example.com')
+        self.assertEqual(self._register('KID@example.com').status_code, 400)
+
+        admin = User.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.client.force_login(admin)
+        response = self._bulk('Cook@example.com', 'cook@EXAMPLE.com')
+        self.assertEqual(response.json()['users'], {'duplicate_emails': ['cook@example.com']})
+        response = self._bulk('KID@EXAMPLE.COM', 'chef@example.com')
+        self.assertEqual(response.json()['users'], {'existing_emails': ['kid@example.com']})
+        self.assertEqual(self._bulk('Chef@Example.com').status_code, 201)
+        self.assertTrue(User.objects.filter(email='chef@example.com').exists())
+
+    def test_bulk_rejects_usernames_single_registration_rejects(self):
+        admin = User.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.post('/users/register/bulk/', {'users': [
+            {'email': 'kid@example.com', 'password': self.password, 'username': 'kid one!'},
+        ]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('username', response.json()['users']['0'])
+        self.assertFalse(User.objects.filter(email='kid@example.com').exists())
+
+    def test_login_matches_the_email_in_any_case(self):
+        User.objects.create_user(username='cook', email='cook@example.com', password=self.password, is_email_verified=True)
+        # registered before emails were normalized
+        old = User.objects.create_user(username='old', email='old@example.com', password=self.password, is_email_verified=True)
+        User.objects.filter(pk=old.pk).update(email='Old@Example.com')
+        for email in ('COOK@example.com', 'Old@Example.com'):
+            response = self.client.post('/users/login/', {'email': email, 'password': self.password}, content_type='application/json')
+            self.assertEqual(response.status_code, 200, email)
+
+    def test_usernames_are_allocated_among_base_and_digit_suffixes_only(self):
+        for name in ('chef', 'chef1', 'chefs', 'chef_2', 'chef3x'):
+            User.objects.create(username=name, email=f'{name}@example.com')
+        # one query per distinct base
+        with self.assertNumQueries(2):
+            self.assertEqual(allocate_usernames(['chef', 'chef', 'chefs']), ['chef2', 'chef3', 'chefs1'])
+
+
+class PruneTokensTests(TestCase):
+    def test_claimless_tokens_are_only_pruned_once_expired(self):
+        user = User.objects.create(username='cook', email='cook@example.com')
+        legacy = RefreshToken.for_user(user)  # stored without a token_version claim
+        old = VersionedRefreshToken.for_user(user)
+        User.objects.filter(pk=user.pk).update(token_version=2)
+        user.refresh_from_db()
+        current = VersionedRefreshToken.for_user(user)
+
+        self.assertEqual(tokens.prune()['superseded'], 1)
+        self.assertEqual(
+            set(OutstandingToken.objects.values_list('jti', flat=True)),
+            {legacy['jti'], current['jti']},
+        )
+        self.assertFalse(OutstandingToken.objects.filter(jti=old['jti']).exists())
+
+        OutstandingToken.objects.filter(jti=legacy['jti']).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(tokens.prune()['expired'], 1)
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [current['jti']])
@@ -0,0 +1,135 @@
+"""Sliding-window throttles for the unauthenticated OTP and login endpoints.
+
+Each check reads two fixed-window counters (current and previous) and
+weights the previous one by how much of it still overlaps the sliding
+window, so a check costs one `get`, one `add` and one `incr` no matter how
+many requests were made. The request is counted first (`add(key, 0)` then
+the atomic `incr`) and the limit checked against the new total, so
+concurrent requests cannot all slip in under it; a rejected request takes
+its count back. Counters live in the THROTTLE_CACHE cache alias, which must
+be shared across worker processes (Redis or Memcached); `check_throttle_cache`
+makes `manage.py check` fail otherwise.
+Rates come from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] as
+"<count>/<period>", e.g. "5/min", "10/15m" or "100/day".
+"""
+import re
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# backends whose counters every worker process shares and whose incr() is atomic
+SHARED_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+
+
+def parse_rate(rate):
+    """'10/15m' -> (10, 900). A missing multiplier means 1, so '5/min' -> (5, 60)."""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d*)\s*([smhd])[a-z]*\s*', rate or '')
+    if not match:
+        raise ImproperlyConfigured(f'Invalid throttle rate {rate!r}')
+    count, mult, unit = match.groups()
+    return int(count), int(mult or 1) * _UNITS[unit]
+
+
+@checks.register(checks.Tags.caches)
+def check_throttle_cache(app_configs, **kwargs):
+    alias = getattr(settings, 'THROTTLE_CACHE', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in SHARED_BACKENDS or getattr(settings, 'THROTTLE_ALLOW_LOCAL_CACHE', False):
+        return []
+    return [checks.Error(
+        f'THROTTLE_CACHE {alias!r} uses {backend}, which each worker process keeps to itself, '
+        'so every process would allow the full rate.',
+        hint='Set REDIS_URL (or point THROTTLE_CACHE at a Redis/Memcached alias).',
+        id='users.E001',
+    )]
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    scope = None
+    # 'ip' or 'email': what identifies the client for this throttle
+    key_source = 'ip'
+
+    def __init__(self):
+        rates = api_settings.DEFAULT_THROTTLE_RATES or {}
+        if self.scope not in rates:
+            raise ImproperlyConfigured(f'No throttle rate set for scope {self.scope!r}')
+        self.num_requests, self.window = parse_rate(rates[self.scope])
+        self.cache = caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+        self._wait = None
+
+    def get_ident_value(self, request):
+        if self.key_source == 'email':
+            email = request.data.get('email') if hasattr(request, 'data') else None
+            return str(email).strip().lower() if email else None
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        ident = self.get_ident_value(request)
+        if not ident:
+            # nothing to key on (e.g. no email in the body): the view rejects it anyway
+            return True
+
+        now = time.time()
+        current = int(now // self.window)
+        prefix = f'throttle:{self.scope}:{ident}'
+        cur_key, prev_key = f'{prefix}:{current}', f'{prefix}:{current - 1}'
+        # counters outlive their window by one more so the next window can weight them
+        self.cache.add(cur_key, 0, timeout=self.window * 2)
+        try:
+            count = self.cache.incr(cur_key)
+        except ValueError:
+            # key expired between add() and incr()
+            self.cache.set(cur_key, 1, timeout=self.window * 2)
+            count = 1
+        elapsed = now - current * self.window
+        overlap = 1 - elapsed / self.window
+        estimate = self.cache.get(prev_key, 0) * overlap + count
+        if estimate > self.num_requests:
+            try:
+                self.cache.decr(cur_key)
+            except ValueError:
+                pass
+            self._wait = self.window - elapsed
+            return False
+        return True
+
+    def wait(self):
+        return self._wait
+
+
+class LoginIPThrottle(SlidingWindowThrottle):
+    scope = 'login_ip'
+
+
+class LoginEmailThrottle(SlidingWindowThrottle):
+    scope = 'login_email'
+    key_source = 'email'
+
+
+class OTPSendIPThrottle(SlidingWindowThrottle):
+    scope = 'otp_send_ip'
+
+
+class OTPSendEmailThrottle(SlidingWindowThrottle):
+    scope = 'otp_send_email'
+    key_source = 'email'
+
+
+class OTPVerifyIPThrottle(SlidingWindowThrottle):
+    scope = 'otp_verify_ip'
+
+
+class OTPVerifyEmailThrottle(SlidingWindowThrottle):
+    scope = 'otp_verify_email'
+    key_source = 'email'
@@ -0,0 +1,234 @@
+"""Token lifecycle: issuing, cached lookups and pruning.
+
+Every refresh token issued is stored as a SimpleJWT `OutstandingToken`, and
+checking one against the blacklist is a join of OutstandingToken and
+BlacklistedToken. `VersionedRefreshToken` puts that query behind an
+in-memory filter:
+
+- each process holds a Bloom filter of every blacklisted jti, rebuilt from
+  the table every TOKEN_BLACKLIST_REBUILD_SECONDS;
+- a jti blacklisted since then is marked in the default cache (set on
+  commit by users.signals) until every process has rebuilt past it.
+
+A jti in neither is not blacklisted and refresh costs no query; a Bloom hit
+(or a false positive, TOKEN_BLACKLIST_FP_RATE) falls through to the table.
+The cache marks need a shared cache (REDIS_URL) once there is more than one
+worker process, like the user cache in users.authentication.
+
+`prune()` deletes outstanding tokens that can no longer be used: expired
+ones, and ones minted before their user's current `token_version` (or for a
+deleted user), which authentication and `refresh` reject anyway. Tokens
+issued before the claim existed carry no version and are only pruned once
+expired. Run it with `manage.py prune_tokens`.
+"""
+import hashlib
+import math
+import threading
+import time
+
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch, get_md5_hash_password
+
+from core import metrics
+
+VERSION_CLAIM = 'token_version'
+BLACKLISTED_KEY = 'tokens:blacklisted:{}'
+DRF_TOKEN_KEY = 'auth:drf-token:{}'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; no false negatives."""
+
+    def __init__(self, capacity, fp_rate=0.01):
+        capacity = max(capacity, 1)
+        self.bits = max(64, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.capacity = capacity
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value):
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class BlacklistFilter:
+    """This process's snapshot of blacklisted jtis (see module docstring)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._built_at = 0.0
+
+    def _stale(self):
+        return self._bloom is None or time.monotonic() - self._built_at >= _setting('TOKEN_BLACKLIST_REBUILD_SECONDS', 300)
+
+    def rebuild(self):
+        started = time.monotonic()
+        jtis = BlacklistedToken.objects.values_list('token__jti', flat=True)
+        # headroom so tokens blacklisted before the next rebuild do not degrade the false positive rate
+        bloom = BloomFilter(int(jtis.count() * 1.25) + 1000, _setting('TOKEN_BLACKLIST_FP_RATE', 0.01))
+        for jti in jtis.iterator(chunk_size=5000):
+            bloom.add(jti)
+        self._bloom, self._built_at = bloom, started
+
+    def might_contain(self, jti):
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    self.rebuild()
+        return jti in self._bloom or cache.get(BLACKLISTED_KEY.format(jti)) is not None
+
+    def reset(self):
+        self._bloom = None
+
+
+blacklist_filter = BlacklistFilter()
+
+
+def mark_blacklisted(jti):
+    """Make `jti` visible to every process's filter until their next rebuild (users.signals calls this)."""
+    cache.set(BLACKLISTED_KEY.format(jti), 1, 2 * _setting('TOKEN_BLACKLIST_REBUILD_SECONDS', 300) + 60)
+
+
+class VersionedRefreshToken(RefreshToken):
+    """RefreshToken carrying `token_version`, with blacklist checks behind `blacklist_filter`."""
+
+    @classmethod
+    def for_user(cls, user):
+        # RefreshToken.for_user stores the outstanding token before a claim can be added;
+        # the stored copy needs token_version for prune() to recognise superseded tokens
+        token = cls()
+        token[api_settings.USER_ID_CLAIM] = str(getattr(user, api_settings.USER_ID_FIELD))
+        if api_settings.CHECK_REVOKE_TOKEN:
+            token[api_settings.REVOKE_TOKEN_CLAIM] = get_md5_hash_password(user.password)
+        token[VERSION_CLAIM] = user.token_version
+        OutstandingToken.objects.create(
+            user=user,
+            jti=token[api_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token['exp']),
+        )
+        return token
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if not blacklist_filter.might_contain(jti):
+            metrics.inc('jwt_blacklist_checks_total', outcome='filtered')
+            return
+        blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        metrics.inc('jwt_blacklist_checks_total', outcome='blacklisted' if blacklisted else 'false_positive')
+        if blacklisted:
+            raise TokenError(_('Token is blacklisted'))
+
+
+def drf_token_key(user):
+    """Key of `user`'s DRF auth token, creating the token once; cached so logins skip get_or_create."""
+    cache_key = DRF_TOKEN_KEY.format(user.pk)
+    key = cache.get(cache_key)
+    if key is None:
+        key = Token.objects.get_or_create(user=user)[0].key
+        cache.set(cache_key, key, _setting('AUTH_USER_CACHE_SECONDS', 300))
+    return key
+
+
+def forget_drf_token(user_id):
+    cache.delete(DRF_TOKEN_KEY.format(user_id))
+
+
+def _claimed_version(token):
+    """The token's `token_version` claim; None when it is unreadable or has none (minted before the claim)."""
+    try:
+        payload = jwt.decode(token, options={'verify_signature': False})
+    except jwt.InvalidTokenError:
+        return None
+    return payload.get(VERSION_CLAIM)
+
+
+def prune(chunk_size=1000, pause=0.0, dry_run=False):
+    """
+    Delete expired and superseded outstanding tokens (and their blacklist
+    rows) one primary-key chunk per transaction. Returns
+    {'expired', 'superseded', 'scanned', 'seconds'}.
+    """
+    started = time.monotonic()
+    now = timezone.now()
+    result = {'expired': 0, 'superseded': 0, 'scanned': 0}
+    last_pk = 0
+    while True:
+        rows = list(
+            OutstandingToken.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'expires_at', 'user_id', 'user__token_version', 'token')[:chunk_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        result['scanned'] += len(rows)
+
+        expired, superseded = [], []
+        for pk, expires_at, user_id, version, token in rows:
+            if expires_at < now:
+                expired.append(pk)
+            elif user_id is None:
+                superseded.append(pk)
+            else:
+                # an unknown version is left for expiry rather than guessed
+                claimed = _claimed_version(token)
+                if claimed is not None and claimed != version:
+                    superseded.append(pk)
+        result['expired'] += len(expired)
+        result['superseded'] += len(superseded)
+        if dry_run or not (expired or superseded):
+            continue
+
+        with transaction.atomic():
+            OutstandingToken.objects.filter(pk__in=expired + superseded).delete()
+        metrics.inc('jwt_tokens_pruned_total', len(expired), reason='expired')
+        metrics.inc('jwt_tokens_pruned_total', len(superseded), reason='superseded')
+        if pause:
+            time.sleep(pause)
+    result['seconds'] = time.monotonic() - started
+    return result
+
+
+def _row_count(model):
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        # exact counts scan the table; the planner's estimate is good enough for a gauge
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+    return model.objects.count()
+
+
+def table_sizes():
+    """Row counts of the token tables, also published as the `db_table_rows` gauge."""
+    sizes = {model._meta.db_table: _row_count(model) for model in (OutstandingToken, BlacklistedToken, Token)}
+    for table, rows in sizes.items():
+        metrics.set_gauge('db_table_rows', rows, table=table)
+    return sizes
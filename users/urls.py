@@ -3,10 +3,13 @@ from . import views
 
 urlpatterns = [
     path('register/', views.register, name='register'),
+    path('register/bulk/', views.register_bulk, name='register_bulk'),
     path('verify-email/', views.verify_email_code, name='verify_email_code'),
     path('resend-code/', views.resend_verification_code, name='resend_verification_code'),
     path('submit-parent/', views.submit_parent, name='submit_parent'),
     path('approve-parent/<uuid:token>/', views.approve_parent, name='approve_parent'),
+    path('parent/<str:token>/', views.parent_dashboard, name='parent_dashboard'),
     path('login/', views.login_view, name='login'),
+    path('token/refresh/', views.refresh_token, name='refresh_token'),
     path('profile/', views.profile, name='profile'),  # added profile route
 ]
@@ -1,25 +1,41 @@
 from django.shortcuts import get_object_or_404
-from django.core.mail import send_mail, EmailMultiAlternatives
 from django.conf import settings
+from django.core import signing
 from django.http import HttpResponse
+from django.utils.html import escape
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 import logging
 import random
 import uuid
-from urllib.parse import quote
 from datetime import timedelta
-from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
-from rest_framework_simplejwt.tokens import RefreshToken
-
-from .serializers import RegistrationSerializer
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from core.conditional import cached_response
+from core.db import read_replica
+from outbox.queue import enqueue
+
+from . import hashing
+from .authentication import USER_SCOPE, cached_user
+from .hashing import HashingBusy, HashingTimeout
+from .parents import (
+    approve_children, normalize_email, parent_for_token, pending_children, queue_digest,
+)
+from .registration import bulk_register, user_for_email, verification_email
+from .schemas import AuthSchema, ProfileSchema, UserSchema
+from .serializers import BulkRegistrationSerializer, RegistrationSerializer
+from .tokens import VERSION_CLAIM, VersionedRefreshToken, drf_token_key
+from .throttling import (
+    LoginEmailThrottle, LoginIPThrottle, OTPSendEmailThrottle, OTPSendIPThrottle,
+    OTPVerifyEmailThrottle, OTPVerifyIPThrottle,
+)
 
 User = get_user_model()
 
@@ -29,27 +45,51 @@ def _generate_code():
     return f"{random.randint(0, 999999):06d}"
 
 
+def _auth_payload(user):
+    """id, username, email plus a DRF token and a JWT pair (each when it can be issued)."""
+    payload = AuthSchema.from_obj(user)
+
+    # DRF Token (if authtoken installed)
+    try:
+        payload.token = drf_token_key(user)
+    except Exception:
+        pass
+
+    # JWT (if simplejwt installed)
+    try:
+        refresh = VersionedRefreshToken.for_user(user)
+        payload.access = str(refresh.access_token)
+        payload.refresh = str(refresh)
+    except Exception:
+        pass
+    return payload.to_dict()
+
+
+def _busy_response(exc):
+    # password hashing pool is saturated (429) or too slow (503): shed load instead of queueing
+    code = status.HTTP_503_SERVICE_UNAVAILABLE if isinstance(exc, HashingTimeout) else status.HTTP_429_TOO_MANY_REQUESTS
+    return Response({'error': 'server busy, try again shortly'}, status=code, headers={'Retry-After': '1'})
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([OTPSendIPThrottle, OTPSendEmailThrottle])
 def register(request):
     """Register user and send numeric verification code to email."""
     serializer = RegistrationSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()  # serializer should create user with is_email_verified=False
+        try:
+            user = serializer.save()  # serializer should create user with is_email_verified=False
+        except HashingBusy as exc:
+            return _busy_response(exc)
         # generate and store code
         code = _generate_code()
         user.email_verification_code = code
         user.code_created_at = timezone.now()
-        user.save()
-
-        # send code email (plain + html)
-        subject = "Your verification code"
-        text = f"Hello {user.username},\n\nYour verification code is: {code}\n\nIt expires in 15 minutes."
-        html = f"<p>Hello <strong>{user.username}</strong>,</p><p>Your verification code is: <strong>{code}</strong></p><p>It expires in 15 minutes.</p>"
+        user.save(update_fields=['email_verification_code', 'code_created_at'])
 
-        msg = EmailMultiAlternatives(subject, text, getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@localhost'), [user.email])
-        msg.attach_alternative(html, "text/html")
-        msg.send(fail_silently=False)
+        # queue code email (plain + html)
+        enqueue(**verification_email(user, code))
 
         print(f"[OTP] Sending verification code for {user.email}: {code}")
 
@@ -62,8 +102,27 @@ def register(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def register_bulk(request):
+    """
+    POST { "users": [{ "email", "password", "chef_star_name"?, "age_group"?, "parent_email"?, "username"? }, ...] }
+    Creates up to BULK_REGISTRATION_MAX users in one batch (e.g. a school class) and queues their codes.
+    """
+    serializer = BulkRegistrationSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    users = bulk_register(serializer.validated_data['users'], _generate_code)
+    return Response({
+        'created': UserSchema.dump_many(users),
+        'message': f'registered {len(users)} users and queued their verification mails',
+    }, status=status.HTTP_201_CREATED)
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([OTPVerifyIPThrottle, OTPVerifyEmailThrottle])
 def verify_email_code(request):
     """
     POST { "email": "...", "code": "123456" }
@@ -75,59 +134,32 @@ def verify_email_code(request):
         return Response({'error': 'email and code are required'}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        user = User.objects.get(email=email)
+        user = user_for_email(email)
     except User.DoesNotExist:
         return Response({'error': 'user not found'}, status=status.HTTP_404_NOT_FOUND)
 
     # If already verified -> still return tokens so client can continue
     if user.is_email_verified:
-        resp = {'id': user.id, 'username': user.username, 'email': user.email}
-        try:
-            token_obj, _ = Token.objects.get_or_create(user=user)
-            resp['token'] = token_obj.key
-        except Exception:
-            pass
-        try:
-            refresh = RefreshToken.for_user(user)
-            refresh['token_version'] = getattr(user, 'token_version', 0)
-            resp['access'] = str(refresh.access_token)
-            resp['refresh'] = str(refresh)
-        except Exception:
-            pass
-        return Response(resp, status=status.HTTP_200_OK)
+        return Response(_auth_payload(user), status=status.HTTP_200_OK)
 
     # verify code + expiry
     if user.email_verification_code != code:
         return Response({'error': 'invalid code'}, status=status.HTTP_400_BAD_REQUEST)
-    if not user.code_created_at or timezone.now() > user.code_created_at + timedelta(minutes=15):
+    if not user.code_created_at or timezone.now() > user.code_created_at + timedelta(minutes=settings.VERIFICATION_CODE_TTL_MINUTES):
         return Response({'error': 'code expired'}, status=status.HTTP_400_BAD_REQUEST)
 
     # mark verified
     user.is_email_verified = True
     user.email_verification_code = ''
     user.code_created_at = None
-    user.save()
-
-    # create tokens
-    resp = {'id': user.id, 'username': user.username, 'email': user.email}
-    try:
-        token_obj, _ = Token.objects.get_or_create(user=user)
-        resp['token'] = token_obj.key
-    except Exception:
-        pass
-    try:
-        refresh = RefreshToken.for_user(user)
-        refresh['token_version'] = getattr(user, 'token_version', 0)
-        resp['access'] = str(refresh.access_token)
-        resp['refresh'] = str(refresh)
-    except Exception:
-        pass
+    user.save(update_fields=['is_email_verified', 'email_verification_code', 'code_created_at'])
 
-    return Response(resp, status=status.HTTP_200_OK)
+    return Response(_auth_payload(user), status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([OTPSendIPThrottle, OTPSendEmailThrottle])
 def resend_verification_code(request):
     """Resend verification code to a user's email. POST {email} -> sends new code."""
     email = request.data.get('email')
@@ -135,7 +167,7 @@ def resend_verification_code(request):
         return Response({'error': 'email required'}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        user = User.objects.get(email=email)
+        user = user_for_email(email)
     except User.DoesNotExist:
         return Response({'error': 'user not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -148,14 +180,10 @@ def resend_verification_code(request):
     user.email_verification_code = code
     user.code_created_at = timezone.now()
     user.token_version = (user.token_version or 0) + 1
-    user.save()
+    user.save(update_fields=['email_verification_code', 'code_created_at', 'token_version'])
 
-    # send code by email (console backend in dev)
-    subject = "Your verification code"
-    text = f"Hello {user.username}, your verification code: {code}"
-    msg = EmailMultiAlternatives(subject, text, getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@localhost'), [user.email])
-    msg.attach_alternative(f"<p>Your verification code: <strong>{code}</strong></p>", "text/html")
-    msg.send(fail_silently=False)
+    # queue code email; delivered by the outbox worker
+    enqueue(**verification_email(user, code))
 
     print(f"[OTP] Resending verification code for {user.email}: {code}")
 
@@ -171,7 +199,8 @@ def resend_verification_code(request):
 def submit_parent(request):
     """
     Child posts parent_email, optional star_name/age_group.
-    Sends approval email (logs and returns preview). Raises/send errors visible.
+    Queues the parent's approval digest; the outbox worker delivers it. The
+    email itself is never returned: its link lets the holder approve accounts.
     """
     parent_email = request.data.get('parent_email')
     chef_star_name = request.data.get('star_name') or request.data.get('chef_star_name')
@@ -195,65 +224,33 @@ def submit_parent(request):
             if cleaned in dict(get_user_model().AGE_CHOICES):
                 age_key = cleaned
 
+    # request.user may be a cached copy: write only the fields set here, never the whole row
     user = request.user
-    user.parent_email = parent_email
+    user.parent_email = normalize_email(parent_email)
+    changed = ['parent_email']
     if chef_star_name:
         user.chef_star_name = chef_star_name
+        changed.append('chef_star_name')
     if age_key:
         user.age_group = age_key
+        changed.append('age_group')
     if not getattr(user, 'verification_token', None):
         user.verification_token = uuid.uuid4()
-    user.save()
-
-    # build approve link
-    token = user.verification_token
-    approve_link = f"{request.scheme}://{request.get_host()}{reverse('approve_parent', args=[token])}?email={quote(parent_email)}"
-
-    subject = f"Please approve {user.username}'s account"
-    text = f"Please approve your child's account by visiting: {approve_link}"
-    html = f"""
-      <html>
-        <body>
-          <p>Hello,</p>
-          <p>Please approve <strong>{user.username}</strong>'s account by clicking the button below:</p>
-          <p style="text-align:center;">
-            <a href="{approve_link}" style="padding:12px 20px;background:#6f42c1;color:#fff;border-radius:6px;text-decoration:none;">Approve account</a>
-          </p>
-        </body>
-      </html>
-    """
+        changed.append('verification_token')
+    user.save(update_fields=changed)
 
-    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@localhost')
+    # one digest per parent: submissions inside the window join the email already queued
+    merged = queue_digest(request, user.parent_email)
+    logger.info("Parent approval digest %s for %s", 'updated' if merged else 'queued', user.parent_email)
 
-    # Try to send and capture exceptions
-    try:
-        msg = EmailMultiAlternatives(subject, text, from_email, [parent_email])
-        msg.attach_alternative(html, "text/html")
-        # ensure exceptions bubble up for debugging (fail_silently=False)
-        send_result = msg.send(fail_silently=False)
-        logger.info("Parent approval email sent to %s (send returned: %s)", parent_email, send_result)
-        send_status = 'sent'
-    except Exception as exc:
-        logger.exception("Failed to send parent approval email to %s: %s", parent_email, exc)
-        send_status = 'error'
-        # include error in response for debugging (remove in production)
-        return Response({'error': 'failed to send email', 'details': str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    # return saved fields + preview so you can verify what was sent
+    # no email preview: the digest carries the parent's dashboard link, which approves children
     return Response({
         'id': user.id,
         'username': user.username,
         'chef_star_name': user.chef_star_name,
         'age_group': user.age_group,
         'parent_email': user.parent_email,
-        'email_preview': {
-            'to': [parent_email],
-            'from': from_email,
-            'subject': subject,
-            'text': text,
-            'html': html,
-        },
-        'send_status': send_status
+        'send_status': 'merged' if merged else 'queued',
     }, status=status.HTTP_200_OK)
 
 
@@ -262,35 +259,69 @@ def submit_parent(request):
 def approve_parent(request, token):
     """
     Parent clicks link (browser): /users/approve-parent/<token>/?email=parent@example.com
-    Marks is_parent_approved=True and notifies the child by email.
-    Returns an HTML confirmation page.
+    Marks is_parent_approved=True and notifies the child (inbox and email).
+    Returns an HTML confirmation page. Links sent before the parent dashboard
+    existed still land here.
     """
-    user = get_object_or_404(User, verification_token=token)
+    user = get_object_or_404(User.objects.only('id', 'parent_email', 'is_parent_approved'), verification_token=token)
 
     parent_email = request.GET.get('email')
-    if parent_email and parent_email != user.parent_email:
+    if parent_email and normalize_email(parent_email) != normalize_email(user.parent_email or ''):
         return HttpResponse("<h2>Parent email mismatch</h2>", status=400)
 
-    if user.is_parent_approved:
+    if user.is_parent_approved or not approve_children(user.parent_email, [user.pk]):
         return HttpResponse("<h2>Already approved</h2><p>This account is already approved by the parent.</p>")
 
-    user.is_parent_approved = True
-    user.save()
+    return HttpResponse("<h2>Thank you</h2><p>Parent approval recorded. The account is now unlocked and the child can log in.</p>")
 
-    # notify the child
-    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@localhost')
-    send_mail(
-        'Your parent approved your account',
-        f'Hi {user.username},\n\nYour parent has approved your account. You can now log in.',
-        from_email,
-        [user.email],
-        fail_silently=False,
-    )
 
-    return HttpResponse("<h2>Thank you</h2><p>Parent approval recorded. The account is now unlocked and the child can log in.</p>")
+@api_view(['GET', 'POST'])
+@authentication_classes([])  # the signed link is the credential; no session means no CSRF check on the form
+@permission_classes([AllowAny])
+def parent_dashboard(request, token):
+    """
+    Parent dashboard (browser), linked from the approval digest: /users/parent/<signed token>/
+    GET lists every child waiting for this parent's approval; POST approves the
+    checked ones (form field `child`, repeated, or JSON {"children": [ids]})
+    with one UPDATE. Returns an HTML page.
+    """
+    try:
+        parent_email = parent_for_token(token)
+    except signing.BadSignature:
+        return HttpResponse("<h2>Link expired</h2><p>Ask your child to send the request again for a fresh link.</p>", status=400)
+
+    notice = ''
+    if request.method == 'POST':
+        if hasattr(request.data, 'getlist'):
+            ids = request.data.getlist('child')
+        else:
+            ids = request.data.get('children') or []
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            return HttpResponse("<h2>Invalid selection</h2>", status=400)
+        approved = approve_children(parent_email, ids) if ids else []
+        names = ', '.join(escape(username) for _, username, _ in approved)
+        notice = f"<p>Approved {len(approved)} account(s){': ' + names if names else ''}. They can log in now.</p>"
+
+    children = list(pending_children(parent_email))
+    if children:
+        rows = ''.join(
+            f'<li><label><input type="checkbox" name="child" value="{child.pk}"> '
+            f'<strong>{escape(child.username)}</strong>'
+            f'{" (" + escape(child.chef_star_name) + ")" if child.chef_star_name else ""}'
+            f'{", " + escape(child.get_age_group_display()) if child.age_group else ""}'
+            f', joined {child.date_joined:%Y-%m-%d}</label></li>'
+            for child in children
+        )
+        body = f'<form method="post"><ul>{rows}</ul><button type="submit">Approve selected</button></form>'
+    else:
+        body = '<p>No accounts are waiting for your approval.</p>'
+    return HttpResponse(f"<h2>Accounts for {escape(parent_email)}</h2>{notice}{body}")
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPThrottle, LoginEmailThrottle])
 def login_view(request):
     """
     POST { "email": "...", "password": "..." }
@@ -302,11 +333,15 @@ def login_view(request):
         return Response({'error': 'email and password required'}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        user = User.objects.get(email=email)
+        user = user_for_email(email)
     except User.DoesNotExist:
         return Response({'error': 'invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
-    if not user.check_password(password):
+    try:
+        password_ok = hashing.check_password(user, password)
+    except HashingBusy as exc:
+        return _busy_response(exc)
+    if not password_ok:
         return Response({'error': 'invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
     if not getattr(user, 'is_email_verified', False):
@@ -316,42 +351,43 @@ def login_view(request):
     if getattr(user, 'age_group', None) in (choice[0] for choice in User.AGE_CHOICES) and not getattr(user, 'is_parent_approved', False):
         return Response({'error': 'parent approval required'}, status=status.HTTP_403_FORBIDDEN)
 
-    resp = {'id': user.id, 'username': user.username, 'email': user.email}
-
-    # DRF Token (if authtoken installed)
-    try:
-        token_obj, _ = Token.objects.get_or_create(user=user)
-        resp['token'] = token_obj.key
-    except Exception:
-        pass
+    return Response(_auth_payload(user), status=status.HTTP_200_OK)
 
-    # JWT (if simplejwt installed)
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def refresh_token(request):
+    """
+    POST { "refresh": "..." }
+    Returns a new access token (and a rotated refresh token when ROTATE_REFRESH_TOKENS is on).
+    """
     try:
-        refresh = RefreshToken.for_user(user)
-        refresh['token_version'] = getattr(user, 'token_version', 0)
-        resp['access'] = str(refresh.access_token)
-        resp['refresh'] = str(refresh)
-    except Exception:
-        pass
-
-    return Response(resp, status=status.HTTP_200_OK)
-
+        refresh = VersionedRefreshToken(request.data.get('refresh') or '')
+    except TokenError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
+
+    user = cached_user(refresh.get(jwt_settings.USER_ID_CLAIM))
+    # tokens minted before token_version existed carry no claim and count as version 0
+    if user is None or not user.is_active or refresh.get(VERSION_CLAIM, 0) != user.token_version:
+        return Response({'error': 'token has been revoked'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    data = {'access': str(refresh.access_token)}
+    if jwt_settings.ROTATE_REFRESH_TOKENS:
+        if jwt_settings.BLACKLIST_AFTER_ROTATION:
+            refresh.blacklist()
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        refresh.outstand()
+        data['refresh'] = str(refresh)
+    return Response(data, status=status.HTTP_200_OK)
+
+@read_replica
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_response(USER_SCOPE)
 def profile(request):
     """
     Return authenticated user's profile.
     GET /users/profile/
     """
-    user = request.user
-    data = {
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "chef_star_name": getattr(user, "chef_star_name", None),
-        "age_group": getattr(user, "age_group", None),
-        "parent_email": getattr(user, "parent_email", None),
-        "is_email_verified": getattr(user, "is_email_verified", False),
-        "is_parent_approved": getattr(user, "is_parent_approved", False),
-    }
-    return Response(data, status=status.HTTP_200_OK)
\ No newline at end of file
+    return Response(ProfileSchema.dump(request.user), status=status.HTTP_200_OK)
\ No newline at end of file